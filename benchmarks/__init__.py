@@ -0,0 +1,16 @@
+"""
+Performance benchmarks. Each module is runnable with `python -m benchmarks.<name>`
+and uses a throwaway test database, never the configured one.
+"""
+import os
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "rian_backend.settings")
+    import django
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
@@ -0,0 +1,272 @@
+"""
+Sync (WSGI) vs. async (ASGI) serving at the same memory budget.
+
+    python -m benchmarks.asgi_concurrency [--memory-mb 512] [--concurrency 32]
+        [--requests 200] [--upload-delay 0.5] [--output asgi.json]
+
+Both modes run under gunicorn against a throwaway SQLite database seeded
+with generate_fake_shop: sync workers for rian_backend.wsgi, uvicorn
+workers for rian_backend.asgi. Each mode gets as many workers as fit in
+--memory-mb, measured from the RSS of a warmed-up probe worker. Cloudinary
+is replaced by a local server that answers uploads after --upload-delay
+seconds, standing in for a slow upstream.
+
+For the catalog (GET /products/) and image uploads (POST /upload-test/) it
+reports requests/sec, p50/p95 latency and errors at --concurrency clients.
+Needs uvicorn (and httpx for non-blocking uploads) from requirements.txt.
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from benchmarks.routes import percentile
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MODES = {
+    "wsgi": ("rian_backend.wsgi:application", "sync"),
+    "asgi": ("rian_backend.asgi:application", "uvicorn.workers.UvicornWorker"),
+}
+
+
+# -------------------------------------------------------------------
+# Fake Cloudinary upload API
+# -------------------------------------------------------------------
+
+def fake_cloudinary(delay):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(delay)
+            body = json.dumps({
+                "public_id": f"upload-test/bench-{time.monotonic_ns()}", "version": 1,
+                "format": "png", "type": "upload", "resource_type": "image",
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# -------------------------------------------------------------------
+# Servers
+# -------------------------------------------------------------------
+
+def rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def worker_pids(master_pid):
+    pids = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == master_pid:
+                        pids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    return pids
+
+
+class Server:
+    def __init__(self, mode, workers, port, env):
+        app, worker_class = MODES[mode]
+        self.url = f"http://127.0.0.1:{port}"
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", app, "-k", worker_class, "-w", str(workers),
+             "-b", f"127.0.0.1:{port}", "--timeout", "120", "--log-level", "warning"],
+            cwd=BASE_DIR, env={**env, "SERVER_MODE": mode},
+        )
+
+    def wait(self, timeout=30):
+        import requests
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with status {self.process.returncode}")
+            try:
+                requests.get(self.url + "/products/", timeout=5)
+                return
+            except requests.ConnectionError:
+                time.sleep(0.2)
+        raise RuntimeError(f"{self.url} did not start")
+
+    def worker_rss(self):
+        return [rss_mb(pid) for pid in worker_pids(self.process.pid)]
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait(timeout=30)
+
+
+# -------------------------------------------------------------------
+# Load
+# -------------------------------------------------------------------
+
+def png_bytes():
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (200, 30, 30)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class Client:
+    def __init__(self, base_url):
+        import requests
+
+        self.base_url = base_url
+        self.requests = requests
+        self.local = threading.local()
+        self.image = png_bytes()
+
+    def session(self):
+        if not hasattr(self.local, "session"):
+            session = self.requests.Session()
+            session.get(self.base_url + "/upload-test/")  # sets the CSRF cookie
+            self.local.session = session
+        return self.local.session
+
+    def catalog(self):
+        return self.session().get(self.base_url + "/products/", timeout=120)
+
+    def upload(self):
+        session = self.session()
+        return session.post(
+            self.base_url + "/upload-test/",
+            data={"csrfmiddlewaretoken": session.cookies["csrftoken"]},
+            files={"image": ("bench.png", self.image, "image/png")},
+            headers={"Referer": self.base_url + "/upload-test/"},
+            timeout=120,
+        )
+
+    def run(self, scenario, n_requests, concurrency):
+        def one(_):
+            start = time.perf_counter()
+            try:
+                ok = getattr(self, scenario)().status_code < 400
+            except self.requests.RequestException:
+                ok = False
+            return time.perf_counter() - start, ok
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            wall_start = time.perf_counter()
+            results = list(pool.map(one, range(n_requests)))
+            wall = time.perf_counter() - wall_start
+        durations = sorted(d for d, ok in results if ok)
+        return {
+            "requests": n_requests,
+            "errors": sum(1 for _, ok in results if not ok),
+            "rps": round(len(durations) / wall, 2),
+            "p50_ms": round(percentile(durations, 50) * 1000, 1) if durations else None,
+            "p95_ms": round(percentile(durations, 95) * 1000, 1) if durations else None,
+        }
+
+
+# -------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------
+
+def prepare_env(workdir, upload_server):
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{workdir}/bench.sqlite3",
+        "DEBUG": "1",
+        "PYTHONUNBUFFERED": "1",
+        "CLOUDINARY_CLOUD_NAME": "bench",
+        "CLOUDINARY_API_KEY": "bench",
+        "CLOUDINARY_API_SECRET": "bench",
+        "CLOUDINARY_UPLOAD_PREFIX": f"http://127.0.0.1:{upload_server.server_port}",
+    }
+    manage = [sys.executable, "manage.py"]
+    subprocess.run([*manage, "migrate", "-v0"], cwd=BASE_DIR, env=env, check=True)
+    subprocess.run(
+        [*manage, "generate_fake_shop", "--products", "500", "--users", "50", "--reviews", "500", "--orders", "100"],
+        cwd=BASE_DIR, env=env, check=True, stdout=subprocess.DEVNULL,
+    )
+    subprocess.run(
+        [*manage, "shell", "-c", "from shop.models import SiteConfig; SiteConfig.objects.create(whatsapp_number='+254700000000')"],
+        cwd=BASE_DIR, env=env, check=True, stdout=subprocess.DEVNULL,
+    )
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--memory-mb", type=float, default=512)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--upload-delay", type=float, default=0.5, help="Seconds the fake Cloudinary takes per upload")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--modes", default="wsgi,asgi", help="Comma-separated subset of: wsgi, asgi")
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args()
+
+    upload_server = fake_cloudinary(args.upload_delay)
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        env = prepare_env(workdir, upload_server)
+        print(f"{'mode':<6} {'workers':>7} {'rss MB':>7} {'scenario':<9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6}")
+        for mode in args.modes.split(","):
+            # A warmed-up probe worker sets how many fit in the budget.
+            probe = Server(mode, 1, args.port, env)
+            try:
+                probe.wait()
+                client = Client(probe.url)
+                client.run("catalog", 20, 1)
+                per_worker = max(probe.worker_rss())
+            finally:
+                probe.stop()
+            workers = max(1, int(args.memory_mb // per_worker))
+
+            server = Server(mode, workers, args.port, env)
+            try:
+                server.wait()
+                client = Client(server.url)
+                for scenario in ("catalog", "upload"):
+                    row = client.run(scenario, args.requests, args.concurrency)
+                    rss = round(sum(server.worker_rss()), 1)
+                    row.update(mode=mode, scenario=scenario, workers=workers, rss_mb=rss)
+                    results.append(row)
+                    print(
+                        f"{mode:<6} {workers:>7} {rss:>7.0f} {scenario:<9} {row['rps']:>8.1f} "
+                        f"{row['p50_ms'] or 0:>8.1f} {row['p95_ms'] or 0:>8.1f} {row['errors']:>6}"
+                    )
+            finally:
+                server.stop()
+    upload_server.shutdown()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "memory_mb": args.memory_mb, "concurrency": args.concurrency,
+                "upload_delay": args.upload_delay, "results": results,
+            }, f, indent=2)
+        print(f"\nSaved {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Catalog list serialization: cached JSON blobs + orjson vs. DRF + stdlib JSON.
+
+    python -m benchmarks.catalog_json [--products 1000] [--seconds 3]
+
+For page sizes 12, 100 and 1000 it reports requests/sec and CPU time per
+request for /api/products/ and /api/products/featured/ through both paths.
+"""
+import argparse
+import time
+
+from benchmarks import setup_django
+
+
+def seed(n_products):
+    from shop.models import Category, Product
+
+    categories = Category.objects.bulk_create(
+        [Category(name=f"Bench category {i}", slug=f"bench-category-{i}") for i in range(10)]
+    )
+    Product.objects.bulk_create(
+        [
+            Product(
+                name=f"Bench speaker {i}",
+                slug=f"bench-speaker-{i}",
+                description="Deep bass, crisp highs. " * 8,
+                price=1000 + i,
+                old_price=1500 + i if i % 3 == 0 else None,
+                watts=50 + i % 500,
+                stock=i % 7,
+                featured=True,
+                badge_type=["", "new", "sale", "best"][i % 4],
+                category=categories[i % len(categories)],
+            )
+            for i in range(n_products)
+        ],
+        batch_size=500,
+    )
+
+
+def measure(view, path, seconds):
+    from rest_framework.test import APIRequestFactory
+
+    factory = APIRequestFactory()
+    view(factory.get(path)).render()  # warm up (fills the blob cache)
+
+    count = 0
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    while time.perf_counter() - wall_start < seconds:
+        response = view(factory.get(path))
+        response.render()
+        count += 1
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    return count / wall, cpu / count * 1000, len(response.content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    setup_django()
+    seed(args.products)
+
+    from rest_framework.pagination import PageNumberPagination
+    from rest_framework.renderers import JSONRenderer
+    from shop.api_views import ProductView
+
+    print(f"{'endpoint':<10} {'page':>5} {'path':<13} {'req/s':>9} {'cpu ms/req':>11} {'bytes':>9}")
+    for page_size in (12, 100, 1000):
+        pagination = type("BenchPagination", (PageNumberPagination,), {"page_size": page_size})
+        paths = {
+            "drf+json": dict(use_json_blobs=False, renderer_classes=[JSONRenderer], pagination_class=pagination),
+            "blobs+orjson": dict(pagination_class=pagination),
+        }
+        for endpoint, url in (("list", "/api/products/"), ("featured", "/api/products/featured/")):
+            results = {}
+            for name, initkwargs in paths.items():
+                view = ProductView.as_view({"get": endpoint}, **initkwargs)
+                results[name] = measure(view, url, args.seconds)
+                rps, cpu_ms, size = results[name]
+                print(f"{endpoint:<10} {page_size:>5} {name:<13} {rps:>9.1f} {cpu_ms:>11.2f} {size:>9}")
+            speedup = results["blobs+orjson"][0] / results["drf+json"][0]
+            print(f"{'':<10} {'':>5} {'speedup':<13} {speedup:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+"""
+Latency and throughput of the main storefront and API routes.
+
+    python -m benchmarks.routes run [--sizes 100,1000,5000] [--requests 200] [--output run.json]
+    python -m benchmarks.routes run --target http://127.0.0.1:8000 [--concurrency 4]
+    python -m benchmarks.routes compare base.json new.json [--threshold 10]
+
+`run` seeds a throwaway test database at each catalog size and drives the
+routes in-process through the Django test client (full middleware stack),
+reporting p50/p95/p99 latency, requests/sec and queries per request. With
+--target it instead sends anonymous GETs to a running server (e.g. a local
+gunicorn) over HTTP; its database is used as-is and queries are not counted.
+
+Results are written as JSON; `compare` matches two runs by (route, size)
+and exits with status 1 when p50/p95 got slower by more than --threshold
+percent or a route issues more queries than before.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from benchmarks import setup_django
+
+CART_ITEMS = 5
+
+
+# -------------------------------------------------------------------
+# Routes
+# -------------------------------------------------------------------
+
+class Route:
+    """One benchmarked request. `login` routes run as the bench customer."""
+
+    def __init__(self, name, path, method="GET", login=False, data=None, cart=False, mutates=False):
+        self.name = name
+        self.path = path
+        self.method = method
+        self.login = login
+        self.data = data
+        self.cart = cart        # fill the cart before each request
+        self.mutates = mutates  # roll back after each request
+
+    @property
+    def http_safe(self):
+        return self.method == "GET" and not self.login
+
+
+def default_routes(world):
+    return [
+        Route("home", "/"),
+        Route("product_list", "/products/"),
+        Route("product_detail", f"/products/{world['product'].slug}/"),
+        Route("search_products", "/search/?q=speaker"),
+        Route("checkout_view", "/checkout/", login=True, cart=True),
+        Route(
+            "place_order", "/order/place/", method="POST", login=True, cart=True, mutates=True,
+            data={"address_id": world["address"].pk},
+        ),
+        Route(
+            "cart_api_add", f"/cart/api/add/{world['product'].pk}/?fragment=1", method="POST",
+            cart=True, mutates=True,
+        ),
+        Route("api_products", "/api/products/"),
+        Route("api_products_100", "/api/products/?page_size=100"),
+        Route("api_product_detail", f"/api/products/{world['product'].slug}/"),
+    ]
+
+
+# -------------------------------------------------------------------
+# Seeding (in-process mode)
+# -------------------------------------------------------------------
+
+def grow_catalog(world, size):
+    """Grow the bench catalog to `size` products (sizes are run in ascending order)."""
+    from shop.tests.factories import make_categories, make_orders, make_products, make_reviews, make_users
+
+    if not world:
+        from django.contrib.auth import get_user_model
+        from shop.models import SiteConfig
+
+        world["categories"] = make_categories(10, prefix="Bench")
+        world["customer"] = get_user_model().objects.create_user(
+            "bench", "bench@example.com", "bench", first_name="Bench", last_name="User",
+        )
+        world["reviewers"] = make_users(20, prefix="bench-reviewer")
+        world["products"] = []
+        SiteConfig.objects.create(whatsapp_number="+254700000000")
+
+    count = size - len(world["products"])
+    if count > 0:
+        products = make_products(
+            count, world["categories"], prefix=f"speaker-{size}", images=1,
+            description="Deep bass, crisp highs. " * 8,
+        )
+        make_reviews(products[:50], world["reviewers"], per_product=2)
+        world["orders"] = make_orders([world["customer"]] * 5, products, items=3)
+        world["products"] += products
+    world["product"] = world["products"][0]
+    world["address"] = world["orders"][0].address
+    return world
+
+
+# -------------------------------------------------------------------
+# Measurement
+# -------------------------------------------------------------------
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(route, size, durations, wall, queries):
+    durations = sorted(durations)
+    ms = lambda v: round(v * 1000, 3) if v is not None else None
+    return {
+        "route": route.name,
+        "size": size,
+        "requests": len(durations),
+        "rps": round(len(durations) / wall, 2) if wall else None,
+        "p50_ms": ms(percentile(durations, 50)),
+        "p95_ms": ms(percentile(durations, 95)),
+        "p99_ms": ms(percentile(durations, 99)),
+        "mean_ms": ms(sum(durations) / len(durations)) if durations else None,
+        "queries": queries,
+    }
+
+
+class InProcessRunner:
+    def __init__(self, world):
+        from django.test import Client
+
+        self.world = world
+        self.anon = Client()
+        self.customer = Client()
+        self.customer.force_login(world["customer"])
+
+    def fill_cart(self, route):
+        from django.conf import settings
+
+        from shop.models import CartLine
+
+        products = self.world["products"][:CART_ITEMS]
+        if route.login:
+            CartLine.objects.upsert(self.world["customer"].pk, {p.pk: 1 for p in products}, increment=False)
+            return
+        session = self.anon.session
+        session[settings.CART_SESSION_ID] = [[p.pk, 1] for p in products]
+        session.save()
+
+    def client_for(self, route):
+        return self.customer if route.login else self.anon
+
+    def request(self, route):
+        if route.cart:
+            self.fill_cart(route)
+        return self.send(route)
+
+    def send(self, route):
+        from django.db import transaction
+
+        call = getattr(self.client_for(route), route.method.lower())
+        if route.mutates:
+            with transaction.atomic():
+                start = time.perf_counter()
+                response = call(route.path, route.data or {})
+                elapsed = time.perf_counter() - start
+                transaction.set_rollback(True)
+        else:
+            start = time.perf_counter()
+            response = call(route.path, route.data or {})
+            elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise RuntimeError(f"{route.name}: HTTP {response.status_code}")
+        return elapsed
+
+    def count_queries(self, route):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        if route.cart:
+            self.fill_cart(route)
+        with CaptureQueriesContext(connection) as ctx:
+            self.send(route)
+        return len(ctx)
+
+    def run(self, route, size, n_requests, warmup):
+        for _ in range(warmup):
+            self.request(route)
+        queries = self.count_queries(route)
+        durations = []
+        wall_start = time.perf_counter()
+        for _ in range(n_requests):
+            durations.append(self.request(route))
+        wall = time.perf_counter() - wall_start
+        if route.cart or route.mutates:
+            # Exclude cart set-up and rollbacks from throughput.
+            wall = sum(durations)
+        return summarize(route, size, durations, wall, queries)
+
+
+class HttpRunner:
+    def __init__(self, target, concurrency):
+        import requests
+
+        self.target = target.rstrip("/")
+        self.concurrency = concurrency
+        self.local = threading.local()
+        self.requests = requests
+
+    def session(self):
+        if not hasattr(self.local, "session"):
+            self.local.session = self.requests.Session()
+        return self.local.session
+
+    def request(self, route):
+        start = time.perf_counter()
+        response = self.session().get(self.target + route.path, allow_redirects=False)
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise RuntimeError(f"{route.name}: HTTP {response.status_code}")
+        return elapsed
+
+    def run(self, route, size, n_requests, warmup):
+        for _ in range(warmup):
+            self.request(route)
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            durations = list(pool.map(lambda _: self.request(route), range(n_requests)))
+        wall = time.perf_counter() - wall_start
+        return summarize(route, size, durations, wall, None)
+
+
+# -------------------------------------------------------------------
+# Commands
+# -------------------------------------------------------------------
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_row(row):
+    queries = "-" if row["queries"] is None else row["queries"]
+    size = "-" if row["size"] is None else row["size"]
+    print(
+        f"{row['route']:<20} {size:>6} {row['rps']:>9.1f} {row['p50_ms']:>9.2f} "
+        f"{row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {queries:>8}"
+    )
+
+
+def run(args):
+    selected = set(args.routes.split(",")) if args.routes else None
+    results = []
+    header = f"{'route':<20} {'size':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}"
+
+    if args.target:
+        from types import SimpleNamespace
+
+        # Only anonymous GETs; paths that need an object use --product-slug.
+        world = {"product": SimpleNamespace(slug=args.product_slug), "address": SimpleNamespace(pk=0)}
+        routes = [r for r in default_routes(world) if r.http_safe]
+        if not args.product_slug:
+            routes = [r for r in routes if "detail" not in r.name]
+        runner = HttpRunner(args.target, args.concurrency)
+        sizes = [None]
+    else:
+        setup_django()
+        import cloudinary
+        from django.conf import settings
+
+        # Image URLs are built locally; nothing is uploaded or fetched.
+        cloudinary.config(cloud_name=cloudinary.config().cloud_name or "bench")
+        settings.SECURE_SSL_REDIRECT = False
+        settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, "testserver"]
+        sizes = sorted(int(s) for s in args.sizes.split(","))
+        world = {}
+
+    print(header)
+    for size in sizes:
+        if size is not None:
+            grow_catalog(world, size)
+            runner = InProcessRunner(world)
+            routes = default_routes(world)
+        for route in routes:
+            if selected and route.name not in selected:
+                continue
+            row = runner.run(route, size, args.requests, args.warmup)
+            results.append(row)
+            print_row(row)
+
+    if args.output:
+        payload = {
+            "meta": {
+                "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "revision": git_revision(),
+                "mode": "http" if args.target else "in-process",
+                "target": args.target,
+                "concurrency": args.concurrency if args.target else 1,
+                "requests": args.requests,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as fh:
+            json.dump(payload, fh, indent=2)
+        print(f"\nSaved {len(results)} results to {args.output}")
+
+
+def compare(args):
+    with open(args.base) as fh:
+        base = json.load(fh)
+    with open(args.new) as fh:
+        new = json.load(fh)
+    before = {(r["route"], r["size"]): r for r in base["results"]}
+
+    print(f"base {base['meta'].get('revision')} → new {new['meta'].get('revision')}  (threshold {args.threshold}%)\n")
+    print(f"{'route':<20} {'size':>6} {'p50 ms':>17} {'p95 ms':>17} {'queries':>9}  ")
+    regressions = 0
+    for row in new["results"]:
+        old = before.get((row["route"], row["size"]))
+        if old is None:
+            continue
+        flags = []
+        cells = []
+        for key in ("p50_ms", "p95_ms"):
+            change = (row[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            cells.append(f"{row[key]:>8.2f} {change:>+7.1f}%")
+            if change > args.threshold:
+                flags.append(f"{key} +{change:.0f}%")
+        if row["queries"] is not None and old["queries"] is not None and row["queries"] > old["queries"]:
+            flags.append(f"queries {old['queries']}→{row['queries']}")
+        queries = "-" if row["queries"] is None else row["queries"]
+        status = "REGRESSION: " + ", ".join(flags) if flags else ""
+        size = "-" if row["size"] is None else row["size"]
+        print(f"{row['route']:<20} {size:>6} {cells[0]} {cells[1]} {queries:>9}  {status}")
+        regressions += bool(flags)
+
+    print(f"\n{regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Benchmark the routes")
+    run_parser.add_argument("--sizes", default="100,1000,5000", help="Catalog sizes (products), comma separated")
+    run_parser.add_argument("--requests", type=int, default=200, help="Timed requests per route and size")
+    run_parser.add_argument("--warmup", type=int, default=10, help="Untimed requests first")
+    run_parser.add_argument("--routes", help="Only these route names, comma separated")
+    run_parser.add_argument("--output", help="Write results to this JSON file")
+    run_parser.add_argument("--target", help="Base URL of a running server instead of in-process")
+    run_parser.add_argument("--concurrency", type=int, default=1, help="Parallel clients (with --target)")
+    run_parser.add_argument("--product-slug", help="Product used by detail routes (with --target)")
+
+    compare_parser = sub.add_parser("compare", help="Diff two result files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="Allowed slowdown in percent")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Gunicorn settings, read from the working directory for both Procfile
+processes (sync workers on rian_backend.wsgi, uvicorn workers on
+rian_backend.asgi). Worker count comes from WEB_CONCURRENCY.
+
+The app is preloaded in the master and warmed up there (shop.warmup)
+before workers are forked, so a fresh worker serves its first request
+as fast as its thousandth. Set GUNICORN_PRELOAD=0 to load the app in each
+worker instead (e.g. with --reload); workers then warm up themselves.
+"""
+import os
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+
+def when_ready(server):
+    # Runs in the master after the preload, before the first fork.
+    if server.cfg.preload_app:
+        from shop.warmup import warm_up
+
+        warm_up()
+
+
+def child_exit(server, worker):
+    # Runs in the master for every worker that exits, including killed ones.
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "rian_backend.settings")
+    from shop import metrics
+
+    metrics.retire(worker.pid)
+
+
+def post_worker_init(worker):
+    from django.conf import settings
+    from shop.warmup import connect, warm_up
+
+    if not worker.cfg.preload_app:
+        warm_up(freeze=False)
+    if settings.SERVER_MODE == "wsgi":
+        # Sync workers serve from this thread; under ASGI connections are
+        # opened per request by the executor threads.
+        connect()
@@ -2,6 +2,13 @@
 ASGI config for rian_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The default deployment is WSGI; this entry point is for upload-heavy setups
+(see the web-asgi process in Procfile):
+
+    gunicorn rian_backend.asgi:application -k uvicorn.workers.UvicornWorker
+
+Static files are not served here: WhiteNoise is WSGI-only, so point
+STATIC_URL at a CDN or let the reverse proxy serve STATIC_ROOT.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -9,8 +16,9 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
-
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rian_backend.settings')
+os.environ.setdefault('SERVER_MODE', 'asgi')
+
+from django.core.asgi import get_asgi_application  # noqa: E402
 
 application = get_asgi_application()
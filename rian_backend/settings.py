@@ -4,7 +4,6 @@ from pathlib import Path
 from dotenv import load_dotenv
 import dj_database_url
 from django.contrib.messages import constants as messages
-import cloudinary
 
 load_dotenv()
 
@@ -46,10 +45,21 @@ INSTALLED_APPS = [
     "shop",
 ]
 
+# ------------------------------
+# Serving mode: "wsgi" (gunicorn sync workers, the default) or "asgi"
+# (uvicorn workers, set by rian_backend/asgi.py). Only the image upload
+# views are async; they run on the event loop only when the whole
+# middleware stack is async capable.
+# ------------------------------
+SERVER_MODE = os.getenv("SERVER_MODE", "wsgi")
+
 # ------------------------------
 # Middleware
 # ------------------------------
 MIDDLEWARE = [
+    "shop.middleware.SlowQueryMiddleware",  # attributes slow queries (incl. session saves) to the view
+    "shop.middleware.MetricsMiddleware",  # latency covers the whole stack
+    "shop.middleware.MemoryMiddleware",  # no-op unless MEMORY_PROFILING_ENABLED
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # serve static files
@@ -57,15 +67,21 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "shop.middleware.ProfilingMiddleware",  # no-op unless PROFILING_ENABLED
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
+if SERVER_MODE == "asgi":
+    # WhiteNoise is sync-only and would pin a thread per request. Serve
+    # STATIC_ROOT from the reverse proxy or a CDN (STATIC_URL) instead.
+    MIDDLEWARE.remove("whitenoise.middleware.WhiteNoiseMiddleware")
 
 # ------------------------------
 # URLs & WSGI
 # ------------------------------
 ROOT_URLCONF = "rian_backend.urls"
 WSGI_APPLICATION = "rian_backend.wsgi.application"
+ASGI_APPLICATION = "rian_backend.asgi.application"
 
 # ------------------------------
 # Templates
@@ -105,10 +121,46 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if DATABASE_URL:
     DATABASES["default"] = dj_database_url.config(
         default=DATABASE_URL,
-        conn_max_age=600,
+        # Persistent connections are per thread; ASGI runs ORM calls in
+        # short-lived executor threads, so connect per request there.
+        conn_max_age=0 if SERVER_MODE == "asgi" else 600,
         ssl_require=not DEBUG,  # require SSL in production
     )
 
+# ------------------------------
+# Cache (per-process memory by default, Redis when REDIS_URL is set)
+# ------------------------------
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "rian-audio",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+# Longest a cached copy of admin-edited data (promotion rules, categories,
+# site config) is served. Saves only clear the cache of the process that
+# made them, so with per-process caches other workers catch up after this.
+CACHE_MAX_STALE_SECONDS = int(os.getenv("CACHE_MAX_STALE_SECONDS", 3600 if REDIS_URL else 60))
+
+# ------------------------------
+# Sessions (shop.sessions: cache first, database behind)
+# ------------------------------
+SESSION_ENGINE = "shop.sessions"
+# Updates reach the database in batches this often. Needs a cache shared by
+# all workers, so it stays off (write-through) with the per-process default.
+SESSION_WRITE_BEHIND_SECONDS = int(os.getenv("SESSION_WRITE_BEHIND_SECONDS", 30 if REDIS_URL else 0))
+SESSION_PRUNE_INTERVAL = int(os.getenv("SESSION_PRUNE_INTERVAL", 3600))  # seconds between expired-row sweeps
+SESSION_PRUNE_BATCH = 1000
+
 # ------------------------------
 # Password validation
 # ------------------------------
@@ -131,24 +183,20 @@ USE_TZ = True
 # ------------------------------
 # Static & Media
 # ------------------------------
-STATIC_URL = "/static/"
+STATIC_URL = os.getenv("STATIC_URL", "/static/")  # a CDN origin in ASGI mode
 STATIC_ROOT = BASE_DIR / "staticfiles"
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 # ------------------------------
 # Cloudinary
 # ------------------------------
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
-
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
-)
-
-
+# Applied with cloudinary.config() in ShopConfig.ready(); the SDK's admin
+# API module is imported only where it is used.
+CLOUDINARY = {
+    "cloud_name": os.getenv("CLOUDINARY_CLOUD_NAME"),
+    "api_key": os.getenv("CLOUDINARY_API_KEY"),
+    "api_secret": os.getenv("CLOUDINARY_API_SECRET"),
+}
 
 # All media uploads go to Cloudinary
 DEFAULT_FILE_STORAGE = "cloudinary_storage.storage.MediaCloudinaryStorage"
@@ -174,6 +222,12 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "shop.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    # Small collections only; products, orders, reviews and testimonials use
+    # shop.pagination.CursorOrPagePagination (keyset cursors, ?page= opt-in).
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 12,
 }
@@ -254,6 +308,8 @@ JAZZMIN_SETTINGS = {
         "shop.Address": "fas fa-map-marker-alt",
         "shop.ContactMessage": "fas fa-envelope",
         "shop.NewsletterSubscription": "fas fa-paper-plane",
+        "shop.NewsletterCampaign": "fas fa-mail-bulk",
+        "shop.OutboxEmail": "fas fa-inbox",
         "shop.Testimonial": "fas fa-comment-dots",
         "shop.SiteConfig": "fas fa-cogs",
         "auth.User": "fas fa-user",
@@ -287,6 +343,116 @@ JAZZMIN_UI_TWEAKS = {
     },
 }
 
+# ------------------------------
+# Email
+# ------------------------------
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
+EMAIL_HOST = os.getenv("EMAIL_HOST", "localhost")
+EMAIL_PORT = int(os.getenv("EMAIL_PORT", "25"))
+EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
+EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "0") == "1"
+EMAIL_TIMEOUT = int(os.getenv("EMAIL_TIMEOUT", "30"))
+DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "Rian Audio Sounds <no-reply@rian-audio.onrender.com>")
+
+# ------------------------------
+# Transactional email outbox (drained by `manage.py process_outbox`)
+# ------------------------------
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))   # then dead-lettered
+OUTBOX_BACKOFF_BASE = 30     # seconds before the first retry, doubled each attempt
+OUTBOX_BACKOFF_MAX = 3600    # cap between retries
+
+# ------------------------------
+# Newsletter campaigns
+# ------------------------------
+NEWSLETTER_BATCH_SIZE = int(os.getenv("NEWSLETTER_BATCH_SIZE", "500"))   # recipients per chunk
+NEWSLETTER_RATE_LIMIT = float(os.getenv("NEWSLETTER_RATE_LIMIT", "5"))   # messages per second
+NEWSLETTER_CONNECTIONS = int(os.getenv("NEWSLETTER_CONNECTIONS", "2"))   # reused SMTP connections
+NEWSLETTER_LEASE_SECONDS = 600  # a run renews its claim after every chunk; must outlast one chunk
+
+# ------------------------------
+# Catalog
+# ------------------------------
+PRODUCT_BULK_MAX_ROWS = 5000  # rows accepted by POST /api/products/bulk/
+
+# ------------------------------
+# Sync feed (/api/sync/...)
+# ------------------------------
+SYNC_PAGE_SIZE = 500
+SYNC_SETTLE_SECONDS = 5    # rows younger than this wait for the next poll
+SYNC_TOMBSTONE_DAYS = 30   # deletion log retention; older cursors must resync
+
+# ------------------------------
+# Metrics (/metrics, Prometheus text format)
+# ------------------------------
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_DIR = os.getenv("METRICS_DIR", "")  # shared by all workers; defaults to <tmp>/rian-metrics
+METRICS_FLUSH_INTERVAL = 5  # seconds between per-worker snapshot writes
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")  # bearer token for the scraper (staff sessions also work)
+
+# ------------------------------
+# Slow query log (shop.slow_queries; report in the admin under "Slow queries")
+# ------------------------------
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "250"))  # 0 disables
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", "0.1"))  # fraction EXPLAINed
+# JSON lines go to the "shop.slow_queries" logger (INFO); set a path to also
+# write them to a rotating file (the filesystem may be read-only on the host).
+SLOW_QUERY_LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE", "")
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 5
+
+# ------------------------------
+# Memory instrumentation (shop.memory; `manage.py memory_report`)
+# ------------------------------
+MEMORY_PROFILING_ENABLED = os.getenv("MEMORY_PROFILING_ENABLED", "0") == "1"
+MEMORY_SAMPLE_RATE = float(os.getenv("MEMORY_SAMPLE_RATE", "0.05"))  # requests traced with tracemalloc
+MEMORY_TRACE_COMMANDS = os.getenv("MEMORY_TRACE_COMMANDS", "0") == "1"  # tracemalloc slows ORM-heavy commands 10x+
+MEMORY_TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", "12"))  # more frames reach further, run slower
+MEMORY_SAMPLE_INTERVAL = 0.05  # seconds between peak checks while tracing
+MEMORY_TOP_SITES = 10
+MEMORY_WARN_MB = float(os.getenv("MEMORY_WARN_MB", "50"))  # log a warning above this
+# JSON lines go to the "shop.memory.records" logger (INFO); set a path to also
+# write them to a rotating file, which `manage.py memory_report` reads.
+MEMORY_LOG_FILE = os.getenv("MEMORY_LOG_FILE", "")
+MEMORY_LOG_MAX_BYTES = 10 * 1024 * 1024
+MEMORY_LOG_BACKUPS = 3
+
+# ------------------------------
+# Request profiling (Server-Timing header + "shop.profiling" log line)
+# ------------------------------
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0.01"))  # fraction of all requests
+PROFILING_STAFF = True  # always profile staff users
+
+# ------------------------------
+# Worker warm-up (shop.warmup, run from gunicorn.conf.py before forking)
+# ------------------------------
+WARMUP_PATHS = ["/", "/products/"]  # requested in-process so first-request work is done once
+
+# ------------------------------
+# Startup import budget (manage.py import_budget)
+# ------------------------------
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "450"))  # cumulative -X importtime of django.setup()
+# Imported on first use, never by django.setup(); the command fails if one is.
+STARTUP_LAZY_MODULES = [
+    "openpyxl",
+    "httpx",
+    "cloudinary.api",
+    "rest_framework_simplejwt.authentication",
+    # The API urlconfs load with the site urlconf, never at setup.
+    "shop.api_urls",
+    "shop.auth_urls",
+    "shop.api_views",
+    "rest_framework.routers",
+    "rest_framework_simplejwt.views",
+]
+
+# ------------------------------
+# Reviews
+# ------------------------------
+REVIEWS_PAGE_SIZE = 10  # reviews per "page" on the product detail page
+
 # ------------------------------
 # Cart
 # ------------------------------
@@ -2,17 +2,17 @@ import csv
 import datetime
 from django.http import HttpResponse
 from django.contrib import admin
+from django.utils import timezone
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
-from openpyxl import Workbook
 from django.contrib.auth.admin import UserAdmin
 from .models import CustomUser
 
 from .models import (
     Category, Product, ProductImage, Review,
-    Order, OrderItem, Address,
+    Order, OrderItem, Address, Promotion,
     NewsletterSubscription, ContactMessage, Testimonial,
-    SiteConfig
+    SiteConfig, NewsletterCampaign, CampaignDelivery, OutboxEmail, SlowQuery
 )
 
 # -----------------------
@@ -52,6 +52,8 @@ def export_as_excel_action(description="Export selected objects as Excel",
                            fields=None, exclude=None, header=True):
     """Reusable admin action to export objects as Excel (.xlsx)."""
     def export_as_excel(modeladmin, request, queryset):
+        from openpyxl import Workbook  # ~100 ms to import; only exports need it
+
         opts = modeladmin.model._meta
         field_names = [field.name for field in opts.fields]
 
@@ -164,6 +166,7 @@ class ProductAdmin(admin.ModelAdmin):
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ("product", "user", "rating", "created_at")
+    list_select_related = ("product", "user")
     search_fields = ("product__name", "user__username", "text")
     list_filter = ("rating", "created_at")
     date_hierarchy = "created_at"
@@ -176,13 +179,14 @@ class OrderItemInline(admin.TabularInline):
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ("id", "user", "colored_status", "total", "customer_whatsapp_link", "admin_whatsapp_link", "created_at")
+    list_display = ("id", "user", "colored_status", "total", "discount", "customer_whatsapp_link", "admin_whatsapp_link", "created_at")
+    list_select_related = ("user", "address")
     list_filter = ("status", "created_at")
     search_fields = ("id", "user__username", "whatsapp_number", "address__full_name")
     inlines = [OrderItemInline]
     ordering = ("-created_at",)
     list_editable = ("total",)
-    readonly_fields = ("total",)
+    readonly_fields = ("total", "discount")
     date_hierarchy = "created_at"
 
     actions = [
@@ -235,9 +239,33 @@ class OrderAdmin(admin.ModelAdmin):
         form.instance.recalc_total()
 
 
+@admin.register(Promotion)
+class PromotionAdmin(admin.ModelAdmin):
+    list_display = ("name", "kind", "rule_summary", "active", "starts_at", "ends_at")
+    list_filter = ("kind", "active")
+    list_editable = ("active",)
+    search_fields = ("name",)
+    filter_horizontal = ("products", "categories")
+    fieldsets = (
+        (None, {"fields": ("name", "kind", "active", ("starts_at", "ends_at"))}),
+        ("Rule", {"fields": ("percent", "amount_off", ("buy_qty", "get_qty"), "min_subtotal")}),
+        ("Applies to (leave both empty for every product)", {"fields": ("products", "categories")}),
+    )
+
+    def rule_summary(self, obj):
+        if obj.kind == "percent":
+            return f"{obj.percent}% off"
+        if obj.kind == "bogo":
+            return f"Buy {obj.buy_qty} get {obj.get_qty} free"
+        off = " + ".join(filter(None, [f"KES {obj.amount_off}" if obj.amount_off else "", f"{obj.percent}%" if obj.percent else ""]))
+        return f"{off} off from KES {obj.min_subtotal}"
+    rule_summary.short_description = "Rule"
+
+
 @admin.register(Address)
 class AddressAdmin(admin.ModelAdmin):
     list_display = ("user", "full_name", "phone", "city", "created_at")
+    list_select_related = ("user",)
     search_fields = ("user__username", "full_name", "phone", "city")
     ordering = ("-created_at",)
     date_hierarchy = "created_at"
@@ -288,6 +316,61 @@ class NewsletterSubscriptionAdmin(admin.ModelAdmin):
     remove_duplicates.short_description = "Remove duplicate subscriptions"
 
 
+@admin.register(NewsletterCampaign)
+class NewsletterCampaignAdmin(admin.ModelAdmin):
+    list_display = ("subject", "status", "sent_count", "failed_count", "started_at", "finished_at", "created_at")
+    list_filter = ("status", "created_at")
+    search_fields = ("subject",)
+    ordering = ("-created_at",)
+    readonly_fields = (
+        "status", "last_subscription_id", "sent_count", "failed_count", "started_at", "finished_at",
+        "lease_owner", "lease_expires_at",
+    )
+    date_hierarchy = "created_at"
+
+    actions = ["queue_for_sending"]
+
+    def queue_for_sending(self, request, queryset):
+        """Hand campaigns to the `send_newsletter` command instead of sending in the request."""
+        updated = queryset.filter(status__in=["draft", "failed"]).update(status="queued")
+        self.message_user(
+            request,
+            f"{updated} campaign(s) queued. Run `manage.py send_newsletter` to deliver them."
+        )
+
+    queue_for_sending.short_description = "Queue selected campaigns for sending"
+
+
+@admin.register(CampaignDelivery)
+class CampaignDeliveryAdmin(admin.ModelAdmin):
+    list_display = ("email", "campaign", "status", "sent_at", "error")
+    list_filter = ("status", "campaign")
+    search_fields = ("email",)
+    list_select_related = ("campaign",)
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ("to_email", "kind", "subject", "status", "attempts", "next_attempt_at", "sent_at", "created_at")
+    list_filter = ("status", "kind", "created_at")
+    search_fields = ("to_email", "subject")
+    ordering = ("-created_at",)
+    readonly_fields = ("attempts", "last_error", "sent_at")
+    exclude = ("body_text", "body_html")  # may hold password reset links
+    date_hierarchy = "created_at"
+
+    actions = ["requeue"]
+
+    def requeue(self, request, queryset):
+        """Give dead-lettered emails a fresh set of attempts."""
+        updated = queryset.exclude(status="sent").update(
+            status="pending", attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f"{updated} email(s) re-queued.")
+
+    requeue.short_description = "Re-queue selected emails"
+
+
 @admin.register(ContactMessage)
 class ContactMessageAdmin(admin.ModelAdmin):
     list_display = ("name", "email", "subject", "created_at")
@@ -296,6 +379,38 @@ class ContactMessageAdmin(admin.ModelAdmin):
     date_hierarchy = "created_at"
 
 
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    """Slow statements grouped by fingerprint, costliest call sites first."""
+    list_display = ("call_site", "count", "total_ms_display", "avg_ms", "max_ms_display", "short_sql", "last_seen")
+    list_filter = ("last_seen",)
+    search_fields = ("call_site", "sql", "source")
+    ordering = ("-total_ms",)
+    readonly_fields = [f.name for f in SlowQuery._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def total_ms_display(self, obj):
+        return f"{obj.total_ms:,.0f}"
+
+    def avg_ms(self, obj):
+        return f"{obj.total_ms / obj.count:,.1f}" if obj.count else "-"
+
+    def max_ms_display(self, obj):
+        return f"{obj.max_ms:,.0f}"
+
+    def short_sql(self, obj):
+        return obj.sql[:120] + ("…" if len(obj.sql) > 120 else "")
+
+    total_ms_display.short_description = "Total ms"
+    total_ms_display.admin_order_field = "total_ms"
+    avg_ms.short_description = "Avg ms"
+    max_ms_display.short_description = "Max ms"
+    max_ms_display.admin_order_field = "max_ms"
+    short_sql.short_description = "SQL"
+
+
 @admin.register(SiteConfig)
 class SiteConfigAdmin(admin.ModelAdmin):
     list_display = ("whatsapp_number", "support_email")
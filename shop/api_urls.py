@@ -0,0 +1,44 @@
+"""
+API routes, mounted at /api/ by shop.urls. Kept out of shop.urls so the
+site urlconf does not import DRF, simplejwt and shop.api_views itself;
+they load with this module (see STARTUP_LAZY_MODULES).
+"""
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+
+from . import api_views
+
+# ------------------------------
+# DRF API Router
+# ------------------------------
+router = DefaultRouter()
+router.register("categories", api_views.CategoryView, basename="category")
+router.register("products", api_views.ProductView, basename="product")
+router.register("reviews", api_views.ReviewView, basename="review")
+router.register("orders", api_views.OrderView, basename="order")
+router.register("addresses", api_views.AddressView, basename="address")
+router.register("testimonials", api_views.TestimonialViewSet, basename="testimonial")
+router.register("newsletter", api_views.NewsletterViewSet, basename="newsletter")
+router.register("contacts", api_views.ContactMessageViewSet, basename="contact")
+router.register("sync/products", api_views.ProductSyncView, basename="sync-product")
+router.register("sync/categories", api_views.CategorySyncView, basename="sync-category")
+
+# ------------------------------
+# URL Patterns
+# ------------------------------
+urlpatterns = [
+    # ---------- Product Image Upload ----------
+    path(
+        "products/<int:product_pk>/upload-image/",
+        api_views.product_image_upload,
+        name="product_image_upload",
+    ),
+    path(
+        "products/<int:product_pk>/delete-image/<int:pk>/",
+        api_views.ProductImageUploadView.as_view({"delete": "destroy"}),
+        name="product_image_delete",
+    ),
+
+    # ---------- API Router ----------
+    path("", include(router.urls)),
+]
@@ -0,0 +1,393 @@
+"""
+REST API views (DRF and simplejwt). Kept out of shop.views so the HTML
+pages, and anything else importing them, do not load the API stack.
+"""
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Prefetch
+from django.shortcuts import aget_object_or_404, get_object_or_404
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+# DRF
+from rest_framework import viewsets, permissions, filters, status, mixins
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework.filters import OrderingFilter
+
+# Models
+from .models import (
+    Address, Category, ContactMessage, NewsletterSubscription, Order, OrderItem,
+    Product, ProductImage, Review, Testimonial,
+)
+
+# Serializers
+from .serializers import (
+    CategorySerializer, ProductSerializer, ProductListSerializer, ProductImageSerializer,
+    ReviewSerializer, OrderSerializer, AddressSerializer,
+    NewsletterSubscriptionSerializer, ContactMessageSerializer,
+    TestimonialSerializer, ProductSyncSerializer, CategorySyncSerializer
+)
+
+from .caches import product_json_blobs
+from .catalog import bulk_upsert_products
+from .pagination import CursorOrPagePagination
+from .renderers import ORJSONRenderer
+from .sync import sync_page
+from .uploads import UploadError, upload_resource
+from .views import REVIEW_ORDERING, ImageUploadForm, _json
+
+
+class MeView(APIView):
+    permission_classes = [IsAuthenticated]
+    def get(self, request):
+        user = request.user
+        return Response({
+            "id": user.id,
+            "username": user.username,
+            "is_staff": user.is_staff,
+            "email": user.email,
+        })
+
+
+class IsAdminOrReadOnly(permissions.BasePermission):
+    def has_permission(self, request, view):
+        if request.method in permissions.SAFE_METHODS:
+            return True
+        return bool(request.user and request.user.is_staff)
+
+
+class SparseFieldsetMixin:
+    """
+    ?fields= / ?expand= support for read requests.
+
+    - `list_serializer_class` is used for the actions in `list_actions`.
+    - `expand_relations` maps a serializer field to the select_related /
+      prefetch_related lookup it needs; joins happen only when the field is
+      actually in the response.
+    - The SELECT is narrowed with only() to the columns the chosen fields read.
+    """
+    list_serializer_class = None
+    list_actions = ("list",)
+    expand_relations = {}  # field -> ("select_related" | "prefetch_related", *lookups)
+    required_columns = ()  # always loaded, e.g. cache keys
+
+    def _param_set(self, name):
+        raw = self.request.query_params.get(name, "")
+        return {part.strip() for part in raw.split(",") if part.strip()}
+
+    def get_serializer_class(self):
+        if self.list_serializer_class is not None and self.action in self.list_actions:
+            return self.list_serializer_class
+        return super().get_serializer_class()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request is not None and self.request.method in permissions.SAFE_METHODS:
+            context["fields"] = self._param_set("fields")
+            context["expand"] = self._param_set("expand")
+        return context
+
+    def narrow_queryset(self, qs):
+        if self.request is None or self.request.method not in permissions.SAFE_METHODS:
+            # Writes respond with the full representation.
+            for method, *lookups in self.expand_relations.values():
+                qs = getattr(qs, method)(*lookups)
+            return qs
+
+        serializer = self.get_serializer()
+        readable = {name: f for name, f in serializer.fields.items() if not f.write_only}
+
+        for name, (method, *lookups) in self.expand_relations.items():
+            if name in readable:
+                qs = getattr(qs, method)(*lookups)
+
+        concrete = {f.name for f in qs.model._meta.concrete_fields}
+        extra_sources = getattr(serializer.Meta, "field_sources", {})
+        columns = {qs.model._meta.pk.name, *self.required_columns}
+        for name, field in readable.items():
+            for source in extra_sources.get(name) or [field.source.split(".")[0]]:
+                if source in concrete:
+                    columns.add(source)
+        for name, (method, *lookups) in self.expand_relations.items():
+            # select_related() needs its FK columns loaded.
+            if name in readable and method == "select_related":
+                columns.update(lookup.split("__")[0] for lookup in lookups)
+        return qs.only(*columns)
+
+
+class CategoryView(SparseFieldsetMixin, viewsets.ModelViewSet):
+    queryset = Category.objects.all().order_by("name")
+    serializer_class = CategorySerializer
+    permission_classes = [IsAdminOrReadOnly]
+    lookup_field = "slug"
+
+    def get_queryset(self):
+        return self.narrow_queryset(super().get_queryset())
+
+
+class ProductView(SparseFieldsetMixin, viewsets.ModelViewSet):
+    queryset = Product.objects.all().order_by("-created_at")
+    serializer_class = ProductSerializer
+    list_serializer_class = ProductListSerializer
+    list_actions = ("list", "featured")
+    expand_relations = {
+        "category": ("select_related", "category"),
+        "images": ("prefetch_related", "images"),
+    }
+    permission_classes = [IsAdminOrReadOnly]
+    pagination_class = CursorOrPagePagination
+    filter_backends = [filters.SearchFilter, OrderingFilter]
+    search_fields = ["name", "description", "category__name"]
+    ordering_fields = ["price", "watts", "created_at"]
+    ordering = ["-created_at"]
+    lookup_field = "slug"
+    use_json_blobs = True  # serve lists from shop.caches.product_json_blobs
+    required_columns = ("updated_at",)  # part of the product JSON cache key
+
+    def get_queryset(self):
+        qs = self.narrow_queryset(super().get_queryset())
+        params = self.request.query_params
+        if cat := params.get("category"):
+            qs = qs.filter(category__slug=cat)
+        if watts_min := params.get("watts_min"):
+            qs = qs.filter(watts__gte=watts_min)
+        if price_min := params.get("price_min"):
+            qs = qs.filter(price__gte=price_min)
+        if price_max := params.get("price_max"):
+            qs = qs.filter(price__lte=price_max)
+        if params.get("in_stock") in ("1", "true"):
+            qs = qs.filter(stock__gt=0)
+        return qs
+
+    def list(self, request, *args, **kwargs):
+        return self.list_response(self.filter_queryset(self.get_queryset()))
+
+    @action(detail=False, methods=["post"], url_path="bulk", permission_classes=[permissions.IsAdminUser])
+    def bulk(self, request):
+        """
+        Staff-only upsert of many products at once (stock/price sync).
+        Body: a list of rows, or {"rows": [...]}; each row is keyed by
+        `id` or `slug` (or just `name` for a new product).
+        """
+        rows = request.data.get("rows") if isinstance(request.data, dict) else request.data
+        if not isinstance(rows, list):
+            return Response({"detail": "Expected a list of rows."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > settings.PRODUCT_BULK_MAX_ROWS:
+            return Response(
+                {"detail": f"At most {settings.PRODUCT_BULK_MAX_ROWS} rows per request."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        results = bulk_upsert_products(rows)
+        summary = Counter(r["status"] for r in results)
+        return Response({
+            "created": summary["created"],
+            "updated": summary["updated"],
+            "unchanged": summary["unchanged"],
+            "errors": summary["error"],
+            "results": results,
+        })
+
+    @action(detail=False, methods=["get"])
+    def featured(self, request):
+        qs = self.filter_queryset(self.get_queryset()).filter(featured=True)
+        return self.list_response(qs)
+
+    def list_response(self, qs):
+        """
+        Default-representation JSON lists are assembled from cached
+        per-product blobs; sparse/expanded or browsable responses fall back
+        to regular serialization.
+        """
+        use_blobs = (
+            self.use_json_blobs
+            and isinstance(self.request.accepted_renderer, ORJSONRenderer)
+            and not self._param_set("fields")
+            and not self._param_set("expand")
+        )
+        page = self.paginate_queryset(qs)
+        rows = page if page is not None else qs
+        if use_blobs:
+            data = product_json_blobs(rows, self.get_serializer_class(), self.get_serializer_context())
+        else:
+            data = self.get_serializer(rows, many=True).data
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
+class ReviewView(SparseFieldsetMixin, viewsets.ModelViewSet):
+    queryset = Review.objects.all().order_by(*REVIEW_ORDERING)
+    serializer_class = ReviewSerializer
+    expand_relations = {"user": ("select_related", "user")}
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = CursorOrPagePagination
+
+    def get_queryset(self):
+        qs = self.narrow_queryset(super().get_queryset())
+        # ?product=<id or slug> — served by the (product, -created_at) index
+        if product := self.request.query_params.get("product"):
+            if product.isdigit():
+                qs = qs.filter(product_id=product)
+            else:
+                qs = qs.filter(product__slug=product)
+        return qs
+
+
+class AddressView(viewsets.ModelViewSet):
+    serializer_class = AddressSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Address.objects.filter(user=self.request.user).order_by("-created_at")
+
+
+class OrderView(SparseFieldsetMixin, viewsets.ModelViewSet):
+    """
+    Orders with their address and items in a fixed number of queries: one
+    for the page (address joined), one for the items with their product
+    columns, plus one for product images when ?expand=items.product.
+    """
+    serializer_class = OrderSerializer
+    expand_relations = {"address": ("select_related", "address")}
+    permission_classes = [IsAuthenticated]
+    pagination_class = CursorOrPagePagination
+
+    def get_queryset(self):
+        if self.request.user.is_staff:
+            qs = Order.objects.all().order_by("-created_at")
+        else:
+            qs = Order.objects.filter(user=self.request.user).order_by("-created_at")
+        qs = self.narrow_queryset(qs)
+
+        fields = self._param_set("fields") if self.request.method in permissions.SAFE_METHODS else set()
+        if not fields or "items" in fields:
+            qs = qs.prefetch_related(self.items_prefetch())
+        return qs
+
+    def items_prefetch(self):
+        items = OrderItem.objects.select_related("product").order_by("id")
+        full = (
+            self.request.method not in permissions.SAFE_METHODS
+            or "items.product" in self._param_set("expand")
+        )
+        if full:
+            items = items.select_related("product__category").prefetch_related("product__images")
+        else:
+            items = items.only(
+                "id", "order", "product", "qty", "price_each",
+                "product__id", "product__name", "product__main_image",
+            )
+        return Prefetch("items", queryset=items)
+
+
+class ProductImageUploadView(viewsets.ViewSet):
+    permission_classes = [permissions.IsAdminUser]
+
+    def destroy(self, request, product_pk=None, pk=None):
+        image = get_object_or_404(ProductImage, pk=pk, product_id=product_pk)
+        image.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+async def _api_user(request):
+    """The JWT user for a plain (non-DRF) API view, or None."""
+    try:
+        result = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+@csrf_exempt  # JWT-authenticated like the rest of the API
+@require_POST
+async def product_image_upload(request, product_pk):
+    """
+    Add a gallery image (admin only). Async so a slow Cloudinary upload
+    does not tie up a worker; DRF views are sync-only, hence a plain view.
+    """
+    user = await _api_user(request)
+    if user is None:
+        return _json({"detail": "Authentication credentials were not provided."}, 401)
+    if not user.is_staff:
+        return _json({"detail": "You do not have permission to perform this action."}, 403)
+    product = await aget_object_or_404(Product, pk=product_pk)
+
+    form = ImageUploadForm(request.POST, request.FILES)
+    if not form.is_valid():
+        return _json({field: list(errors) for field, errors in form.errors.items()}, 400)
+    try:
+        resource = await upload_resource(form.cleaned_data["image"], folder="products/gallery/")
+    except UploadError as exc:
+        return _json({"image": [str(exc)]}, 502)
+    image = await ProductImage.objects.acreate(product=product, image=resource)
+    return _json(ProductImageSerializer(image).data, 201)
+
+
+class TestimonialViewSet(viewsets.ModelViewSet):
+    queryset = Testimonial.objects.all().order_by("-created_at")
+    serializer_class = TestimonialSerializer
+    permission_classes = [AllowAny]
+    pagination_class = CursorOrPagePagination
+
+
+class NewsletterViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
+    queryset = NewsletterSubscription.objects.all()
+    serializer_class = NewsletterSubscriptionSerializer
+    permission_classes = [AllowAny]
+
+
+class ContactMessageViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
+    queryset = ContactMessage.objects.all()
+    serializer_class = ContactMessageSerializer
+    permission_classes = [AllowAny]
+
+
+class SyncViewSet(SparseFieldsetMixin, viewsets.GenericViewSet):
+    """
+    Delta feed for client mirrors: GET without ?since returns the first page
+    of a full snapshot; afterwards send back the `next` cursor to receive only
+    rows changed since (`results`) and ids deleted since (`deleted`). Keep
+    polling immediately while `has_more` is true. A 410 means the cursor is
+    older than the deletion log and the mirror must be rebuilt.
+    """
+    permission_classes = [AllowAny]
+    pagination_class = None
+    required_columns = ("updated_at",)  # cursor position
+
+    def get_queryset(self):
+        return self.narrow_queryset(super().get_queryset())
+
+    def list(self, request):
+        try:
+            limit = min(int(request.query_params.get("limit", settings.SYNC_PAGE_SIZE)), 1000)
+        except ValueError:
+            limit = settings.SYNC_PAGE_SIZE
+        page = sync_page(self.get_queryset(), request.query_params.get("since"), max(limit, 1))
+        return Response({
+            "results": self.get_serializer(page["rows"], many=True).data,
+            "deleted": page["deleted"],
+            "next": page["next"],
+            "has_more": page["has_more"],
+        })
+
+
+class ProductSyncView(SyncViewSet):
+    queryset = Product.objects.all()
+    serializer_class = ProductSyncSerializer
+    expand_relations = {
+        "category": ("select_related", "category"),
+        "images": ("prefetch_related", "images"),
+    }
+
+
+class CategorySyncView(SyncViewSet):
+    queryset = Category.objects.all()
+    serializer_class = CategorySyncSerializer
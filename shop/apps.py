@@ -1,6 +1,29 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ShopConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'shop'
+
+    def ready(self):
+        import cloudinary
+
+        from . import signals  # noqa: F401
+
+        cloudinary.config(**settings.CLOUDINARY)
+
+        if settings.SLOW_QUERY_MS:
+            import atexit
+
+            from django.db.backends.signals import connection_created
+
+            from . import slow_queries
+
+            connection_created.connect(slow_queries.install)
+            atexit.register(slow_queries.flush_pending)
+
+        if settings.MEMORY_PROFILING_ENABLED:
+            from . import memory
+
+            memory.instrument_commands()
@@ -0,0 +1,15 @@
+"""
+JWT and account API routes. Their URLs (/auth/token/, /auth/refresh/,
+/me/) predate the /api/ prefix, so they are mounted at the site root; like
+shop.api_urls they keep simplejwt and shop.api_views out of shop.urls.
+"""
+from django.urls import path
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+
+from . import api_views
+
+urlpatterns = [
+    path("auth/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
+    path("auth/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("me/", api_views.MeView.as_view(), name="me"),
+]
@@ -0,0 +1,91 @@
+"""
+Cache helpers shared by views and serializers. Hits and misses are
+reported to shop.metrics and to the request profiler (shop.middleware).
+"""
+import time
+
+import orjson
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+from .middleware import record_cache
+from .models import Category, SiteConfig
+from .fastjson import dumps
+
+PRODUCT_JSON_TIMEOUT = 60 * 60 * 24
+SITE_CONTEXT_KEYS = {"categories": "site:categories", "site_config": "site:config"}
+_missing = object()
+
+
+def record_lookup(name, hits, misses, seconds):
+    """Report a cache lookup to /metrics and to the request profiler."""
+    metrics.inc("shop_cache_requests_total", hits, cache=name, result="hit")
+    metrics.inc("shop_cache_requests_total", misses, cache=name, result="miss")
+    record_cache(hits, misses, seconds)
+
+
+def product_json_key(serializer_class, product):
+    # updated_at is part of the key, so any save produces a new entry and
+    # stale blobs simply age out.
+    return f"product-json:{serializer_class.__name__}:{product.pk}:{product.updated_at.timestamp()}"
+
+
+def product_json_blobs(products, serializer_class, context=None):
+    """
+    Serialized JSON for each product, as orjson.Fragment objects in input
+    order. Cached blobs are fetched in one get_many; misses are serialized
+    once with `serializer_class` and written back in one set_many.
+    """
+    products = list(products)
+    keys = [product_json_key(serializer_class, p) for p in products]
+    start = time.perf_counter()
+    cached = cache.get_many(keys)
+    record_lookup("product_json", len(cached), len(keys) - len(cached), time.perf_counter() - start)
+
+    missing = {}
+    blobs = []
+    serializer = serializer_class(context=context or {})
+    for key, product in zip(keys, products):
+        blob = cached.get(key)
+        if blob is None:
+            blob = dumps(serializer.to_representation(product), api=True)
+            missing[key] = blob
+        blobs.append(orjson.Fragment(blob))
+
+    if missing:
+        start = time.perf_counter()
+        cache.set_many(missing, PRODUCT_JSON_TIMEOUT)
+        record_cache(0, 0, time.perf_counter() - start)
+    return blobs
+
+
+# -------------------------------------------------------------------
+# Site-wide context (navbar categories and SiteConfig on every page)
+# -------------------------------------------------------------------
+
+def _site_value(name, load):
+    key = SITE_CONTEXT_KEYS[name]
+    start = time.perf_counter()
+    value = cache.get(key, _missing)
+    hit = value is not _missing
+    record_lookup(name, int(hit), int(not hit), time.perf_counter() - start)
+    if not hit:
+        value = load()  # None (no SiteConfig yet) is cached too
+        # Saves only invalidate this process's copy; with per-process caches
+        # other workers pick the change up when their copy expires.
+        cache.set(key, value, settings.CACHE_MAX_STALE_SECONDS)
+    return value
+
+
+def site_categories():
+    return _site_value("categories", lambda: list(Category.objects.all()))
+
+
+def site_config():
+    return _site_value("site_config", SiteConfig.objects.first)
+
+
+def invalidate_site_context(sender=None, **kwargs):
+    """Signal receiver: drop the cached categories and SiteConfig."""
+    cache.delete_many(list(SITE_CONTEXT_KEYS.values()))
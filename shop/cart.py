@@ -1,94 +1,188 @@
-from decimal import Decimal
 from django.conf import settings
-from .models import Product
+from . import promotions
+from .models import CartLine, Product
 
 
 class Cart:
+    """
+    The visitor's cart.
+
+    Anonymous carts live in the session, stored compactly as
+    [[product_id, quantity], ...]. Logged-in users get CartLine rows
+    instead, so tabs and devices share one cart and it survives logout:
+    every change is a single upsert or delete, and the lines load together
+    with their products in one query. The session cart is merged into the
+    user's lines at login (see merge_session_cart).
+
+    Prices are not stored: they are read from the products, so totals
+    always match what an order will be charged. Promotions are applied by
+    pricing() (shop.promotions), which checkout and orders use as well.
+    """
+
     def __init__(self, request):
         """
         Initialize the cart.
         """
         self.session = request.session
-        cart = self.session.get(settings.CART_SESSION_ID)
-        if not cart:
-            cart = self.session[settings.CART_SESSION_ID] = {}
-        self.cart = cart
+        user = getattr(request, "user", None)
+        self.user = user if user is not None and user.is_authenticated else None
+        self._cart = None
+        self._items = None
+        self._pricing = None
+
+    @staticmethod
+    def decode(stored):
+        if not stored:
+            return {}
+        if isinstance(stored, dict):
+            # Sessions written before the compact format: {"12": {"quantity": 2, "price": "..."}}
+            return {int(pid): item["quantity"] for pid, item in stored.items()}
+        return {pid: qty for pid, qty in stored}
+
+    @property
+    def cart(self):
+        """{product_id: quantity}, loaded on first use."""
+        if self._cart is None:
+            if self.user:
+                self._load_lines()
+            else:
+                self._cart = self.decode(self.session.get(settings.CART_SESSION_ID))
+        return self._cart
+
+    def _load_lines(self):
+        lines = CartLine.objects.filter(user=self.user).select_related("product")
+        self._cart = {line.product_id: line.qty for line in lines}
+        self._items = [self._item(line.product, line.qty) for line in lines]
+
+    @staticmethod
+    def _item(product, quantity):
+        return {
+            "product": product,
+            "quantity": quantity,
+            "price": product.price,
+            "total_price": product.price * quantity,
+        }
 
     def add(self, product, quantity=1, override_quantity=False):
         """
         Add a product to the cart or update its quantity.
         """
-        product_id = str(product.id)
-        if product_id not in self.cart:
-            self.cart[product_id] = {
-                "quantity": 0,
-                "price": str(product.price),
-            }
+        if self.user:
+            if quantity > 0:
+                CartLine.objects.upsert(self.user.pk, {product.id: quantity}, increment=not override_quantity)
+                self._changed()
+                return
+            if not override_quantity:
+                quantity += self.cart.get(product.id, 0)
+            if quantity <= 0:
+                self.remove(product)
+            else:
+                self.add(product, quantity, override_quantity=True)
+            return
 
-        if override_quantity:
-            self.cart[product_id]["quantity"] = quantity
+        current = self.cart.get(product.id, 0)
+        new = quantity if override_quantity else current + quantity
+        if new == current:
+            return
+        if new > 0:
+            self.cart[product.id] = new
         else:
-            self.cart[product_id]["quantity"] += quantity
-
-        if self.cart[product_id]["quantity"] <= 0:
-            del self.cart[product_id]
-
+            self.cart.pop(product.id, None)
         self.save()
 
     def remove(self, product):
         """
         Remove a product from the cart.
         """
-        product_id = str(product.id)
-        if product_id in self.cart:
-            del self.cart[product_id]
+        if self.user:
+            CartLine.objects.filter(user=self.user, product=product).delete()
+            self._changed()
+        elif self.cart.pop(product.id, None) is not None:
             self.save()
 
     def save(self):
         """
-        Mark the session as modified.
+        Write the session cart back to the session (marks it modified).
         """
-        self.session[settings.CART_SESSION_ID] = self.cart
-        self.session.modified = True
+        self._items = self._pricing = None
+        if self.cart:
+            self.session[settings.CART_SESSION_ID] = [[pid, qty] for pid, qty in self.cart.items()]
+        else:
+            self.session.pop(settings.CART_SESSION_ID, None)
+
+    def _changed(self):
+        self._cart = self._items = self._pricing = None
+
+    def items(self):
+        """
+        Cart lines with their products, loaded once per Cart.
+        """
+        if self._items is None:
+            if self.user:
+                self._load_lines()
+            else:
+                products = Product.objects.filter(id__in=self.cart.keys())
+                self._items = [self._item(product, self.cart[product.id]) for product in products]
+        return self._items
 
     def __iter__(self):
         """
         Iterate over the cart items and get product objects.
         """
-        product_ids = self.cart.keys()
-        products = Product.objects.filter(id__in=product_ids)
-
-        for product in products:
-            item = self.cart[str(product.id)].copy()
-            item["product"] = product
-            item["price"] = Decimal(item["price"])
-            item["total_price"] = item["price"] * item["quantity"]
-            yield item
+        return iter(self.items())
 
     def __len__(self):
         """
         Count all items in the cart.
         """
-        return sum(item["quantity"] for item in self.cart.values())
+        return sum(self.cart.values())
 
     def get_total_price(self):
         """
-        Calculate the total price of all items in the cart.
+        Calculate the total price of all items in the cart (before promotions).
+        """
+        return sum(item["total_price"] for item in self.items())
+
+    def pricing(self):
+        """
+        Subtotal, promotion discount and amount due (shop.promotions.Pricing).
         """
-        return sum(
-            Decimal(item["price"]) * item["quantity"]
-            for item in self.cart.values()
-        )
+        if self._pricing is None:
+            self._pricing = promotions.price_lines((item["product"], item["quantity"]) for item in self.items())
+        return self._pricing
 
     def get_total_savings(self):
         """
-        Optional: implement discounts later.
+        Amount taken off by promotions.
         """
-        return Decimal("0.00")
+        return self.pricing().discount
+
+    def get_total_due(self):
+        """
+        What an order placed now would cost.
+        """
+        return self.pricing().total
 
     def clear(self):
         """
         Empty the cart.
         """
-        self.session[settings.CART_SESSION_ID] = {}
-        self.session.modified = True
+        if self.user:
+            CartLine.objects.filter(user=self.user).delete()
+            self._changed()
+        elif self.cart:
+            self._cart = {}
+            self.save()
+
+    @classmethod
+    def merge_session_cart(cls, request, user):
+        """
+        Add the anonymous session cart to the user's lines in one statement
+        (quantities of products already in both are summed). Products
+        deleted since they were added are dropped.
+        """
+        lines = cls.decode(request.session.pop(settings.CART_SESSION_ID, None))
+        if lines:
+            existing = set(Product.objects.filter(id__in=lines).values_list("id", flat=True))
+            lines = {pid: qty for pid, qty in lines.items() if pid in existing}
+        CartLine.objects.upsert(user.pk, lines)
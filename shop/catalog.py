@@ -0,0 +1,296 @@
+"""
+Set-based catalog writes shared by the bulk products API and the catalog
+import command.
+
+Rows are validated in one pass, existing products and categories are
+resolved with one query each, changes are written with bulk_update grouped
+by the exact set of changed columns, and new products get unique slugs
+allocated for the whole batch at once.
+"""
+from collections import Counter, defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_slug
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import Category, Product
+
+# Columns a row may set, with their coercion.
+BADGE_VALUES = {value for value, _ in Product.BADGE_CHOICES}
+INT_FIELDS = ("price", "old_price", "stock", "watts")
+TEXT_FIELDS = {"name": 160, "description": None, "whatsapp_number": 32}
+UPDATABLE_FIELDS = (
+    "name", "description", "price", "old_price", "stock", "watts",
+    "featured", "badge_type", "whatsapp_number", "category",
+)
+REQUIRED_FOR_CREATE = ("name", "price", "category")
+SLUG_MAX_LENGTH = Product._meta.get_field("slug").max_length
+
+TRUE_VALUES = {"1", "true", "yes", "y", "on"}
+FALSE_VALUES = {"0", "false", "no", "n", "off", ""}
+
+
+class RowError(ValueError):
+    pass
+
+
+def _coerce_int(field, value):
+    if value is None or value == "":
+        if field == "old_price":
+            return None
+        raise RowError(f"{field} is required")
+    if isinstance(value, bool):
+        raise RowError(f"{field} must be a whole number")
+    try:
+        number = int(Decimal(str(value).strip().replace(",", "")))
+    except (InvalidOperation, ValueError):
+        raise RowError(f"{field} must be a whole number")
+    if number < 0:
+        raise RowError(f"{field} must not be negative")
+    return number
+
+
+def _coerce_bool(field, value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise RowError(f"{field} must be true or false")
+
+
+def clean_row(row):
+    """
+    Validate one input row. Returns (key, values) where key is ("id", int)
+    or ("slug", str) and values maps model fields to clean values; category
+    is returned as its raw reference (id or slug), resolved later in bulk.
+    """
+    if not isinstance(row, dict):
+        raise RowError("row must be an object")
+
+    values = {}
+    for field in INT_FIELDS:
+        if field in row:
+            values[field] = _coerce_int(field, row[field])
+    for field, max_length in TEXT_FIELDS.items():
+        if field in row:
+            text = "" if row[field] is None else str(row[field]).strip()
+            if max_length and len(text) > max_length:
+                raise RowError(f"{field} is longer than {max_length} characters")
+            values[field] = text
+    if "name" in values and not values["name"]:
+        raise RowError("name must not be blank")
+    if "featured" in row:
+        values["featured"] = _coerce_bool("featured", row["featured"])
+    if "badge_type" in row:
+        badge = str(row["badge_type"] or "").strip().lower()
+        if badge not in BADGE_VALUES:
+            raise RowError(f"badge_type must be one of {sorted(BADGE_VALUES)}")
+        values["badge_type"] = badge
+    category = row.get("category", row.get("category_id"))
+    if category not in (None, ""):
+        values["category"] = str(category).strip()
+
+    if row.get("id") not in (None, ""):
+        try:
+            return ("id", int(row["id"])), values
+        except (TypeError, ValueError):
+            raise RowError("id must be an integer")
+    if row.get("slug"):
+        slug = str(row["slug"]).strip().lower()
+        try:
+            validate_slug(slug)
+        except ValidationError:
+            raise RowError("slug may only contain letters, numbers, hyphens and underscores")
+        if len(slug) > SLUG_MAX_LENGTH:
+            raise RowError(f"slug is longer than {SLUG_MAX_LENGTH} characters")
+        return ("slug", slug), values
+    if values.get("name"):
+        # New product without an explicit key: slug is allocated on create.
+        return ("new", None), values
+    raise RowError("each row needs an id, a slug or a name")
+
+
+def category_key(ref):
+    """Normalise a category reference: ids stay as-is, names and slugs become slugs."""
+    return ref if ref.isdigit() else slugify(ref)
+
+
+def resolve_categories(refs):
+    """Map category references (ids, slugs or names) to Category ids with one query."""
+    ids = {int(r) for r in refs if r.isdigit()}
+    slugs = {category_key(r) for r in refs if not r.isdigit()}
+    found = {}
+    if ids or slugs:
+        for cat_id, slug in Category.objects.filter(Q(id__in=ids) | Q(slug__in=slugs)).values_list("id", "slug"):
+            found[str(cat_id)] = cat_id
+            found[slug] = cat_id
+    return found
+
+
+def create_missing_categories(refs):
+    """
+    Bulk-create categories named in `refs` that do not exist yet (numeric
+    references are never created). Returns the number created.
+    """
+    found = resolve_categories(refs)
+    missing = {}
+    for ref in refs:
+        key = category_key(ref)
+        if not ref.isdigit() and key and key not in found:
+            missing.setdefault(key, ref)
+    Category.objects.bulk_create(
+        [Category(name=name[:120], slug=slug[:140]) for slug, name in missing.items()],
+        ignore_conflicts=True,
+    )
+    return len(missing)
+
+
+def allocate_slugs(names, reserved=()):
+    """
+    Unique slugs for new products, allocated for the whole batch: one query
+    finds which base slugs are taken, one more loads the numbered variants of
+    the colliding ones, then suffixes are assigned in memory.
+    """
+    bases = [slugify(name)[:190] or "product" for name in names]
+    taken = set(reserved)
+    unique_bases = set(bases)
+    taken.update(Product.objects.filter(slug__in=unique_bases).values_list("slug", flat=True))
+
+    counts = Counter(bases)
+    colliding = {b for b in unique_bases if b in taken or counts[b] > 1}
+    if colliding:
+        q = Q()
+        for base in colliding:
+            q |= Q(slug__startswith=f"{base}-")
+        taken.update(Product.objects.filter(q).values_list("slug", flat=True))
+
+    next_suffix = defaultdict(lambda: 2)
+    slugs = []
+    for base in bases:
+        slug = base
+        while slug in taken:
+            slug = f"{base}-{next_suffix[base]}"
+            next_suffix[base] += 1
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def bulk_upsert_products(rows, create=True, dry_run=False):
+    """
+    Insert or update products from `rows` (dicts keyed by id or slug).
+
+    Returns a list with one result per input row:
+        {"row": i, "status": "created" | "updated" | "unchanged" | "error",
+         "id": ..., "slug": ..., "changes": {field: [old, new]}, "errors": [...]}
+
+    With dry_run=True nothing is written; new products get no id.
+    """
+    results = [{"row": i} for i in range(len(rows))]
+    cleaned = []
+
+    # ---------- 1. Validate every row ----------
+    for i, row in enumerate(rows):
+        try:
+            key, values = clean_row(row)
+        except RowError as e:
+            results[i].update(status="error", errors=[str(e)])
+            continue
+        cleaned.append((i, key, values))
+
+    # ---------- 2. Resolve categories and existing products (one query each) ----------
+    categories = resolve_categories({v["category"] for _, _, v in cleaned if "category" in v})
+    ids = {k[1] for _, k, _ in cleaned if k[0] == "id"}
+    slugs = {k[1] for _, k, _ in cleaned if k[0] == "slug"}
+    existing = {}
+    if ids or slugs:
+        for product in Product.objects.filter(Q(id__in=ids) | Q(slug__in=slugs)).only(
+            "id", "slug", *UPDATABLE_FIELDS
+        ):
+            existing[("id", product.id)] = product
+            existing[("slug", product.slug)] = product
+
+    # ---------- 3. Diff ----------
+    now = timezone.now()
+    updates = defaultdict(list)  # frozenset(changed fields) -> [product]
+    to_create = []
+    seen = set()       # existing product ids already matched by a row
+    new_slugs = set()  # explicit slugs of rows being created
+    for i, key, values in cleaned:
+        if "category" in values:
+            cat_id = categories.get(category_key(values["category"]))
+            if cat_id is None:
+                results[i].update(status="error", errors=[f"unknown category '{values['category']}'"])
+                continue
+            values["category_id"] = cat_id
+            del values["category"]
+
+        product = existing.get(key)
+        if product is not None:
+            if product.pk in seen:
+                results[i].update(status="error", errors=["duplicate row for this product"])
+                continue
+            seen.add(product.pk)
+            changes = {f: [getattr(product, f), v] for f, v in values.items() if getattr(product, f) != v}
+            for f, (_, new) in changes.items():
+                setattr(product, f, new)
+            if changes:
+                product.updated_at = now
+                updates[frozenset(changes)].append(product)
+                results[i].update(status="updated", id=product.pk, slug=product.slug, changes=changes)
+            else:
+                results[i].update(status="unchanged", id=product.pk, slug=product.slug)
+            continue
+
+        if key[0] == "id" or not create:
+            results[i].update(status="error", errors=["product not found"])
+            continue
+        missing = [f for f in REQUIRED_FOR_CREATE if f not in values and f"{f}_id" not in values]
+        if missing:
+            results[i].update(status="error", errors=[f"{f} is required for new products" for f in missing])
+            continue
+        product = Product(**values)
+        product.slug = key[1] if key[0] == "slug" else None
+        if product.slug:
+            if product.slug in new_slugs:
+                results[i].update(status="error", errors=["duplicate row for this slug"])
+                continue
+            new_slugs.add(product.slug)
+        to_create.append((i, product))
+
+    # ---------- 4. Slugs for new products, allocated in bulk ----------
+    unnamed = [(i, p) for i, p in to_create if not p.slug]
+    if unnamed:
+        reserved = new_slugs
+        for (_, product), slug in zip(unnamed, allocate_slugs([p.name for _, p in unnamed], reserved)):
+            product.slug = slug
+
+    # ---------- 5. Write ----------
+    if dry_run:
+        for i, product in to_create:
+            results[i].update(status="created", id=None, slug=product.slug)
+        return results
+
+    with transaction.atomic():
+        for fields, products in updates.items():
+            Product.objects.bulk_update(products, [*fields, "updated_at"], batch_size=500)
+        if to_create:
+            created = Product.objects.bulk_create([p for _, p in to_create], batch_size=500)
+            if created and created[0].pk is None:
+                # Backends without RETURNING: look the new ids up by slug.
+                id_by_slug = dict(
+                    Product.objects.filter(slug__in=[p.slug for p in created]).values_list("slug", "id")
+                )
+                for p in created:
+                    p.pk = id_by_slug.get(p.slug)
+            for i, product in to_create:
+                results[i].update(status="created", id=product.pk, slug=product.slug)
+
+    return results
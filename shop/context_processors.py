@@ -1,15 +1,19 @@
-from .models import Category, SiteConfig
+from django.utils.functional import SimpleLazyObject
+
+from . import caches
 from .cart import Cart
+
+
 def categories_processor(request):
     """Make all categories globally available (e.g. navbar, footer)."""
     return {
-        "categories": Category.objects.all()
+        "categories": SimpleLazyObject(caches.site_categories)
     }
 
 def site_config(request):
     """Make SiteConfig globally available (e.g. WhatsApp number, logo, etc.)."""
     return {
-        "site_config": SiteConfig.objects.first()
+        "site_config": SimpleLazyObject(caches.site_config)
     }
 
 
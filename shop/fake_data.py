@@ -0,0 +1,340 @@
+"""
+Synthetic shop data for scale testing (see the generate_fake_shop command).
+
+Everything is derived from one seed: each batch gets its own Random seeded
+with (seed, table, batch number), so for a given --seed and --batch-size the
+output does not depend on batch completion order or the number of workers.
+Popularity is Zipf-like: a few products and customers account for most orders and reviews.
+"""
+import random
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connections, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import Address, Category, Order, OrderItem, Product, ProductImage, Review
+
+CATEGORY_NAMES = [
+    "Hometheatre systems", "Bass speakers", "Amplifiers", "Home appliances",
+    "Kitchen appliances", "Sound systems", "Car systems", "Equalizers",
+    "Subwoofers", "Microphones", "Headphones", "Mixers", "Turntables",
+    "Soundbars", "PA systems", "Cables & accessories",
+]
+BRANDS = ["Sonic", "Bassline", "Rian", "Vox", "Thunder", "Pulse", "Echo", "Nairobi Audio", "Kilimanjaro", "Savanna"]
+SERIES = ["Pro", "Max", "Lite", "Studio", "Club", "Street", "Home", "Elite", "Go", "Prime"]
+KINDS = ["Subwoofer", "Speaker", "Amplifier", "Woofer", "Tweeter", "Soundbar", "Mixer", "Equalizer", "Home Theatre"]
+FIRST_NAMES = ["Wanjiku", "Otieno", "Achieng", "Kamau", "Njeri", "Mwangi", "Akinyi", "Kiprop", "Chebet", "Mutua",
+               "Amina", "Hassan", "Wairimu", "Omondi", "Nyambura", "Kibet", "Atieno", "Karanja", "Zawadi", "Baraka"]
+LAST_NAMES = ["Mwangi", "Odhiambo", "Kariuki", "Wekesa", "Njoroge", "Ochieng", "Kiplagat", "Mutiso", "Owino", "Gitau"]
+CITIES = [("Nairobi", 45), ("Mombasa", 15), ("Kisumu", 10), ("Nakuru", 10), ("Eldoret", 8), ("Thika", 6), ("Nyeri", 6)]
+REVIEW_TEXTS = [
+    "Great bass, my neighbours agree.", "Solid build and fast delivery.", "Sounds good for the price.",
+    "Stopped working after a month.", "Exactly as described.", "Louder than I expected!",
+    "Setup was a bit tricky.", "Would buy again.", "", "",
+]
+
+BADGES = [("", 70), ("new", 10), ("sale", 12), ("best", 8)]
+RATINGS = [(1, 4), (2, 4), (3, 10), (4, 29), (5, 53)]
+ITEMS_PER_ORDER = [(1, 50), (2, 25), (3, 13), (4, 7), (5, 5)]
+QTY = [(1, 80), (2, 15), (3, 5)]
+IMAGE_POOL = 40  # distinct placeholder image references
+HISTORY_DAYS = 730
+
+
+def weighted(pairs):
+    values, weights = zip(*pairs)
+    return list(values), list(accumulate(weights))
+
+
+def zipf_cum_weights(n, s=1.1):
+    return list(accumulate(1 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def batch_rng(seed, table, index):
+    return random.Random(f"{seed}:{table}:{index}")
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Let bulk_create keep the created_at/updated_at values we set. The flags
+    live on the shared model fields, so they are restored however the block
+    (or the setup, e.g. a model without these fields) exits.
+    """
+    saved = []
+    try:
+        for model in models:
+            for name in ("created_at", "updated_at"):
+                field = model._meta.get_field(name)
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+# -------------------------------------------------------------------
+# Orders (runs in worker processes too)
+# -------------------------------------------------------------------
+
+_state = {}
+
+
+def init_order_worker(state):
+    """ProcessPoolExecutor initializer: Django is already set up in forked workers."""
+    connections.close_all()
+    _state.clear()
+    _state.update(state)
+
+
+def order_batch(index):
+    """Create one batch of orders with their items. Returns (orders, items)."""
+    s = _state
+    rng = batch_rng(s["seed"], "orders", index)
+    start = index * s["batch_size"]
+    count = min(s["batch_size"], s["total"] - start)
+    n_items, item_weights = weighted(ITEMS_PER_ORDER)
+    qtys, qty_weights = weighted(QTY)
+
+    orders, lines = [], []
+    for i in range(count):
+        user_id = rng.choices(s["user_ids"], cum_weights=s["user_weights"])[0]
+        # Later orders are more frequent (the shop is growing).
+        age = timedelta(seconds=int(HISTORY_DAYS * 86400 * (1 - rng.random() ** 0.6)))
+        created = s["end"] - age
+        if age > timedelta(days=14):
+            status = "done"
+        else:
+            status = rng.choices(["new", "processing", "sent", "done"], [2, 3, 3, 2])[0]
+        items = []
+        for _ in range(rng.choices(n_items, cum_weights=item_weights)[0]):
+            p = rng.choices(s["product_ids"], cum_weights=s["product_weights"])[0]
+            items.append((p, rng.choices(qtys, cum_weights=qty_weights)[0], s["prices"][p]))
+        orders.append(Order(
+            user_id=user_id,
+            address_id=s["address_ids"][user_id],
+            status=status,
+            total=sum(qty * price for _, qty, price in items),
+            whatsapp_number="+2547" + "".join(rng.choices("0123456789", k=8)),
+            created_at=created,
+            updated_at=created,
+        ))
+        lines.append(items)
+
+    with transaction.atomic(), explicit_timestamps(Order, OrderItem):
+        orders = Order.objects.bulk_create(orders)
+        order_items = [
+            OrderItem(
+                order_id=order.pk, product_id=p, qty=qty, price_each=price,
+                created_at=order.created_at, updated_at=order.created_at,
+            )
+            for order, items in zip(orders, lines) for p, qty, price in items
+        ]
+        OrderItem.objects.bulk_create(order_items, batch_size=s["batch_size"])
+    return len(orders), len(order_items)
+
+
+# -------------------------------------------------------------------
+# Generator
+# -------------------------------------------------------------------
+
+class ShopGenerator:
+    def __init__(self, seed=1, batch_size=5000, end=None, log=None):
+        self.seed = seed
+        self.batch_size = batch_size
+        self.end = end or timezone.make_aware(datetime.combine(timezone.localdate(), time()))
+        self.log = log or (lambda message: None)
+
+    def _batches(self, total):
+        return range((total + self.batch_size - 1) // self.batch_size)
+
+    def _timestamp(self, rng, days=HISTORY_DAYS):
+        return self.end - timedelta(seconds=rng.randrange(days * 86400))
+
+    # ---------- Catalog ----------
+    def categories(self, n):
+        names = [
+            CATEGORY_NAMES[i] if i < len(CATEGORY_NAMES) else f"{CATEGORY_NAMES[i % len(CATEGORY_NAMES)]} {i // len(CATEGORY_NAMES) + 1}"
+            for i in range(n)
+        ]
+        Category.objects.bulk_create(
+            [Category(name=name, slug=slugify(name)) for name in names], ignore_conflicts=True,
+        )
+        return list(Category.objects.filter(name__in=names).values_list("id", flat=True))
+
+    def products(self, n, category_ids):
+        badges, badge_weights = weighted(BADGES)
+        created = 0
+        for index in self._batches(n):
+            rng = batch_rng(self.seed, "products", index)
+            batch, images = [], []
+            for i in range(index * self.batch_size, min((index + 1) * self.batch_size, n)):
+                name = f"{rng.choice(BRANDS)} {rng.choice(SERIES)} {rng.choice(KINDS)} {rng.randint(100, 9999)}"
+                price = max(500, round(rng.lognormvariate(9.6, 0.8) / 50) * 50)  # median ~15k KES
+                stamp = self._timestamp(rng)
+                product = Product(
+                    name=name,
+                    slug=f"{slugify(name)}-s{self.seed}-{i}",
+                    description=f"{name}: {rng.choice(REVIEW_TEXTS) or 'Quality sound.'}",
+                    price=price,
+                    old_price=round(price * rng.uniform(1.1, 1.4) / 50) * 50 if rng.random() < 0.2 else None,
+                    watts=int(rng.lognormvariate(5.3, 0.9)),  # median ~200 W
+                    category_id=rng.choice(category_ids),
+                    main_image=f"products/main/fake-{rng.randrange(IMAGE_POOL)}",
+                    featured=rng.random() < 0.03,
+                    stock=0 if rng.random() < 0.1 else int(rng.expovariate(1 / 12)) + 1,
+                    badge_type=rng.choices(badges, cum_weights=badge_weights)[0],
+                    created_at=stamp,
+                    updated_at=stamp,
+                )
+                batch.append(product)
+            with transaction.atomic(), explicit_timestamps(Product, ProductImage):
+                batch = Product.objects.bulk_create(batch)
+                for product in batch:
+                    for _ in range(rng.choices([0, 1, 2, 3], [10, 30, 40, 20])[0]):
+                        images.append(ProductImage(
+                            product_id=product.pk,
+                            image=f"products/gallery/fake-{rng.randrange(IMAGE_POOL)}",
+                            created_at=product.created_at, updated_at=product.created_at,
+                        ))
+                ProductImage.objects.bulk_create(images, batch_size=self.batch_size)
+            created += len(batch)
+            self.log(f"  products {created}/{n}")
+        return self._product_ids()
+
+    def _product_ids(self):
+        # Ordered by id so the Zipf ranks are stable for a given seed.
+        return dict(
+            Product.objects.filter(slug__contains=f"-s{self.seed}-").order_by("id").values_list("id", "price")
+        )
+
+    # ---------- People ----------
+    def users(self, n):
+        User = get_user_model()
+        password = make_password("password")  # hashed once; every fake user logs in with it
+        cities, city_weights = weighted(CITIES)
+        for index in self._batches(n):
+            rng = batch_rng(self.seed, "users", index)
+            batch = []
+            for i in range(index * self.batch_size, min((index + 1) * self.batch_size, n)):
+                batch.append(User(
+                    username=f"fake{self.seed}_{i}",
+                    email=f"fake{self.seed}_{i}@example.com",
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    password=password,
+                    date_joined=self._timestamp(rng),
+                ))
+            with transaction.atomic():
+                users = User.objects.bulk_create(batch)
+                Address.objects.bulk_create([
+                    Address(
+                        user_id=u.pk,
+                        full_name=f"{u.first_name} {u.last_name}",
+                        phone="07" + "".join(rng.choices("0123456789", k=8)),
+                        line1=f"{rng.randint(1, 300)} {rng.choice(LAST_NAMES)} Road",
+                        city=rng.choices(cities, cum_weights=city_weights)[0],
+                    )
+                    for u in users
+                ])
+            self.log(f"  users {min((index + 1) * self.batch_size, n)}/{n}")
+        users = User.objects.filter(username__startswith=f"fake{self.seed}_").order_by("id")
+        address_ids = dict(
+            Address.objects.filter(user__in=users).order_by("user_id", "id").values_list("user_id", "id")
+        )
+        return list(users.values_list("id", flat=True)), address_ids
+
+    # ---------- Activity ----------
+    def reviews(self, n, product_ids, user_ids):
+        ratings, rating_weights = weighted(RATINGS)
+        product_weights = zipf_cum_weights(len(product_ids))
+        for index in self._batches(n):
+            rng = batch_rng(self.seed, "reviews", index)
+            count = min(self.batch_size, n - index * self.batch_size)
+            batch = []
+            for _ in range(count):
+                stamp = self._timestamp(rng)
+                batch.append(Review(
+                    product_id=rng.choices(product_ids, cum_weights=product_weights)[0],
+                    user_id=rng.choice(user_ids),
+                    rating=rng.choices(ratings, cum_weights=rating_weights)[0],
+                    text=rng.choice(REVIEW_TEXTS),
+                    created_at=stamp,
+                    updated_at=stamp,
+                ))
+            # bulk_create bypasses the rating signals; aggregates are rebuilt after.
+            with explicit_timestamps(Review):
+                Review.objects.bulk_create(batch)
+            self.log(f"  reviews {min((index + 1) * self.batch_size, n)}/{n}")
+        self.rebuild_rating_aggregates(product_ids)
+
+    def rebuild_rating_aggregates(self, product_ids):
+        """Recompute Product rating columns from Review in one grouped query per batch."""
+        ids = list(product_ids)
+        for start in range(0, len(ids), self.batch_size):
+            chunk = ids[start:start + self.batch_size]
+            stats = {
+                row["product_id"]: row
+                for row in Review.objects.filter(product_id__in=chunk).order_by().values("product_id").annotate(
+                    **{f"r{star}": Count("id", filter=Q(rating=star)) for star in range(1, 6)}
+                )
+            }
+            products = []
+            for pk in chunk:
+                row = stats.get(pk, {})
+                counts = {star: row.get(f"r{star}", 0) for star in range(1, 6)}
+                total = sum(counts.values())
+                product = Product(pk=pk, rating_count=total, updated_at=self.end)
+                product.rating_avg = (
+                    Decimal(sum(s * c for s, c in counts.items()) / total).quantize(Decimal("0.01")) if total else 0
+                )
+                for star, c in counts.items():
+                    setattr(product, f"rating_{star}", c)
+                products.append(product)
+            Product.objects.bulk_update(
+                products, ["rating_avg", "rating_count", *[f"rating_{s}" for s in range(1, 6)], "updated_at"],
+            )
+
+    def orders(self, n, product_prices, user_ids, address_ids, workers=1):
+        product_ids = list(product_prices)
+        state = {
+            "seed": self.seed,
+            "batch_size": self.batch_size,
+            "total": n,
+            "end": self.end,
+            "user_ids": user_ids,
+            "user_weights": zipf_cum_weights(len(user_ids), s=0.8),
+            "product_ids": product_ids,
+            "product_weights": zipf_cum_weights(len(product_ids)),
+            "prices": product_prices,
+            "address_ids": address_ids,
+        }
+        done_orders = done_items = 0
+        batches = self._batches(n)
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            import multiprocessing
+
+            connections.close_all()  # never share a connection with forked workers
+            context = multiprocessing.get_context("fork")
+            with ProcessPoolExecutor(workers, mp_context=context, initializer=init_order_worker, initargs=(state,)) as pool:
+                for orders, items in pool.map(order_batch, batches):
+                    done_orders += orders
+                    done_items += items
+                    self.log(f"  orders {done_orders}/{n} ({done_items} items)")
+        else:
+            init_order_worker(state)
+            for index in batches:
+                orders, items = order_batch(index)
+                done_orders += orders
+                done_items += items
+                self.log(f"  orders {done_orders}/{n} ({done_items} items)")
+        return done_orders, done_items
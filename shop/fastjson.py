@@ -0,0 +1,46 @@
+"""
+orjson encoding shared by the API renderer, the JSON cart views and the
+product JSON cache. Kept free of DRF so plain views can use it.
+"""
+from datetime import datetime
+from decimal import Decimal
+
+import orjson
+from django.utils.functional import Promise
+
+OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def default(obj):
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, Promise):
+        return str(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, "__iter__"):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def api_default(obj):
+    """default() with the encodings of DRF's JSONEncoder, for API output."""
+    if isinstance(obj, datetime):
+        representation = obj.isoformat()
+        if representation.endswith("+00:00"):
+            representation = representation[:-6] + "Z"
+        return representation
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return default(obj)
+
+
+def dumps(data, indent=False, api=False):
+    """
+    UTF-8 JSON bytes. api=True matches rest_framework's JSONRenderer byte
+    for byte (Decimal as a number, UTC datetimes ending in "Z").
+    """
+    option = OPTIONS | orjson.OPT_INDENT_2 if indent else OPTIONS
+    if api:
+        return orjson.dumps(data, default=api_default, option=option | orjson.OPT_PASSTHROUGH_DATETIME)
+    return orjson.dumps(data, default=default, option=option)
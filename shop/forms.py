@@ -5,6 +5,7 @@ from django.contrib.auth.forms import (
     PasswordResetForm, SetPasswordForm
 )
 from .models import CustomUser
+from .outbox import enqueue_template
 
 
 class CustomUserCreationForm(UserCreationForm):
@@ -38,6 +39,19 @@ class CustomPasswordResetForm(PasswordResetForm):
             raise forms.ValidationError("No account found with this email.")
         return email
 
+    def send_mail(self, subject_template_name, email_template_name,
+                  context, from_email, to_email, html_email_template_name=None):
+        """Queue the reset email in the outbox instead of sending it inline."""
+        enqueue_template(
+            to_email,
+            subject_template_name,
+            email_template_name,
+            context,
+            html_template_name=html_email_template_name,
+            kind="password_reset",
+            from_email=from_email,
+        )
+
 
 class CustomSetPasswordForm(SetPasswordForm):
     pass
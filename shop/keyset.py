@@ -0,0 +1,125 @@
+"""
+Keyset ("cursor") pagination.
+
+A cursor is an opaque, URL-safe token holding the ordering values of the
+boundary row of the current page. The next page is fetched with a WHERE
+clause on those values instead of OFFSET, so cost does not grow with page
+depth and no COUNT(*) is needed.
+
+These helpers have no DRF dependency so the HTML views can use them
+without importing the API stack; shop.pagination builds the DRF
+paginator on top of them.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(values, reverse=False):
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    payload = json.dumps({"v": values, "r": 1} if reverse else values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Returns (values, reverse). values is None for a missing or malformed
+    token; reverse is True for "previous page" cursors.
+    """
+    if not token:
+        return None, False
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        reverse = False
+        if isinstance(payload, dict):
+            reverse = bool(payload.get("r"))
+            payload = payload.get("v")
+        if not isinstance(payload, list):
+            return None, False
+        # parse_datetime raises ValueError for well-formed but impossible dates.
+        values = [
+            (parse_datetime(v) or v) if isinstance(v, str) else v
+            for v in payload
+        ]
+    except (ValueError, TypeError):
+        return None, False
+    return values, reverse
+
+
+def coerce_values(model, ordering, values):
+    """
+    Cursor values converted with their ordering fields' to_python(), or None
+    when a tampered token holds the wrong number or kind of values.
+    """
+    if values is None or len(values) != len(ordering):
+        return None
+    coerced = []
+    for field, value in zip(ordering, values):
+        if value is None or isinstance(value, (dict, list)):
+            return None
+        try:
+            coerced.append(_field(model, field.lstrip("-")).to_python(value))
+        except (FieldDoesNotExist, ValidationError, TypeError, ValueError):
+            return None
+    return coerced
+
+
+def _field(model, path):
+    *relations, name = path.split("__")
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field("id" if name == "pk" else name)
+
+
+def flip(ordering):
+    return [f[1:] if f.startswith("-") else f"-{f}" for f in ordering]
+
+
+def keyset_filter(ordering, values):
+    """
+    Q selecting rows strictly after `values` under `ordering`, e.g. for
+    ["-created_at", "-id"]: created_at < c OR (created_at = c AND id < i).
+    """
+    q = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        clause = Q(**{f"{name}__{lookup}": values[i]})
+        for prev_field, prev_value in zip(ordering[:i], values[:i]):
+            clause &= Q(**{prev_field.lstrip("-"): prev_value})
+        q |= clause
+    return q
+
+
+def row_values(obj, ordering):
+    return [getattr(obj, field.lstrip("-")) for field in ordering]
+
+
+def keyset_page(queryset, ordering, cursor, page_size):
+    """
+    One forward page of `queryset` ordered by `ordering` (which must end in a
+    unique field). Returns (rows, next_cursor); next_cursor is None on the
+    last page.
+    """
+    rows = list(_keyset_queryset(queryset, ordering, cursor)[:page_size + 1])
+    return _keyset_result(rows, ordering, page_size)
+
+
+def _keyset_queryset(queryset, ordering, cursor):
+    queryset = queryset.order_by(*ordering)
+    values = coerce_values(queryset.model, ordering, decode_cursor(cursor)[0])
+    if values is not None:  # an invalid cursor shows the first page
+        queryset = queryset.filter(keyset_filter(ordering, values))
+    return queryset
+
+
+def _keyset_result(rows, ordering, page_size):
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = encode_cursor(row_values(rows[-1], ordering)) if has_more else None
+    return rows, next_cursor
@@ -0,0 +1,70 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from shop.fake_data import ShopGenerator
+from shop.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic shop (categories, products with images, users with "
+        "addresses, reviews and orders) for scale testing. The same --seed always "
+        "(with the same --batch-size) produces the same data; use a new seed to add another independent set."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--categories", type=int, default=12)
+        parser.add_argument("--products", type=int, default=2000)
+        parser.add_argument("--users", type=int, default=5000)
+        parser.add_argument("--reviews", type=int, default=10000)
+        parser.add_argument("--orders", type=int, default=20000)
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per bulk_create")
+        parser.add_argument(
+            "--workers", type=int, default=1,
+            help="Processes generating orders (PostgreSQL only; SQLite allows one writer)",
+        )
+
+    def handle(self, *args, **options):
+        seed = options["seed"]
+        if Product.objects.filter(slug__contains=f"-s{seed}-").exists() or get_user_model().objects.filter(
+            username__startswith=f"fake{seed}_"
+        ).exists():
+            raise CommandError(f"Data for seed {seed} already exists; pick another --seed.")
+        if options["users"] < 1 or options["products"] < 1 or options["categories"] < 1:
+            raise CommandError("--categories, --products and --users must be at least 1.")
+
+        workers = options["workers"]
+        if workers > 1 and connection.vendor == "sqlite":
+            self.stdout.write(self.style.WARNING("⚠️ SQLite has a single writer; using one worker."))
+            workers = 1
+
+        generator = ShopGenerator(
+            seed=seed,
+            batch_size=options["batch_size"],
+            log=lambda message: self.stdout.write(message, ending="\r"),
+        )
+        started = time.perf_counter()
+
+        def step(label, func, *args, **kwargs):
+            t = time.perf_counter()
+            result = func(*args, **kwargs)
+            self.stdout.write(self.style.SUCCESS(f"✅ {label} in {time.perf_counter() - t:.1f}s" + " " * 20))
+            return result
+
+        category_ids = step(f"{options['categories']} categories", generator.categories, options["categories"])
+        prices = step(f"{options['products']} products", generator.products, options["products"], category_ids)
+        user_ids, address_ids = step(f"{options['users']} users", generator.users, options["users"])
+        step(f"{options['reviews']} reviews", generator.reviews, options["reviews"], list(prices), user_ids)
+        orders, items = step(
+            f"{options['orders']} orders", generator.orders,
+            options["orders"], prices, user_ids, address_ids, workers=workers,
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"🎉 Fake shop (seed {seed}) ready: {len(prices)} products, {len(user_ids)} users, "
+            f"{orders} orders with {items} items in {time.perf_counter() - started:.1f}s"
+        ))
@@ -0,0 +1,69 @@
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SETUP = (
+    "import os, django; "
+    "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rian_backend.settings'); "
+    "django.setup()"
+)
+
+
+def parse_importtime(stderr):
+    """(module, self_us, cumulative_us, depth) for each line of -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2  # top-level imports have one leading space
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the import time of django.setup() in a fresh interpreter "
+        "(python -X importtime) and fail if it exceeds IMPORT_TIME_BUDGET_MS "
+        "or imports any of STARTUP_LAZY_MODULES."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--budget-ms", type=float, default=settings.IMPORT_TIME_BUDGET_MS)
+        parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to time; the fastest counts")
+        parser.add_argument("--top", type=int, default=15, help="Slowest top-level imports to show")
+
+    def measure(self):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", SETUP],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f"❌ django.setup() failed:\n{result.stderr[-2000:]}")
+        return parse_importtime(result.stderr)
+
+    def handle(self, *args, **options):
+        runs = [self.measure() for _ in range(max(1, options["runs"]))]
+        rows = min(runs, key=lambda r: sum(cumulative for _, _, cumulative, depth in r if depth == 0))
+        top_level = [row for row in rows if row[3] == 0]
+        total_ms = sum(cumulative for _, _, cumulative, _ in top_level) / 1000
+
+        self.stdout.write(f"{'module':50} {'cumulative ms':>14} {'self ms':>8}")
+        for name, self_us, cumulative_us, _ in sorted(top_level, key=lambda r: r[2], reverse=True)[:options["top"]]:
+            self.stdout.write(f"{name[:50]:50} {cumulative_us / 1000:14.1f} {self_us / 1000:8.1f}")
+
+        imported = {name for name, *_ in rows}
+        eager = [name for name in settings.STARTUP_LAZY_MODULES if name in imported]
+        problems = []
+        if total_ms > options["budget_ms"]:
+            problems.append(f"import time {total_ms:.0f} ms is over the {options['budget_ms']:.0f} ms budget")
+        if eager:
+            problems.append(f"imported at startup but meant to load on first use: {', '.join(eager)}")
+        if problems:
+            raise CommandError("❌ " + "; ".join(problems))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ django.setup() imports {len(imported)} modules in {total_ms:.0f} ms "
+            f"(budget {options['budget_ms']:.0f} ms, best of {len(runs)})"
+        ))
@@ -0,0 +1,188 @@
+import csv
+import os
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from shop.catalog import bulk_upsert_products, create_missing_categories
+from shop.models import Product
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        reader = csv.reader(fh)
+        header = next(reader, None)
+        if header is None:
+            return
+        yield [h.strip().lower() for h in header]
+        yield from reader
+
+
+def read_xlsx(path):
+    from openpyxl import load_workbook
+
+    # read_only streams rows from the sheet XML instead of building the whole workbook.
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        yield [str(h or "").strip().lower() for h in header]
+        yield from rows
+    finally:
+        wb.close()
+
+
+def chunked(iterable, size):
+    it = iter(iterable)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a supplier catalog (CSV or XLSX) into Product. Rows are matched "
+        "by id or slug (or the slug of their name), diffed per chunk and written in "
+        "bulk. Empty cells leave the existing value unchanged."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or XLSX file")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Rows diffed and written per transaction")
+        parser.add_argument("--dry-run", action="store_true", help="Report the diff without writing anything")
+        parser.add_argument("--no-create", action="store_true", help="Only update existing products")
+        parser.add_argument("--create-categories", action="store_true", help="Create categories named in the file")
+        parser.add_argument(
+            "--deactivate-missing", action="store_true",
+            help="Set stock to 0 on products that are not in the file",
+        )
+        parser.add_argument("--report", help="Write a per-row diff report (CSV) to this path")
+        parser.add_argument("--verbose-diff", type=int, default=20, help="Changed rows to print (dry run)")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"File not found: {path}")
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".csv":
+            rows = read_csv(path)
+        elif ext in (".xlsx", ".xlsm"):
+            rows = read_xlsx(path)
+        else:
+            raise CommandError("Only .csv and .xlsx files are supported.")
+
+        header = next(rows, None)
+        if not header:
+            raise CommandError("The file is empty.")
+        if not {"id", "slug", "name"} & set(header):
+            raise CommandError("The header needs an id, slug or name column.")
+
+        dry_run = options["dry_run"]
+        report = None
+        if options["report"]:
+            report_file = open(options["report"], "w", newline="", encoding="utf-8")
+            report = csv.writer(report_file)
+            report.writerow(["line", "status", "id", "slug", "changes", "errors"])
+
+        totals = {"created": 0, "updated": 0, "unchanged": 0, "error": 0}
+        seen_ids = set()  # ints only, so 100k rows stay a few MB
+        printed = 0
+        line = 1  # header
+
+        try:
+            for chunk in chunked(rows, options["chunk_size"]):
+                records = []
+                for values in chunk:
+                    line += 1
+                    record = {
+                        k: (v.strip() if isinstance(v, str) else v)
+                        for k, v in zip(header, values)
+                        if k and v is not None and v != ""
+                    }
+                    if not record.get("id") and not record.get("slug") and record.get("name"):
+                        # Key name-only rows on their slug so re-importing a file is idempotent.
+                        record["slug"] = slugify(str(record["name"]))
+                    records.append(record)
+                first_line = line - len(chunk) + 1
+
+                with transaction.atomic():
+                    if options["create_categories"]:
+                        create_missing_categories({str(r["category"]) for r in records if r.get("category")})
+                    results = bulk_upsert_products(
+                        records, create=not options["no_create"], dry_run=dry_run
+                    )
+                    if dry_run:
+                        # New categories only exist for the diff.
+                        transaction.set_rollback(True)
+                for result in results:
+                    totals[result["status"]] += 1
+                    if result.get("id"):
+                        seen_ids.add(result["id"])
+                    if report:
+                        report.writerow([
+                            first_line + result["row"], result["status"], result.get("id") or "",
+                            result.get("slug") or "",
+                            "; ".join(f"{f}: {old} -> {new}" for f, (old, new) in result.get("changes", {}).items()),
+                            "; ".join(result.get("errors", [])),
+                        ])
+                    if dry_run and printed < options["verbose_diff"] and result["status"] != "unchanged":
+                        printed += 1
+                        self.stdout.write(self._describe(first_line + result["row"], result))
+
+                self.stdout.write(
+                    f"… {line - 1} rows: {totals['created']} new, {totals['updated']} changed, "
+                    f"{totals['unchanged']} unchanged, {totals['error']} errors"
+                )
+
+            deactivated = 0
+            if options["deactivate_missing"]:
+                if totals["error"]:
+                    self.stdout.write(self.style.WARNING(
+                        "⚠️ Skipping --deactivate-missing because some rows failed."
+                    ))
+                else:
+                    deactivated = self._deactivate_missing(seen_ids, dry_run)
+        finally:
+            if report:
+                report_file.close()
+
+        verb = "Would import" if dry_run else "Imported"
+        summary = (
+            f"{verb} {line - 1} rows: {totals['created']} created, {totals['updated']} updated, "
+            f"{totals['unchanged']} unchanged, {totals['error']} errors"
+        )
+        if options["deactivate_missing"]:
+            summary += f", {deactivated} deactivated"
+        style = self.style.WARNING if totals["error"] else self.style.SUCCESS
+        self.stdout.write(style(("🔎 " if dry_run else "✅ ") + summary))
+
+    def _describe(self, line, result):
+        if result["status"] == "error":
+            return self.style.ERROR(f"  line {line}: {'; '.join(result['errors'])}")
+        if result["status"] == "created":
+            return f"  line {line}: + {result['slug']}"
+        changes = ", ".join(f"{f} {old!r} → {new!r}" for f, (old, new) in result["changes"].items())
+        return f"  line {line}: ~ {result['slug']} ({changes})"
+
+    def _deactivate_missing(self, seen_ids, dry_run, batch=1000):
+        """Zero the stock of in-stock products absent from the file, in id batches."""
+        in_stock = Product.objects.filter(stock__gt=0).order_by("id").values_list("id", flat=True)
+        total = 0
+        last_id = 0
+        while True:
+            ids = list(in_stock.filter(id__gt=last_id)[:batch])
+            if not ids:
+                return total
+            last_id = ids[-1]
+            missing = [pk for pk in ids if pk not in seen_ids]
+            if missing:
+                if dry_run:
+                    total += len(missing)
+                else:
+                    total += Product.objects.filter(id__in=missing, stock__gt=0).update(
+                        stock=0, updated_at=timezone.now()
+                    )
@@ -0,0 +1,49 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.memory import read_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Summarize the memory log (MEMORY_PROFILING_ENABLED): views and commands "
+        "with the highest traced peak or RSS high-water growth, and where their "
+        "worst run allocated."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file", default=settings.MEMORY_LOG_FILE, help="Memory log to read")
+        parser.add_argument("--top", type=int, default=10, help="Labels to show")
+        parser.add_argument("--sites", type=int, default=3, help="Allocation sites per label")
+
+    def handle(self, *args, **options):
+        if not options["file"]:
+            raise CommandError("❌ No memory log: set MEMORY_LOG_FILE or pass --file")
+        runs = defaultdict(list)
+        for record in read_records(options["file"]):
+            runs[record["kind"], record["label"]].append(record)
+        if not runs:
+            self.stdout.write(self.style.WARNING(f"⚠️ No memory records in {options['file']}"))
+            return
+
+        def cost(record):
+            return max(record.get("peak_kb", 0), record["rss_growth_kb"])
+
+        worst = sorted(runs.items(), key=lambda item: max(map(cost, item[1])), reverse=True)
+        self.stdout.write(
+            f"{'kind':8} {'label':45} {'runs':>5} {'traced':>6} {'peak MiB':>9} {'RSS +MiB':>9} {'RSS MiB':>8}"
+        )
+        for (kind, label), records in worst[:options["top"]]:
+            traced = [r for r in records if "peak_kb" in r]
+            peak = max((r["peak_kb"] for r in traced), default=0)
+            self.stdout.write(
+                f"{kind:8} {label[:45]:45} {len(records):5} {len(traced):6} {peak / 1024:9.1f} "
+                f"{max(r['rss_growth_kb'] for r in records) / 1024:9.1f} "
+                f"{max(r['rss_kb'] for r in records) / 1024:8.1f}"
+            )
+            if traced:
+                for site in max(traced, key=lambda r: r["peak_kb"]).get("top", [])[:options["sites"]]:
+                    self.stdout.write(f"{'':9}↳ {site['site']} ({site['kb'] / 1024:.1f} MiB)")
+        self.stdout.write(self.style.SUCCESS(f"✅ {sum(map(len, runs.values()))} record(s), {len(runs)} label(s)"))
@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from shop.outbox import OutboxWorker, queue_stats
+
+
+class Command(BaseCommand):
+    help = "Deliver queued transactional emails from the outbox (run once, or keep polling with --loop)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="Emails claimed per batch")
+        parser.add_argument("--max-attempts", type=int, help="Attempts before an email is dead-lettered")
+        parser.add_argument("--loop", action="store_true", help="Keep polling instead of exiting when idle")
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds to sleep when idle (with --loop)")
+
+    def handle(self, *args, **options):
+        worker = OutboxWorker(
+            batch_size=options["batch_size"],
+            max_attempts=options["max_attempts"],
+        )
+        try:
+            while True:
+                processed = worker.drain()
+                if processed:
+                    stats = queue_stats()
+                    self.stdout.write(self.style.SUCCESS(
+                        f"✅ Processed {processed} email(s) — sent {worker.metrics['sent']}, "
+                        f"retrying {worker.metrics['retried']}, dead {worker.metrics['dead']}; "
+                        f"pending {stats['pending']}, oldest due {stats['oldest_due_seconds']:.0f}s"
+                    ))
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.close()
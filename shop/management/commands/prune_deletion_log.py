@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from shop.sync import prune_deletion_log
+
+
+class Command(BaseCommand):
+    help = "Delete sync-feed tombstones older than SYNC_TOMBSTONE_DAYS."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.SYNC_TOMBSTONE_DAYS, help="Retention in days")
+
+    def handle(self, *args, **options):
+        deleted = prune_deletion_log(options["days"])
+        self.stdout.write(self.style.SUCCESS(f"✅ Pruned {deleted} tombstone(s) older than {options['days']} days"))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from shop.models import NewsletterCampaign
+from shop.newsletter import CampaignSender
+
+
+class Command(BaseCommand):
+    help = (
+        "Send queued newsletter campaigns (or one campaign by id). "
+        "Interrupted campaigns resume from their last checkpoint; campaigns "
+        "another run is sending are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--campaign", type=int, help="Send only this campaign id")
+        parser.add_argument("--batch-size", type=int, help="Recipients per chunk")
+        parser.add_argument("--rate", type=float, help="Max messages per second (0 = unlimited)")
+        parser.add_argument("--connections", type=int, help="Number of reused SMTP connections")
+
+    def handle(self, *args, **options):
+        if options["campaign"]:
+            campaigns = NewsletterCampaign.objects.filter(pk=options["campaign"])
+            if not campaigns.exists():
+                raise CommandError(f"Campaign {options['campaign']} does not exist.")
+        else:
+            campaigns = NewsletterCampaign.objects.filter(
+                status__in=["queued", "sending"]
+            ).order_by("created_at")
+
+        for campaign in campaigns:
+            self.stdout.write(self.style.NOTICE(f"Sending campaign #{campaign.pk}: {campaign.subject}"))
+            sender = CampaignSender(
+                campaign,
+                batch_size=options["batch_size"],
+                rate=options["rate"],
+                connections=options["connections"],
+                stdout=self.stdout,
+            )
+            result = sender.run()
+            if result is None:
+                self.stdout.write(self.style.WARNING(
+                    f"⏭️ Campaign #{campaign.pk} is being sent by another run, skipped"
+                ))
+                continue
+            sent, failed = result
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Campaign #{campaign.pk} done: {sent} sent, {failed} failed"
+            ))
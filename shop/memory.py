@@ -0,0 +1,232 @@
+"""
+Memory high-water instrumentation (opt-in with MEMORY_PROFILING_ENABLED).
+
+Every request and management command records whether it raised the
+process RSS high-water mark (ru_maxrss, free to read). A MEMORY_SAMPLE_RATE
+fraction of requests, and commands when MEMORY_TRACE_COMMANDS is on,
+also run under tracemalloc: tracing restarts at the start so only
+allocations made by that run are seen, and a sampler thread snapshots the
+heap each time it grows by a quarter so the top allocation sites are taken
+close to the peak rather than after everything was freed.
+
+Records are JSON lines on the "shop.memory.records" logger, and also go to
+MEMORY_LOG_FILE when it is set (read by `manage.py memory_report`). Runs
+over MEMORY_WARN_MB log a warning on "shop.memory".
+"""
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger("shop.memory")
+records = logging.getLogger("shop.memory.records")  # JSON lines
+records.setLevel(logging.INFO)
+
+SKIP_FILES = {os.path.abspath(__file__), os.path.join(os.path.dirname(os.path.abspath(__file__)), "middleware.py")}
+SNAPSHOT_GROWTH = 1.25  # snapshot again once traced memory grows by 25%
+SNAPSHOT_MIN_BYTES = 1024 * 1024
+
+# Only one traced measurement at a time: tracemalloc is process-wide.
+_tracing = threading.Lock()
+
+
+def max_rss_kb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage // 1024 if sys.platform == "darwin" else usage  # bytes on macOS, KiB on Linux
+
+
+def current_rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return max_rss_kb()
+
+
+def _record_logger():
+    if not records.handlers and settings.MEMORY_LOG_FILE:
+        os.makedirs(os.path.dirname(os.path.abspath(settings.MEMORY_LOG_FILE)), exist_ok=True)
+        handler = RotatingFileHandler(
+            settings.MEMORY_LOG_FILE,
+            maxBytes=settings.MEMORY_LOG_MAX_BYTES,
+            backupCount=settings.MEMORY_LOG_BACKUPS,
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        records.addHandler(handler)
+    return records
+
+
+# -------------------------------------------------------------------
+# Allocation sites
+# -------------------------------------------------------------------
+
+def allocation_sites(snapshot, limit):
+    """Sizes grouped by innermost project frame, as [{"site": "shop/views.py:153", "kb": 812}]."""
+    base = str(settings.BASE_DIR) + os.sep
+    kinds = {}  # filename -> (is_project, display name); tracebacks share few files
+
+    def classify(filename):
+        if filename not in kinds:
+            path = os.path.abspath(filename)
+            if path in SKIP_FILES:
+                kinds[filename] = None
+            elif path.startswith(base) and "site-packages" not in path:
+                kinds[filename] = True, os.path.relpath(path, base)
+            else:
+                kinds[filename] = False, path.split(f"site-packages{os.sep}")[-1]
+        return kinds[filename]
+
+    sizes = defaultdict(int)
+    for stat in snapshot.statistics("traceback"):
+        site = None
+        for frame in reversed(stat.traceback):  # most recent call first
+            kind = classify(frame.filename)
+            if kind is None:
+                continue
+            if kind[0]:
+                site = f"{kind[1]}:{frame.lineno}"
+                break
+            if site is None:
+                site = f"{kind[1]}:{frame.lineno}"
+        sizes[site or "<unknown>"] += stat.size
+    top = sorted(sizes.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return [{"site": site, "kb": size // 1024} for site, size in top]
+
+
+class PeakSampler(threading.Thread):
+    """Keeps the heap snapshot taken closest to the traced peak."""
+
+    def __init__(self, interval):
+        super().__init__(name="memory-peak-sampler", daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.snapshot = None
+        self.snapshot_size = 0
+
+    def take(self):
+        size = tracemalloc.get_traced_memory()[0]
+        if size >= max(SNAPSHOT_MIN_BYTES, self.snapshot_size * SNAPSHOT_GROWTH):
+            self.snapshot, self.snapshot_size = tracemalloc.take_snapshot(), size
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.take()
+
+    def finish(self):
+        self.stopped.set()
+        self.join()
+        self.take()  # the end state may be the largest
+        return self.snapshot
+
+
+# -------------------------------------------------------------------
+# Measuring
+# -------------------------------------------------------------------
+
+@contextmanager
+def measure(label, kind, trace=False):
+    """
+    Record the memory cost of the enclosed block. With `trace`, run it under
+    tracemalloc (unless another block in this process already is).
+    """
+    traced = trace and not tracemalloc.is_tracing() and _tracing.acquire(blocking=False)
+    sampler = None
+    if traced:
+        tracemalloc.start(settings.MEMORY_TRACE_FRAMES)
+        sampler = PeakSampler(settings.MEMORY_SAMPLE_INTERVAL)
+        sampler.start()
+    high_water = max_rss_kb()
+    started = time.perf_counter()
+    record = {"at": timezone.now().isoformat(), "kind": kind, "label": label}
+    try:
+        yield record  # callers may refine the label once it is known
+    finally:
+        record.update({
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+            "rss_kb": current_rss_kb(),
+            "rss_growth_kb": max_rss_kb() - high_water,
+        })
+        if traced:
+            try:
+                snapshot = sampler.finish()
+                record["peak_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+                record["tracemalloc_kb"] = tracemalloc.get_tracemalloc_memory() // 1024  # included in RSS
+                record["top"] = allocation_sites(snapshot, settings.MEMORY_TOP_SITES) if snapshot else []
+            finally:
+                tracemalloc.stop()
+                _tracing.release()
+        if traced or record["rss_growth_kb"] > 0:
+            _report(record)
+
+
+def _report(record):
+    _record_logger().info(json.dumps(record))
+    worst_mb = max(record.get("peak_kb", 0), record["rss_growth_kb"]) / 1024
+    if worst_mb >= settings.MEMORY_WARN_MB:
+        traced = ""
+        if "peak_kb" in record:
+            top = ", ".join(f"{s['site']} {s['kb']} KiB" for s in record["top"][:3])
+            traced = f"; traced peak {record['peak_kb'] / 1024:.1f} MiB, top: {top or '-'}"
+        logger.warning(
+            "%s %s: RSS high-water +%.1f MiB (now %.1f MiB)%s",
+            record["kind"], record["label"], record["rss_growth_kb"] / 1024, record["rss_kb"] / 1024, traced,
+        )
+
+
+def should_trace():
+    return random.random() < settings.MEMORY_SAMPLE_RATE
+
+
+# -------------------------------------------------------------------
+# Management commands
+# -------------------------------------------------------------------
+
+UNMEASURED_COMMANDS = {"runserver", "shell", "dbshell", "test", "memory_report"}
+
+
+def instrument_commands():
+    """Measure every management command (called from ShopConfig.ready when enabled)."""
+    from django.core.management.base import BaseCommand
+
+    execute = BaseCommand.execute
+    if getattr(execute, "measured", False):
+        return
+
+    def measured_execute(self, *args, **options):
+        name = type(self).__module__.rsplit(".", 1)[-1]
+        if name in UNMEASURED_COMMANDS:
+            return execute(self, *args, **options)
+        with measure(f"manage.py {name}", "command", trace=settings.MEMORY_TRACE_COMMANDS):
+            return execute(self, *args, **options)
+
+    measured_execute.measured = True
+    BaseCommand.execute = measured_execute
+
+
+# -------------------------------------------------------------------
+# Reading the log (memory_report)
+# -------------------------------------------------------------------
+
+def read_records(path):
+    """Records from the log file and its rotated backups, oldest file first."""
+    paths = [f"{path}.{i}" for i in range(settings.MEMORY_LOG_BACKUPS, 0, -1)] + [path]
+    for name in paths:
+        if not os.path.exists(name):
+            continue
+        with open(name) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by rotation or a crash
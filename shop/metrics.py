@@ -0,0 +1,221 @@
+"""
+Prometheus metrics shared across gunicorn workers.
+
+Each process keeps its counters and histograms in plain dicts (no lock on
+the request path) and every METRICS_FLUSH_INTERVAL seconds replaces its own
+snapshot file in METRICS_DIR. The /metrics view merges every snapshot in
+the directory and adds gauges computed at scrape time (queue depth).
+
+When a process exits (atexit, or gunicorn's child_exit for a worker that
+was killed) its snapshot is folded into retired.json and removed, so
+totals survive worker restarts while the directory holds one file per
+live process. Empty METRICS_DIR when deploying.
+"""
+import atexit
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+import tempfile
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Count
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+RETIRED = "retired.json"
+
+# name -> (type, help, buckets)
+METRICS = {
+    "shop_http_requests_total": ("counter", "Requests by URL name, method and status.", None),
+    "shop_http_request_duration_seconds": ("histogram", "Request latency by URL name and method.", LATENCY_BUCKETS),
+    "shop_db_queries_per_request": ("histogram", "SQL queries per request by URL name.", QUERY_BUCKETS),
+    "shop_db_seconds_per_request": ("histogram", "SQL time per request by URL name.", LATENCY_BUCKETS),
+    "shop_cache_requests_total": ("counter", "Cache lookups by cache and result (hit/miss).", None),
+    "shop_orders_placed_total": ("counter", "Orders placed from the storefront.", None),
+    "shop_order_failures_total": ("counter", "Failed order placements by reason.", None),
+}
+
+# (name, labels) -> value, or [bucket counts..., +Inf count, sum] for histograms
+_values = defaultdict(float)
+_histograms = {}
+_last_flush = time.monotonic()
+_owner = None  # (pid, snapshot file name); set on first flush in each process
+
+
+def metrics_dir():
+    return getattr(settings, "METRICS_DIR", "") or os.path.join(tempfile.gettempdir(), "rian-metrics")
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    _values[_key(name, labels)] += amount
+
+
+def observe(name, value, **labels):
+    key = _key(name, labels)
+    series = _histograms.get(key)
+    if series is None:
+        series = _histograms[key] = [0] * (len(METRICS[name][2]) + 2)
+    series[bisect_left(METRICS[name][2], value)] += 1  # +Inf is the last bucket slot
+    series[-1] += value
+
+
+def reset():
+    """Drop this process's values (a forked worker must not re-report its parent's)."""
+    _values.clear()
+    _histograms.clear()
+
+
+def maybe_flush():
+    """Write this process's snapshot if the flush interval has passed."""
+    global _last_flush
+    now = time.monotonic()
+    if now - _last_flush >= settings.METRICS_FLUSH_INTERVAL:
+        _last_flush = now
+        flush()
+
+
+def _snapshot_name():
+    global _owner
+    if _owner is None or _owner[0] != os.getpid():
+        # Forked after import (gunicorn --preload): start a fresh file.
+        _owner = os.getpid(), f"{os.getpid()}-{time.time_ns()}.json"
+    return _owner[1]
+
+
+def _write(directory, filename, values, histograms):
+    snapshot = {
+        "values": [[name, list(labels), value] for (name, labels), value in list(values.items())],
+        "histograms": [[name, list(labels), series] for (name, labels), series in list(histograms.items())],
+    }
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(snapshot, f)
+    os.replace(tmp, os.path.join(directory, filename))
+
+
+@contextmanager
+def _locked(directory, exclusive=False):
+    """Readers see a snapshot either live or retired, never both or neither."""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, ".lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+
+def flush():
+    directory = metrics_dir()
+    os.makedirs(directory, exist_ok=True)
+    _write(directory, _snapshot_name(), _values, _histograms)
+
+
+def retire(pid):
+    """Fold the snapshot(s) of exited process `pid` into retired.json."""
+    directory = metrics_dir()
+    with _locked(directory, exclusive=True):
+        files = [f for f in os.listdir(directory) if f.startswith(f"{pid}-") and f.endswith(".json")]
+        if not files:
+            return 0
+        values, histograms = _collect(directory, [RETIRED, *files])
+        _write(directory, RETIRED, values, histograms)
+        for filename in files:
+            os.remove(os.path.join(directory, filename))
+    return len(files)
+
+
+@atexit.register
+def _flush_at_exit():
+    if _values or _histograms:
+        flush()
+    if _owner is not None and _owner[0] == os.getpid():
+        retire(os.getpid())
+
+
+# -------------------------------------------------------------------
+# Exposition
+# -------------------------------------------------------------------
+
+def _collect(directory, names):
+    values = defaultdict(float)
+    histograms = {}
+    for filename in names:
+        if not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue  # missing (no retired.json yet) or unreadable
+        for name, labels, value in snapshot["values"]:
+            values[name, tuple(map(tuple, labels))] += value
+        for name, labels, series in snapshot["histograms"]:
+            key = name, tuple(map(tuple, labels))
+            merged = histograms.setdefault(key, [0] * len(series))
+            for i, v in enumerate(series):
+                merged[i] += v
+    return values, histograms
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def queue_gauges():
+    """Background queue depth, read from the database at scrape time."""
+    from .models import CampaignDelivery, OutboxEmail
+
+    outbox = dict(
+        OutboxEmail.objects.filter(status__in=["pending", "dead"]).order_by()
+        .values_list("status").annotate(n=Count("id"))
+    )
+    deliveries = CampaignDelivery.objects.filter(status="pending").count()
+    return [
+        ("shop_outbox_queue_depth", "Outbox emails pending or dead-lettered.",
+         [((("status", s),), outbox.get(s, 0)) for s in ("pending", "dead")]),
+        ("shop_newsletter_queue_depth", "Newsletter deliveries waiting to be sent.", [((), deliveries)]),
+    ]
+
+
+def render():
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    flush()
+    directory = metrics_dir()
+    with _locked(directory):
+        values, histograms = _collect(directory, os.listdir(directory))
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        if kind == "histogram":
+            for (series_name, labels), series in sorted(histograms.items()):
+                if series_name != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip([*buckets, "+Inf"], series[:-1]):
+                    cumulative += count
+                    le = bound if bound == "+Inf" else _number(float(bound))
+                    lines.append(f"{name}_bucket{_labels(labels, le=le)} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(series[-1])}")
+                lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        else:
+            for (series_name, labels), value in sorted(values.items()):
+                if series_name == name:
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+    for name, help_text, samples in queue_gauges():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        lines += [f"{name}{_labels(labels)} {value}" for labels, value in samples]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,282 @@
+"""
+Request metrics and opt-in per-request profiling.
+
+MetricsMiddleware feeds shop.metrics (latency, SQL count and time per URL
+name) for the /metrics endpoint. SlowQueryMiddleware lets the slow query
+log attribute statements to the view that issued them. MemoryMiddleware
+records RSS high-water growth and sampled tracemalloc peaks (shop.memory).
+
+With PROFILING_ENABLED, staff requests and a PROFILING_SAMPLE_RATE fraction
+of the rest are profiled: SQL count and time (through execute_wrapper),
+cache hits and misses (reported by shop.caches), template render time,
+Cloudinary URL building and total time. The breakdown is returned in a
+Server-Timing header and logged as one JSON line on "shop.profiling".
+When disabled the middleware removes itself from the stack at startup.
+
+All of them are sync and async capable (HybridMiddleware), so under ASGI
+an async view is reached without a thread hop per middleware.
+"""
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from types import SimpleNamespace
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import memory, metrics, slow_queries
+
+logger = logging.getLogger("shop.profiling")
+
+_current = ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.timings = {"sql": 0.0, "cache": 0.0, "tpl": 0.0, "cdn": 0.0}
+        self._template_depth = 0
+
+    def add(self, name, seconds):
+        self.timings[name] += seconds
+
+    def execute(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.timings["sql"] += time.perf_counter() - start
+            self.sql_count += 1
+
+    def summary(self):
+        total = time.perf_counter() - self.started
+        return {
+            "total_ms": round(total * 1000, 2),
+            "sql_count": self.sql_count,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            **{f"{name}_ms": round(seconds * 1000, 2) for name, seconds in self.timings.items()},
+        }
+
+    def server_timing(self, summary):
+        return ", ".join([
+            f'sql;dur={summary["sql_ms"]};desc="{self.sql_count} queries"',
+            f'cache;dur={summary["cache_ms"]};desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            f'tpl;dur={summary["tpl_ms"]};desc="templates"',
+            f'cdn;dur={summary["cdn_ms"]};desc="image urls"',
+            f'total;dur={summary["total_ms"]}',
+        ])
+
+
+def record_cache(hits, misses, seconds=0.0):
+    profile = _current.get()
+    if profile is not None:
+        profile.cache_hits += hits
+        profile.cache_misses += misses
+        profile.add("cache", seconds)
+
+
+# -------------------------------------------------------------------
+# Instrumentation (installed once, only when profiling is enabled)
+# -------------------------------------------------------------------
+
+_installed = False
+
+
+def _install_hooks():
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    from cloudinary import CloudinaryResource
+    from django.template.base import Template
+
+    template_render = Template.render
+
+    def render(self, context):
+        profile = _current.get()
+        if profile is None:
+            return template_render(self, context)
+        # Included templates render inside their parent; only time the outermost.
+        profile._template_depth += 1
+        start = time.perf_counter()
+        try:
+            return template_render(self, context)
+        finally:
+            profile._template_depth -= 1
+            if not profile._template_depth:
+                profile.add("tpl", time.perf_counter() - start)
+
+    build_url = CloudinaryResource.build_url
+
+    def timed_build_url(self, **options):
+        profile = _current.get()
+        if profile is None:
+            return build_url(self, **options)
+        start = time.perf_counter()
+        try:
+            return build_url(self, **options)
+        finally:
+            profile.add("cdn", time.perf_counter() - start)
+
+    Template.render = render
+    CloudinaryResource.build_url = timed_build_url
+
+
+# -------------------------------------------------------------------
+# Middleware
+# -------------------------------------------------------------------
+
+class HybridMiddleware:
+    """
+    Base for middleware that wraps the rest of the stack. Subclasses
+    implement wrap(request), a context manager run around get_response;
+    the response is available as ``call.response`` after its yield.
+    """
+    sync_capable = True
+    async_capable = True
+    enabled_setting = None
+
+    def __init__(self, get_response):
+        if self.enabled_setting and not getattr(settings, self.enabled_setting):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with self.wrap(request) as call:
+            call.response = self.get_response(request)
+        return call.response
+
+    async def __acall__(self, request):
+        await self.aprepare(request)
+        with self.wrap(request) as call:
+            call.response = await self.get_response(request)
+        return call.response
+
+    async def aprepare(self, request):
+        """Load anything wrap() needs that would touch the DB (async path)."""
+
+    @contextmanager
+    def wrap(self, request):
+        yield SimpleNamespace(response=None)
+
+
+class ProfilingMiddleware(HybridMiddleware):
+    enabled_setting = "PROFILING_ENABLED"
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        _install_hooks()
+
+    def should_profile(self, request):
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        user = getattr(request, "user", None)
+        return bool(settings.PROFILING_STAFF and user is not None and user.is_staff)
+
+    async def aprepare(self, request):
+        # request.user is lazy and would query synchronously in should_profile().
+        if settings.PROFILING_STAFF and hasattr(request, "auser"):
+            request.user = await request.auser()
+
+    @contextmanager
+    def wrap(self, request):
+        call = SimpleNamespace(response=None)
+        if not self.should_profile(request):
+            yield call
+            return
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(profile.execute))
+                yield call
+        finally:
+            _current.reset(token)
+
+        response = call.response
+        summary = profile.summary()
+        response["Server-Timing"] = profile.server_timing(summary)
+        logger.info(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            **summary,
+        }))
+
+
+class MetricsMiddleware(HybridMiddleware):
+    enabled_setting = "METRICS_ENABLED"
+
+    @contextmanager
+    def wrap(self, request):
+        call = SimpleNamespace(response=None)
+        queries = [0, 0.0]
+
+        def count(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries[0] += 1
+                queries[1] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(count))
+            yield call
+        elapsed = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = match.view_name if match else "<unmatched>"
+        metrics.inc("shop_http_requests_total", view=view, method=request.method, status=call.response.status_code)
+        metrics.observe("shop_http_request_duration_seconds", elapsed, view=view, method=request.method)
+        metrics.observe("shop_db_queries_per_request", queries[0], view=view)
+        metrics.observe("shop_db_seconds_per_request", queries[1], view=view)
+        metrics.maybe_flush()
+
+
+class SlowQueryMiddleware(HybridMiddleware):
+    enabled_setting = "SLOW_QUERY_MS"
+
+    @contextmanager
+    def wrap(self, request):
+        token = slow_queries.current_request.set(request)
+        try:
+            yield SimpleNamespace(response=None)
+        finally:
+            slow_queries.current_request.reset(token)
+
+
+class MemoryMiddleware(HybridMiddleware):
+    """
+    Under ASGI requests overlap in one process, so RSS growth and traced
+    peaks are attributed to whichever request observed them.
+    """
+    enabled_setting = "MEMORY_PROFILING_ENABLED"
+
+    @contextmanager
+    def wrap(self, request):
+        call = SimpleNamespace(response=None)
+        with memory.measure(f"{request.method} {request.path}", "request", trace=memory.should_trace()) as record:
+            yield call
+            if request.resolver_match:
+                record["label"] = f"{request.method} {request.resolver_match.view_name}"
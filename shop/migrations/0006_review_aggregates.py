@@ -0,0 +1,77 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:47
+
+from django.db import migrations, models
+
+
+def backfill_rating_stats(apps, schema_editor):
+    Product = apps.get_model("shop", "Product")
+    Review = apps.get_model("shop", "Review")
+
+    stats = {}
+    rows = Review.objects.order_by().values_list("product_id", "rating").annotate(n=models.Count("id"))
+    for product_id, rating, n in rows:
+        stats.setdefault(product_id, {})[rating] = n
+
+    products = list(Product.objects.filter(id__in=stats.keys()))
+    for product in products:
+        counts = stats[product.id]
+        total = sum(counts.values())
+        product.rating_count = total
+        product.rating_avg = round(sum(star * n for star, n in counts.items()) / total, 2)
+        for star in range(1, 6):
+            setattr(product, f"rating_{star}", counts.get(star, 0))
+    Product.objects.bulk_update(
+        products,
+        ["rating_avg", "rating_count", "rating_1", "rating_2", "rating_3", "rating_4", "rating_5"],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0005_outbox_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['product', '-created_at'], name='review_product_recent_idx'),
+        ),
+        migrations.RunPython(backfill_rating_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:01
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0008_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='productimage',
+            options={'ordering': ['id']},
+        ),
+    ]
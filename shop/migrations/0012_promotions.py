@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0011_cart_lines'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='discount',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='Promotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=120)),
+                ('kind', models.CharField(choices=[('percent', 'Percent off'), ('bogo', 'Buy X get Y free'), ('threshold', 'Cart total threshold')], max_length=20)),
+                ('active', models.BooleanField(default=True)),
+                ('starts_at', models.DateTimeField(blank=True, null=True)),
+                ('ends_at', models.DateTimeField(blank=True, null=True)),
+                ('percent', models.PositiveSmallIntegerField(default=0, help_text='Percent off (percent, threshold)')),
+                ('amount_off', models.PositiveIntegerField(default=0, help_text='KES off the cart (threshold)')),
+                ('buy_qty', models.PositiveSmallIntegerField(default=0, help_text='Buy this many… (bogo)')),
+                ('get_qty', models.PositiveSmallIntegerField(default=0, help_text='…get this many free (bogo)')),
+                ('min_subtotal', models.PositiveIntegerField(default=0, help_text='KES (threshold)')),
+                ('categories', models.ManyToManyField(blank=True, related_name='promotions', to='shop.category')),
+                ('products', models.ManyToManyField(blank=True, related_name='promotions', to='shop.product')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
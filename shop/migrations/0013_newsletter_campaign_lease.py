@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0012_promotions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newslettercampaign',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='newslettercampaign',
+            name='lease_owner',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
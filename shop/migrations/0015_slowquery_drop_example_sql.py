@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:33
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0014_order_recent_index'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='slowquery',
+            name='example_sql',
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:55
+
+from django.db import migrations
+
+
+def clear_sent_bodies(apps, schema_editor):
+    # Delivered emails no longer keep their bodies (password reset links).
+    OutboxEmail = apps.get_model("shop", "OutboxEmail")
+    OutboxEmail.objects.filter(status="sent").update(body_text="", body_html="")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0015_slowquery_drop_example_sql'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_sent_bodies, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
-from django.db import models
+from django.db import connection, models
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.utils.text import slugify
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.utils import timezone
@@ -30,6 +31,109 @@ class NewsletterSubscription(models.Model):
         return self.email
 
 
+class NewsletterCampaign(TimeStamped):
+    """A single email blast to every NewsletterSubscription."""
+
+    STATUS_CHOICES = [
+        ("draft", "Draft"),
+        ("queued", "Queued"),
+        ("sending", "Sending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    ]
+
+    subject = models.CharField(max_length=200)
+    body_text = models.TextField(help_text="Plain-text body")
+    body_html = models.TextField(blank=True, help_text="Optional HTML body")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="draft")
+
+    # Checkpoint: highest NewsletterSubscription.id already processed.
+    last_subscription_id = models.BigIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    # Lease held by the send_newsletter run that is sending it; a "sending"
+    # campaign whose lease has expired was interrupted and can be resumed.
+    lease_owner = models.CharField(max_length=64, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return self.subject
+
+
+class CampaignDelivery(TimeStamped):
+    """Per-recipient send status for a NewsletterCampaign."""
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    ]
+
+    campaign = models.ForeignKey(
+        NewsletterCampaign,
+        on_delete=models.CASCADE,
+        related_name="deliveries"
+    )
+    subscription = models.ForeignKey(
+        NewsletterSubscription,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True
+    )
+    email = models.EmailField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    error = models.CharField(max_length=255, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["campaign", "email"], name="unique_campaign_delivery"),
+        ]
+
+    def __str__(self):
+        return f"{self.email} ({self.status})"
+
+
+class OutboxEmail(TimeStamped):
+    """
+    Transactional email written by views inside their own transaction and
+    delivered later by the `process_outbox` worker.
+    """
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("sent", "Sent"),
+        ("dead", "Dead"),
+    ]
+
+    kind = models.CharField(max_length=40, blank=True)  # e.g. "password_reset"
+    to_email = models.EmailField()
+    from_email = models.CharField(max_length=255, blank=True)
+    subject = models.CharField(max_length=255)
+    body_text = models.TextField()
+    body_html = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind or 'email'} → {self.to_email} ({self.status})"
+
+
 class ContactMessage(TimeStamped):
     name = models.CharField(max_length=255)
     email = models.EmailField()
@@ -47,6 +151,9 @@ class Category(TimeStamped):
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            models.Index(fields=["updated_at", "id"], name="category_sync_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -100,17 +207,115 @@ class Product(TimeStamped):
         help_text="Optional per-product WhatsApp contact"
     )
 
+    # ✅ Denormalized review aggregates (kept in sync by shop.signals)
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_5 = models.PositiveIntegerField(default=0, editable=False)
+
+    RATING_FIELDS = (
+        "rating_avg", "rating_count",
+        "rating_1", "rating_2", "rating_3", "rating_4", "rating_5",
+    )
+
     class Meta:
         ordering = ["-created_at"]
+        # Trailing "-id" matches the pk tiebreaker of cursor pagination.
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="product_recent_idx"),
+            models.Index(fields=["category", "-created_at", "-id"], name="product_category_recent_idx"),
+            models.Index(
+                fields=["-created_at", "-id"], name="product_featured_recent_idx",
+                condition=models.Q(featured=True),
+            ),
+            models.Index(
+                fields=["-created_at", "-id"], name="product_in_stock_recent_idx",
+                condition=models.Q(stock__gt=0),
+            ),
+            models.Index(fields=["price", "id"], name="product_price_idx"),
+            models.Index(fields=["watts", "id"], name="product_watts_idx"),
+            models.Index(fields=["updated_at", "id"], name="product_sync_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            # Never write back (possibly stale) rating aggregates on a normal edit;
+            # they are only changed by apply_rating_delta/recompute_rating_stats.
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.RATING_FIELDS
+            ]
         super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
 
+    # ---------- Review aggregates ----------
+    @classmethod
+    def apply_rating_delta(cls, product_id, added=None, removed=None):
+        """
+        Adjust the rating histogram in a single UPDATE: +1 for the `added`
+        star value, -1 for the `removed` one. The average is computed from the
+        pre-update column values plus the delta, so no read is needed.
+        """
+        deltas = {star: 0 for star in range(1, 6)}
+        if added:
+            deltas[added] += 1
+        if removed:
+            deltas[removed] -= 1
+        count_delta = sum(deltas.values())
+        sum_delta = sum(star * d for star, d in deltas.items())
+        if not any(deltas.values()):
+            return
+
+        old_sum = sum((models.F(f"rating_{star}") * star for star in range(2, 6)), models.F("rating_1"))
+        new_count = models.F("rating_count") + count_delta
+        updates = {
+            f"rating_{star}": models.F(f"rating_{star}") + d
+            for star, d in deltas.items() if d
+        }
+        updates["rating_count"] = new_count
+        updates["updated_at"] = timezone.now()  # invalidates cached product JSON
+        updates["rating_avg"] = models.Case(
+            models.When(rating_count=-count_delta, then=models.Value(0)),
+            default=models.ExpressionWrapper(
+                (old_sum + sum_delta) * 1.0 / new_count,
+                output_field=models.DecimalField(max_digits=3, decimal_places=2),
+            ),
+            output_field=models.DecimalField(max_digits=3, decimal_places=2),
+        )
+        cls.objects.filter(pk=product_id).update(**updates)
+
+    def recompute_rating_stats(self):
+        """Rebuild the aggregates from scratch (backfills and repairs)."""
+        counts = dict(
+            self.reviews.order_by().values_list("rating").annotate(n=models.Count("id"))
+        )
+        total = sum(counts.values())
+        for star in range(1, 6):
+            setattr(self, f"rating_{star}", counts.get(star, 0))
+        self.rating_count = total
+        self.rating_avg = (
+            round(sum(star * n for star, n in counts.items()) / total, 2) if total else 0
+        )
+        self.updated_at = timezone.now()
+        Product.objects.filter(pk=self.pk).update(
+            updated_at=self.updated_at,
+            rating_count=self.rating_count,
+            rating_avg=self.rating_avg,
+            **{f"rating_{star}": getattr(self, f"rating_{star}") for star in range(1, 6)},
+        )
+
+    @property
+    def rating_histogram(self):
+        """[(5, count), (4, count), ...] for templates."""
+        return [(star, getattr(self, f"rating_{star}")) for star in range(5, 0, -1)]
+
     # ---------- Helper properties ----------
     @property
     def is_new(self):
@@ -146,6 +351,11 @@ class ProductImage(TimeStamped):
         help_text="Additional gallery image"
     )
 
+    class Meta:
+        # An explicit ordering lets `product.images.first` (used by the cards)
+        # read from prefetch_related("images") instead of querying per product.
+        ordering = ["id"]
+
     def __str__(self):
         return f"Image for {self.product.name}"
 
@@ -160,6 +370,65 @@ class Review(TimeStamped):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["product", "-created_at", "-id"], name="review_product_recent_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was loaded so signals can apply a rating delta on update.
+        instance._loaded_rating = (
+            instance.__dict__.get("product_id"),
+            instance.__dict__.get("rating"),
+        )
+        return instance
+
+
+class Promotion(TimeStamped):
+    """
+    A discount rule, evaluated for carts and orders by shop.promotions.
+    Line rules (percent, bogo) apply to the listed products and categories,
+    or to every product when both are empty; the best one wins per line.
+    Threshold rules apply to the whole cart once it reaches min_subtotal.
+    """
+    KIND_CHOICES = [
+        ("percent", "Percent off"),
+        ("bogo", "Buy X get Y free"),
+        ("threshold", "Cart total threshold"),
+    ]
+    name = models.CharField(max_length=120)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    active = models.BooleanField(default=True)
+    starts_at = models.DateTimeField(null=True, blank=True)
+    ends_at = models.DateTimeField(null=True, blank=True)
+
+    percent = models.PositiveSmallIntegerField(default=0, help_text="Percent off (percent, threshold)")
+    amount_off = models.PositiveIntegerField(default=0, help_text="KES off the cart (threshold)")
+    buy_qty = models.PositiveSmallIntegerField(default=0, help_text="Buy this many… (bogo)")
+    get_qty = models.PositiveSmallIntegerField(default=0, help_text="…get this many free (bogo)")
+    min_subtotal = models.PositiveIntegerField(default=0, help_text="KES (threshold)")
+
+    products = models.ManyToManyField(Product, blank=True, related_name="promotions")
+    categories = models.ManyToManyField(Category, blank=True, related_name="promotions")
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        if self.kind == "percent" and not 0 < self.percent <= 100:
+            raise ValidationError({"percent": "Enter a percentage between 1 and 100."})
+        if self.kind == "bogo" and not (self.buy_qty and self.get_qty):
+            raise ValidationError("Buy X get Y needs both quantities.")
+        if self.kind == "threshold" and not (self.percent or self.amount_off):
+            raise ValidationError("A threshold rule needs a percent or an amount off.")
+        if self.percent > 100:
+            raise ValidationError({"percent": "Enter a percentage between 1 and 100."})
+        if self.starts_at and self.ends_at and self.ends_at <= self.starts_at:
+            raise ValidationError({"ends_at": "Must be after the start."})
 
 
 class Address(TimeStamped):
@@ -171,6 +440,11 @@ class Address(TimeStamped):
     city = models.CharField(max_length=80)
     notes = models.CharField(max_length=200, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-created_at", "-id"], name="address_user_recent_idx"),
+        ]
+
 
 class Order(TimeStamped):
     STATUS_CHOICES = [
@@ -182,17 +456,23 @@ class Order(TimeStamped):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="new")
     address = models.ForeignKey(Address, on_delete=models.SET_NULL, null=True, blank=True)
-    total = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)  # amount due, after discount
+    discount = models.PositiveIntegerField(default=0)  # promotions applied when ordered (shop.promotions)
     whatsapp_number = models.CharField(max_length=32, blank=True)  # for customer notification
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "-created_at", "-id"], name="order_user_recent_idx"),
+            models.Index(fields=["-created_at", "-id"], name="order_recent_idx"),  # staff list
+        ]
 
     def __str__(self):
         return f"Order #{self.pk} - {self.status}"
 
     def recalc_total(self):
-        self.total = sum(item.qty * item.price_each for item in self.items.all())
+        subtotal = sum(item.qty * item.price_each for item in self.items.all())
+        self.total = max(subtotal - self.discount, 0)
         self.save(update_fields=["total"])
 
 
@@ -210,6 +490,55 @@ class OrderItem(TimeStamped):
         return self.qty * self.price_each
 
 
+class CartLineManager(models.Manager):
+    def upsert(self, user_id, quantities, increment=True):
+        """
+        Write {product_id: qty} for a user in one INSERT ... ON CONFLICT
+        statement, adding to existing lines (or replacing them with
+        increment=False). Returns the resulting {product_id: qty}.
+        """
+        if not quantities:
+            return {}
+        qn = connection.ops.quote_name
+        table = qn(self.model._meta.db_table)
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        qty = f"{table}.{qn('qty')} + EXCLUDED.{qn('qty')}" if increment else f"EXCLUDED.{qn('qty')}"
+        sql = (
+            f"INSERT INTO {table} ({qn('user_id')}, {qn('product_id')}, {qn('qty')}, "
+            f"{qn('created_at')}, {qn('updated_at')}) "
+            f"VALUES {', '.join(['(%s, %s, %s, %s, %s)'] * len(quantities))} "
+            f"ON CONFLICT ({qn('user_id')}, {qn('product_id')}) DO UPDATE "
+            f"SET {qn('qty')} = {qty}, {qn('updated_at')} = EXCLUDED.{qn('updated_at')}"
+        )
+        params = [v for pid, n in quantities.items() for v in (user_id, pid, n, now, now)]
+        returning = connection.features.can_return_rows_from_bulk_insert
+        if returning:
+            sql += f" RETURNING {qn('product_id')}, {qn('qty')}"
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            if returning:
+                return dict(cursor.fetchall())
+        return dict(self.filter(user_id=user_id, product_id__in=quantities).values_list("product_id", "qty"))
+
+
+class CartLine(TimeStamped):
+    """A logged-in user's cart, one row per product (see shop.cart.Cart)."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="cart_lines")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    qty = models.PositiveIntegerField(default=1)
+
+    objects = CartLineManager()
+
+    class Meta:
+        ordering = ["created_at", "id"]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "product"], name="cartline_user_product_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.qty} x {self.product_id} for user {self.user_id}"
+
+
 class SiteConfig(models.Model):
     """Global settings like WhatsApp, phone, and email support"""
 
@@ -289,3 +618,46 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 
     def get_short_name(self):
         return self.first_name or self.username
+
+
+class DeletionLog(models.Model):
+    """
+    Tombstones for the sync feed: one tiny row per deleted Product/Category
+    so mirrors can drop rows they hold. Old entries are pruned after
+    SYNC_TOMBSTONE_DAYS (see prune_deletion_log).
+    """
+    model = models.CharField(max_length=32)  # model_name, e.g. "product"
+    object_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["model", "deleted_at", "id"], name="deletionlog_sync_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
+
+
+class SlowQuery(models.Model):
+    """
+    Slow statements aggregated by normalized SQL fingerprint and call site
+    (see shop.slow_queries). One row per fingerprint; counters accumulate.
+    """
+    fingerprint = models.CharField(max_length=40, unique=True)  # sha1 of call site + normalized SQL
+    sql = models.TextField()  # normalized: literals replaced by "?"
+    call_site = models.CharField(max_length=255)  # e.g. "shop/views.py:search_products"
+    source = models.CharField(max_length=255, blank=True)  # last view or command seen
+    count = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    plan = models.TextField(blank=True)  # latest sampled EXPLAIN output
+    first_seen = models.DateTimeField(default=timezone.now)
+    last_seen = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-total_ms"]
+        verbose_name_plural = "slow queries"
+
+    def __str__(self):
+        return f"{self.call_site} ({self.count}x, {self.total_ms:.0f} ms)"
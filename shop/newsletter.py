@@ -0,0 +1,259 @@
+"""
+Newsletter campaign sender.
+
+Recipients are streamed from NewsletterSubscription in id order, a chunk at a
+time, and sent over a small pool of long-lived SMTP connections (one per
+worker thread). Progress is checkpointed on the campaign after every chunk,
+so a crashed run picks up where it stopped instead of starting over.
+
+A run first claims the campaign with a conditional UPDATE, so only one
+run sends it at a time, and renews that lease with every checkpoint. A
+"sending" campaign is resumed only once its lease has expired.
+
+For local testing, point EMAIL_HOST/EMAIL_PORT at an SMTP stand-in, e.g.:
+
+    python -m aiosmtpd -n -l localhost:1025
+"""
+import smtplib
+import threading
+import time
+import uuid
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import NewsletterCampaign, CampaignDelivery, NewsletterSubscription
+
+CLAIMABLE_STATUSES = ("draft", "queued", "sending", "failed")
+
+
+class LeaseLost(Exception):
+    """Another run took the campaign over (this run's lease expired)."""
+
+
+class RateLimiter:
+    """Token bucket shared by all sender threads (messages per second)."""
+
+    def __init__(self, rate):
+        self.rate = float(rate or 0)
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def wait(self):
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + 1.0 / self.rate
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class ConnectionPool:
+    """
+    One open email connection per sender thread, reused for every message
+    that thread sends. Connections are reopened once if the server drops them.
+    """
+
+    def __init__(self, connection_factory=None):
+        self.connection_factory = connection_factory or (
+            lambda: get_connection(fail_silently=False)
+        )
+        self._local = threading.local()
+        self._all = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = self.connection_factory()
+            conn.open()
+            self._local.connection = conn
+            with self._lock:
+                self._all.append(conn)
+        return conn
+
+    def reset(self):
+        conn = getattr(self._local, "connection", None)
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._local.connection = None
+
+    def close_all(self):
+        with self._lock:
+            for conn in self._all:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._all = []
+
+
+class CampaignSender:
+    def __init__(self, campaign, batch_size=None, rate=None, connections=None,
+                 connection_factory=None, stdout=None):
+        self.campaign = campaign
+        self.batch_size = batch_size or getattr(settings, "NEWSLETTER_BATCH_SIZE", 500)
+        self.connections = connections or getattr(settings, "NEWSLETTER_CONNECTIONS", 2)
+        self.limiter = RateLimiter(
+            rate if rate is not None else getattr(settings, "NEWSLETTER_RATE_LIMIT", 5)
+        )
+        self.pool = ConnectionPool(connection_factory)
+        self.stdout = stdout
+        self.lease = timedelta(seconds=getattr(settings, "NEWSLETTER_LEASE_SECONDS", 600))
+        self.owner = uuid.uuid4().hex
+
+    # ---------- Public API ----------
+    def claim(self):
+        """
+        Take the campaign for this run. Only one of several concurrent runs
+        gets it: the UPDATE matches while nobody holds an unexpired lease.
+        """
+        now = timezone.now()
+        claimed = NewsletterCampaign.objects.filter(
+            Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now) | Q(lease_owner=self.owner),
+            pk=self.campaign.pk, status__in=CLAIMABLE_STATUSES,
+        ).update(
+            status="sending", lease_owner=self.owner, lease_expires_at=now + self.lease,
+            started_at=Coalesce("started_at", now), updated_at=now,
+        )
+        if claimed:
+            # Resume from the checkpoint the previous run left.
+            self.campaign.refresh_from_db()
+        return bool(claimed)
+
+    def run(self):
+        """
+        Send the campaign from its last checkpoint. Returns (sent, failed),
+        or None when another run holds the campaign.
+        """
+        if not self.claim():
+            return None
+
+        sent = failed = 0
+        try:
+            with ThreadPoolExecutor(max_workers=self.connections) as executor:
+                for chunk in self._chunks():
+                    s, f = self._send_chunk(executor, chunk)
+                    sent += s
+                    failed += f
+        except Exception:
+            # No-op when the lease was lost: the campaign belongs to another run.
+            self._release(status="failed")
+            raise
+        finally:
+            self.pool.close_all()
+
+        self._release(status="sent", finished_at=timezone.now())
+        return sent, failed
+
+    # ---------- Internals ----------
+    def _held(self):
+        return NewsletterCampaign.objects.filter(pk=self.campaign.pk, lease_owner=self.owner)
+
+    def _release(self, **fields):
+        self._held().update(lease_owner="", lease_expires_at=None, updated_at=timezone.now(), **fields)
+        self.campaign.refresh_from_db()
+
+    def _chunks(self):
+        subscriptions = (
+            NewsletterSubscription.objects
+            .filter(id__gt=self.campaign.last_subscription_id)
+            .order_by("id")
+            .values_list("id", "email")
+            .iterator(chunk_size=self.batch_size)
+        )
+        while True:
+            chunk = list(islice(subscriptions, self.batch_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def _send_chunk(self, executor, chunk):
+        campaign = self.campaign
+
+        # Record pending rows first; rows left over from a crashed run are kept.
+        CampaignDelivery.objects.bulk_create(
+            [
+                CampaignDelivery(campaign=campaign, subscription_id=sub_id, email=email)
+                for sub_id, email in chunk
+            ],
+            ignore_conflicts=True,
+        )
+        deliveries = list(
+            CampaignDelivery.objects
+            .filter(campaign=campaign, email__in=[email for _, email in chunk])
+            .exclude(status="sent")
+        )
+
+        now = timezone.now()
+        for delivery, error in zip(deliveries, executor.map(self._send_one, deliveries)):
+            delivery.status = "failed" if error else "sent"
+            delivery.error = (error or "")[:255]
+            delivery.sent_at = None if error else now
+            delivery.updated_at = now
+        CampaignDelivery.objects.bulk_update(
+            deliveries, ["status", "error", "sent_at", "updated_at"],
+            batch_size=self.batch_size,
+        )
+
+        sent = sum(1 for d in deliveries if d.status == "sent")
+        failed = len(deliveries) - sent
+
+        # Checkpoint after the chunk is durable, renewing the lease.
+        campaign.last_subscription_id = chunk[-1][0]
+        if not self._held().update(
+            last_subscription_id=campaign.last_subscription_id,
+            sent_count=F("sent_count") + sent,
+            failed_count=F("failed_count") + failed,
+            lease_expires_at=now + self.lease,
+            updated_at=now,
+        ):
+            raise LeaseLost(f"campaign #{campaign.pk} was claimed by another run")
+
+        if self.stdout:
+            self.stdout.write(
+                f"  up to subscription #{campaign.last_subscription_id}: "
+                f"{sent} sent, {failed} failed"
+            )
+        return sent, failed
+
+    def _build_message(self, delivery, connection):
+        campaign = self.campaign
+        message = EmailMultiAlternatives(
+            subject=campaign.subject,
+            body=campaign.body_text,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[delivery.email],
+            connection=connection,
+        )
+        if campaign.body_html:
+            message.attach_alternative(campaign.body_html, "text/html")
+        return message
+
+    def _send_one(self, delivery):
+        """Send to one recipient. Returns an error string or None."""
+        self.limiter.wait()
+        for attempt in range(2):
+            connection = self.pool.get()
+            try:
+                self._build_message(delivery, connection).send()
+                return None
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                # Dropped connection: reopen once and retry this recipient.
+                self.pool.reset()
+                if attempt:
+                    return str(e)
+            except Exception as e:
+                return str(e)
@@ -0,0 +1,208 @@
+"""
+Transactional email outbox.
+
+Views call `enqueue()` inside the same transaction as the write that
+triggered the email, so an email row exists if and only if the order (or
+reset request) was committed. The `process_outbox` command drains due rows
+in batches over one persistent connection, retrying failures with
+exponential backoff and dead-lettering them after OUTBOX_MAX_ATTEMPTS.
+Bodies can carry password reset links, so they are cleared once sent;
+the row stays as a delivery record.
+"""
+import logging
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Count, F, Min
+from django.template import loader
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger("shop.outbox")
+
+# Seconds a claimed row stays invisible to other workers while being sent.
+CLAIM_LEASE = 300
+
+
+def enqueue(to_email, subject, body_text, body_html="", kind="", from_email=None):
+    """Write an email to the outbox. Call inside the caller's transaction."""
+    return OutboxEmail.objects.create(
+        kind=kind,
+        to_email=to_email,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        subject="".join(subject.splitlines()),
+        body_text=body_text,
+        body_html=body_html,
+    )
+
+
+def enqueue_template(to_email, subject_template_name, text_template_name, context,
+                     html_template_name=None, kind="", from_email=None):
+    """Render templates now (while the data is at hand) and enqueue the result."""
+    subject = loader.render_to_string(subject_template_name, context)
+    body_text = loader.render_to_string(text_template_name, context)
+    body_html = loader.render_to_string(html_template_name, context) if html_template_name else ""
+    return enqueue(to_email, subject, body_text, body_html, kind=kind, from_email=from_email)
+
+
+def enqueue_order_confirmation(order):
+    """Queue the customer's confirmation email for a freshly placed order."""
+    if not (order.user and order.user.email):
+        return None
+    context = {"order": order, "items": list(order.items.select_related("product"))}
+    return enqueue_template(
+        order.user.email,
+        "emails/order_confirmation_subject.txt",
+        "emails/order_confirmation.txt",
+        context,
+        html_template_name="emails/order_confirmation.html",
+        kind="order_confirmation",
+    )
+
+
+def backoff_delay(attempts):
+    """Exponential backoff: base * 2^(attempts-1), capped."""
+    base = getattr(settings, "OUTBOX_BACKOFF_BASE", 30)
+    cap = getattr(settings, "OUTBOX_BACKOFF_MAX", 3600)
+    return timedelta(seconds=min(cap, base * (2 ** max(attempts - 1, 0))))
+
+
+def queue_stats():
+    """Queue depth and age of the oldest due email, for metrics and logs."""
+    now = timezone.now()
+    by_status = dict(
+        OutboxEmail.objects.order_by().values_list("status").annotate(n=Count("id"))
+    )
+    oldest = (
+        OutboxEmail.objects.filter(status="pending", next_attempt_at__lte=now)
+        .aggregate(oldest=Min("created_at"))["oldest"]
+    )
+    return {
+        "pending": by_status.get("pending", 0),
+        "sent": by_status.get("sent", 0),
+        "dead": by_status.get("dead", 0),
+        "oldest_due_seconds": (now - oldest).total_seconds() if oldest else 0.0,
+    }
+
+
+class OutboxWorker:
+    def __init__(self, batch_size=None, max_attempts=None, connection=None):
+        self.batch_size = batch_size or getattr(settings, "OUTBOX_BATCH_SIZE", 50)
+        self.max_attempts = max_attempts or getattr(settings, "OUTBOX_MAX_ATTEMPTS", 8)
+        self._connection = connection
+        self.metrics = {"sent": 0, "retried": 0, "dead": 0, "batches": 0}
+
+    # ---------- Connection (one per worker, reused across batches) ----------
+    @property
+    def connection(self):
+        if self._connection is None:
+            self._connection = get_connection(fail_silently=False)
+        return self._connection
+
+    def reset_connection(self):
+        try:
+            self.connection.close()
+        except Exception:
+            pass
+        self._connection = None
+
+    def close(self):
+        if self._connection is not None:
+            self.reset_connection()
+
+    # ---------- Draining ----------
+    def claim_batch(self):
+        """
+        Lock a batch of due rows (skipping rows another worker holds) and push
+        their next_attempt_at past a lease, so they are not picked up twice.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                OutboxEmail.objects
+                .select_for_update(skip_locked=True)
+                .filter(status="pending", next_attempt_at__lte=now)
+                .order_by("next_attempt_at", "id")
+                .values_list("id", flat=True)[:self.batch_size]
+            )
+            if ids:
+                OutboxEmail.objects.filter(id__in=ids).update(
+                    attempts=F("attempts") + 1,
+                    next_attempt_at=now + timedelta(seconds=CLAIM_LEASE),
+                )
+        return list(OutboxEmail.objects.filter(id__in=ids).order_by("id"))
+
+    def drain_once(self):
+        """Send one batch. Returns the number of rows processed."""
+        batch = self.claim_batch()
+        if not batch:
+            return 0
+
+        try:
+            self.connection.open()
+        except Exception:
+            # Server unreachable: each send below fails and is rescheduled.
+            self.reset_connection()
+
+        now = timezone.now()
+        for email in batch:
+            error = self._send(email)
+            email.updated_at = now
+            if error is None:
+                email.status = "sent"
+                email.sent_at = now
+                email.last_error = ""
+                email.body_text = email.body_html = ""
+                self.metrics["sent"] += 1
+            elif email.attempts >= self.max_attempts:
+                email.status = "dead"
+                email.last_error = error
+                self.metrics["dead"] += 1
+                logger.error("outbox dead-lettered id=%s to=%s: %s", email.pk, email.to_email, error)
+            else:
+                email.next_attempt_at = now + backoff_delay(email.attempts)
+                email.last_error = error
+                self.metrics["retried"] += 1
+
+        OutboxEmail.objects.bulk_update(
+            batch, ["status", "sent_at", "last_error", "next_attempt_at", "updated_at", "body_text", "body_html"]
+        )
+        self.metrics["batches"] += 1
+        logger.info(
+            "outbox batch size=%d sent=%d retried=%d dead=%d",
+            len(batch), self.metrics["sent"], self.metrics["retried"], self.metrics["dead"],
+        )
+        return len(batch)
+
+    def drain(self):
+        """Send batches until nothing is due. Returns the number of rows processed."""
+        total = 0
+        while True:
+            processed = self.drain_once()
+            if not processed:
+                return total
+            total += processed
+
+    def _send(self, email):
+        message = EmailMultiAlternatives(
+            subject=email.subject,
+            body=email.body_text,
+            from_email=email.from_email or settings.DEFAULT_FROM_EMAIL,
+            to=[email.to_email],
+            connection=self.connection,
+        )
+        if email.body_html:
+            message.attach_alternative(email.body_html, "text/html")
+        try:
+            message.send()
+            return None
+        except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+            # Drop the broken connection; the next batch opens a fresh one.
+            self.reset_connection()
+            return f"{type(e).__name__}: {e}"
+        except Exception as e:
+            return f"{type(e).__name__}: {e}"
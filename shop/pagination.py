@@ -0,0 +1,133 @@
+"""
+Keyset ("cursor") pagination for the API (cursors: see shop.keyset).
+"""
+from collections import OrderedDict
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .keyset import coerce_values, decode_cursor, encode_cursor, flip, keyset_filter, row_values
+
+
+class CursorOrPagePagination(BasePagination):
+    """
+    Keyset pagination for large API collections.
+
+    The ordering is whatever the view's queryset is ordered by after filtering
+    (so OrderingFilter's ?ordering= is honoured), with the primary key
+    appended as a tiebreaker. Responses carry `next`/`previous` cursor links
+    and no `count`.
+
+    Sending ?page= switches to the legacy PageNumberPagination envelope
+    (with `count`), for clients that still depend on it.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    cursor_query_param = "cursor"
+    page_query_param = "page"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_paginator = None
+
+        if self.page_query_param in request.query_params:
+            self.page_paginator = PageNumberPagination()
+            self.page_paginator.page_size = self.get_page_size(request)
+            self.page_paginator.page_size_query_param = self.page_size_query_param
+            self.page_paginator.max_page_size = self.max_page_size
+            return self.page_paginator.paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        values, reverse = decode_cursor(request.query_params.get(self.cursor_query_param))
+        values = coerce_values(queryset.model, self.ordering, values)
+        if request.query_params.get(self.cursor_query_param) and values is None:
+            raise NotFound(self.invalid_cursor_message)
+
+        ordering = flip(self.ordering) if reverse else self.ordering
+        queryset = self._load_ordering_columns(queryset.order_by(*ordering))
+        if values is not None:
+            queryset = queryset.filter(keyset_filter(ordering, values))
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        self.has_next = (values is not None) if reverse else has_more
+        self.has_previous = has_more if reverse else (values is not None)
+        self.first_values = row_values(rows[0], self.ordering) if rows else values
+        self.last_values = row_values(rows[-1], self.ordering) if rows else values
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+            if size > 0:
+                return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def get_ordering(self, queryset):
+        ordering = [
+            f for f in (queryset.query.order_by or queryset.model._meta.ordering)
+            if isinstance(f, str)
+        ]
+        pk = queryset.model._meta.pk.name
+        names = {f.lstrip("-") for f in ordering}
+        if pk not in names and "pk" not in names:
+            descending = bool(ordering) and ordering[-1].startswith("-")
+            ordering.append(f"-{pk}" if descending else pk)
+        return [f.replace("pk", pk) if f.lstrip("-") == "pk" else f for f in ordering]
+
+    def _load_ordering_columns(self, queryset):
+        # Views may narrow the SELECT with only(); cursor values must be loaded.
+        names, defer = queryset.query.deferred_loading
+        if names and not defer:
+            queryset = queryset.only(*names, *(f.lstrip("-") for f in self.ordering))
+        elif names and defer:
+            queryset = queryset.defer(*(set(names) - {f.lstrip("-") for f in self.ordering}))
+        return queryset
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(self.last_values))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.first_values is None:
+            return remove_query_param(url, self.cursor_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, encode_cursor(self.first_values, reverse=True)
+        )
+
+    def get_paginated_response(self, data):
+        if self.page_paginator is not None:
+            return self.page_paginator.get_paginated_response(data)
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -0,0 +1,143 @@
+"""
+Promotions engine.
+
+Active Promotion rows are compiled into an index: line rules keyed by
+product id and by category id (plus rules that apply everywhere), and the
+cart-total threshold rules. The index is cached until a rule changes
+(signals delete it), until the next scheduled start/end, or for at most
+CACHE_MAX_STALE_SECONDS (signals only reach the saving process's cache),
+so pricing a cart costs no queries in the common case.
+
+price_lines() then prices a cart in one pass over its lines: each line
+looks up its candidate rules in the index and takes the best one;
+thresholds are applied to what is left at the end. Rules do not stack on
+a line, and at most one threshold applies.
+"""
+import time
+from collections import namedtuple
+from itertools import chain
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .caches import record_lookup
+from .models import Promotion
+
+INDEX_KEY = "promotions:index"
+
+Rule = namedtuple("Rule", "id name kind percent amount_off buy_qty get_qty min_subtotal")
+Index = namedtuple("Index", "products categories everywhere thresholds")
+Pricing = namedtuple("Pricing", "subtotal discount total line_discounts applied")
+
+
+# -------------------------------------------------------------------
+# Index
+# -------------------------------------------------------------------
+
+def build_index(now=None):
+    """Compile active rules; returns (index, seconds until it goes stale or None)."""
+    now = now or timezone.now()
+    # Scheduled rules come back too: the earliest start bounds the cache timeout.
+    candidates = Promotion.objects.filter(Q(ends_at__isnull=True) | Q(ends_at__gt=now), active=True)
+    rules, boundaries = {}, []
+    for promotion in candidates:
+        if promotion.starts_at and promotion.starts_at > now:
+            boundaries.append(promotion.starts_at)
+            continue
+        rules[promotion.id] = promotion
+        if promotion.ends_at:
+            boundaries.append(promotion.ends_at)
+
+    products, categories, everywhere, thresholds = {}, {}, [], []
+    scoped = set()
+    if rules:
+        for field, column, target in (("products", "product_id", products), ("categories", "category_id", categories)):
+            through = getattr(Promotion, field).through
+            for promotion_id, target_id in through.objects.filter(promotion_id__in=rules).values_list(
+                "promotion_id", column
+            ):
+                if rules[promotion_id].kind != "threshold":
+                    target.setdefault(target_id, []).append(compile_rule(rules[promotion_id]))
+                    scoped.add(promotion_id)
+    for promotion in rules.values():
+        if promotion.kind == "threshold":
+            thresholds.append(compile_rule(promotion))
+        elif promotion.id not in scoped:
+            everywhere.append(compile_rule(promotion))
+    thresholds.sort(key=lambda r: r.min_subtotal)
+
+    timeout = max(int((min(boundaries) - now).total_seconds()), 1) if boundaries else None
+    return Index(products, categories, everywhere, thresholds), timeout
+
+
+def compile_rule(promotion):
+    return Rule(
+        promotion.id, promotion.name, promotion.kind, promotion.percent, promotion.amount_off,
+        promotion.buy_qty, promotion.get_qty, promotion.min_subtotal,
+    )
+
+
+def get_index():
+    start = time.perf_counter()
+    index = cache.get(INDEX_KEY)
+    record_lookup("promotions", int(index is not None), int(index is None), time.perf_counter() - start)
+    if index is None:
+        index, timeout = build_index()
+        cache.set(INDEX_KEY, index, min(timeout or settings.CACHE_MAX_STALE_SECONDS, settings.CACHE_MAX_STALE_SECONDS))
+    return index
+
+
+def invalidate(**kwargs):
+    """Signal receiver: drop the index whenever a rule or its scope changes."""
+    cache.delete(INDEX_KEY)
+
+
+# -------------------------------------------------------------------
+# Pricing
+# -------------------------------------------------------------------
+
+def line_discount(rule, price, qty):
+    if rule.kind == "percent":
+        return price * qty * rule.percent // 100
+    if rule.kind == "bogo":
+        return qty // (rule.buy_qty + rule.get_qty) * rule.get_qty * price
+    return 0
+
+
+def price_lines(lines):
+    """
+    Price [(product, qty), ...] (products need price and category_id).
+    Returns Pricing(subtotal, discount, total, {product_id: discount}, [rule names]).
+    """
+    index = get_index()
+    subtotal = discount = 0
+    line_discounts, applied = {}, []
+    for product, qty in lines:
+        subtotal += product.price * qty
+        best, best_rule = 0, None
+        for rule in chain(
+            index.products.get(product.id, ()), index.categories.get(product.category_id, ()), index.everywhere,
+        ):
+            off = line_discount(rule, product.price, qty)
+            if off > best:
+                best, best_rule = off, rule
+        if best_rule:
+            line_discounts[product.id] = best
+            discount += best
+            if best_rule.name not in applied:
+                applied.append(best_rule.name)
+
+    remaining = subtotal - discount
+    best, best_rule = 0, None
+    for rule in index.thresholds:
+        if remaining < rule.min_subtotal:
+            break  # sorted by min_subtotal
+        off = min(rule.amount_off + remaining * rule.percent // 100, remaining)
+        if off > best:
+            best, best_rule = off, rule
+    if best_rule:
+        discount += best
+        applied.append(best_rule.name)
+    return Pricing(subtotal, discount, subtotal - discount, line_discounts, applied)
@@ -0,0 +1,24 @@
+"""
+Fast JSON rendering for the API.
+
+ORJSONRenderer is a drop-in replacement for DRF's JSONRenderer backed by
+orjson (C). It also accepts orjson.Fragment values, which lets list views
+splice pre-serialized per-object JSON (see shop.caches) into the paginated
+envelope without decoding it again.
+"""
+from rest_framework.renderers import BaseRenderer
+
+from .fastjson import dumps
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+    format = "json"
+    charset = None  # orjson always emits UTF-8 bytes
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        # The browsable API asks for indented output.
+        indent = bool((renderer_context or {}).get("indent"))
+        return dumps(data, indent=indent, api=True)
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from django.db import transaction
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from .models import (
@@ -6,6 +7,57 @@ from .models import (
     Order, OrderItem, Address,
     NewsletterSubscription, ContactMessage, Testimonial
 )
+from .outbox import enqueue_order_confirmation
+from .promotions import price_lines
+
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets for the top-level serializer of a response:
+
+      ?fields=a,b   keep only these fields
+      ?expand=x,y   include fields listed in Meta.expandable_fields
+
+    Without ?fields, Meta.default_fields (if set) is used. The parsed values
+    arrive through the serializer context (see SparseFieldsetMixin in views).
+    Write-only fields are always kept so create/update are unaffected.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expand = self.context.get("expand") or set()
+        expandable = set(getattr(self.Meta, "expandable_fields", ()))
+        path = self._expand_path()
+
+        if path:
+            # Nested serializer: only expansion applies, by dotted path
+            # (e.g. ?expand=items.product).
+            for name in expandable:
+                if f"{path}.{name}" not in expand:
+                    fields.pop(name, None)
+            return fields
+
+        requested = self.context.get("fields") or set()
+        keep = requested or set(getattr(self.Meta, "default_fields", fields.keys()))
+        for name in list(fields):
+            if fields[name].write_only:
+                continue
+            if name in expandable:
+                if name not in expand and name not in requested:
+                    fields.pop(name)
+            elif name not in keep:
+                fields.pop(name)
+        return fields
+
+    def _expand_path(self):
+        """Dotted field path from the response root ("" for the root itself)."""
+        names = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:  # list children are bound with field_name=""
+                names.append(node.field_name)
+            node = node.parent
+        return ".".join(reversed(names))
 
 
 class TestimonialSerializer(serializers.ModelSerializer):
@@ -32,13 +84,13 @@ class ProductImageSerializer(serializers.ModelSerializer):
         fields = ["id", "image"]
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ["id", "name", "slug"]
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
     category = CategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
@@ -54,7 +106,48 @@ class ProductSerializer(serializers.ModelSerializer):
         ]
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ProductListSerializer(ProductSerializer):
+    """
+    Lightweight product card for list endpoints. Any ProductSerializer field
+    can still be requested with ?fields=, and category/images with ?expand=.
+    """
+    thumbnail = serializers.SerializerMethodField()
+
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + [
+            "old_price", "badge_type", "thumbnail", "rating_avg", "rating_count",
+        ]
+        default_fields = [
+            "id", "name", "slug", "price", "old_price", "badge_type",
+            "stock", "thumbnail", "rating_avg", "rating_count",
+        ]
+        expandable_fields = ["category", "images"]
+        # Model columns read by non-model fields (used to narrow the SELECT).
+        field_sources = {"thumbnail": ["main_image"]}
+
+    def get_thumbnail(self, obj):
+        return obj.main_image.url if obj.main_image else None
+
+
+class ProductSyncSerializer(ProductListSerializer):
+    """Flat product record for client mirrors (/api/sync/products/)."""
+    category_id = serializers.IntegerField(read_only=True)
+
+    class Meta(ProductListSerializer.Meta):
+        fields = ProductListSerializer.Meta.fields + ["updated_at"]
+        default_fields = [
+            f for f in ProductListSerializer.Meta.fields + ["updated_at"]
+            if f not in ProductListSerializer.Meta.expandable_fields
+        ]
+        field_sources = {**ProductListSerializer.Meta.field_sources, "category_id": ["category"]}
+
+
+class CategorySyncSerializer(CategorySerializer):
+    class Meta(CategorySerializer.Meta):
+        fields = CategorySerializer.Meta.fields + ["updated_at"]
+
+
+class ReviewSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
 
     class Meta:
@@ -78,18 +171,30 @@ class AddressSerializer(serializers.ModelSerializer):
         return Address.objects.create(user=user, **validated_data)
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Compact by default (product id, name and thumbnail); the full nested
+    product is included with ?expand=items.product.
+    """
     product = ProductSerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(
-        write_only=True, source="product", queryset=Product.objects.all()
+        source="product", queryset=Product.objects.all()
     )
+    name = serializers.CharField(source="product.name", read_only=True)
+    thumbnail = serializers.SerializerMethodField()
 
     class Meta:
         model = OrderItem
-        fields = ["id", "product", "product_id", "qty", "price_each"]
+        fields = ["id", "product_id", "name", "thumbnail", "product", "qty", "price_each"]
+        read_only_fields = ["price_each"]  # priced from the product when the order is created
+        expandable_fields = ["product"]
+
+    def get_thumbnail(self, obj):
+        image = obj.product.main_image
+        return image.url if image else None
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True)
     address = AddressSerializer(read_only=True)
     address_id = serializers.PrimaryKeyRelatedField(
@@ -100,27 +205,24 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = [
             "id", "status", "address", "address_id",
-            "total", "whatsapp_number", "items", "created_at"
+            "total", "discount", "whatsapp_number", "items", "created_at"
         ]
-        read_only_fields = ["status", "total"]
+        read_only_fields = ["status", "total", "discount"]
 
+    @transaction.atomic
     def create(self, validated_data):
         items = validated_data.pop("items", [])
         user = self.context["request"].user
-        order = Order.objects.create(user=user, **validated_data)
+        pricing = price_lines((i["product"], i["qty"]) for i in items)
+        order = Order.objects.create(user=user, total=pricing.total, discount=pricing.discount, **validated_data)
 
-        total = 0
         for i in items:
             prod = i["product"]
-            qty = i["qty"]
-            price_each = prod.price
             OrderItem.objects.create(
-                order=order, product=prod, qty=qty, price_each=price_each
+                order=order, product=prod, qty=i["qty"], price_each=prod.price
             )
-            total += qty * price_each
 
-        order.total = total
-        order.save()
+        enqueue_order_confirmation(order)
         return order
 
 
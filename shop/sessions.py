@@ -0,0 +1,163 @@
+"""
+Cache-first session engine (SESSION_ENGINE = "shop.sessions").
+
+Builds on Django's cached_db store:
+
+* A save whose serialized data is unchanged since load is skipped, so
+  requests that touch but do not change the session write nothing.
+* With SESSION_WRITE_BEHIND_SECONDS > 0 (only sensible with a shared cache,
+  i.e. Redis) updates to existing sessions go to the cache immediately and
+  to the database in coalesced batches from a background thread. New
+  sessions are always written through so their keys are reserved.
+  Each worker keeps its own queue, so flushes from different workers can
+  arrive out of order; a row is only overwritten by a version with the
+  same or a later expire_date (stamped when the session was saved), so an
+  older version never replaces a newer one. What remains: until a worker
+  flushes, the database holds the previous version, which a cache
+  eviction in that window (at most SESSION_WRITE_BEHIND_SECONDS) brings
+  back; and a save that shortens the expiry (set_expiry) loses to a
+  longer-lived version already written.
+* The same thread deletes expired rows in batches every
+  SESSION_PRUNE_INTERVAL seconds, so `clearsessions` is no longer needed on
+  a cron (it still works and uses the batched delete).
+"""
+import atexit
+import logging
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+logger = logging.getLogger("shop.sessions")
+
+KEY_PREFIX = "shop.sessions:"
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def load(self):
+        pending = _writer.pending.get(self.session_key) if self.session_key else None
+        data = pending[0] if pending else super().load()
+        self._snapshot = self.serializer().dumps(data)
+        return data
+
+    def save(self, must_create=False):
+        if (
+            not must_create
+            and self.session_key is not None
+            and getattr(self, "_snapshot", None) == self.serializer().dumps(self._session)
+        ):
+            return
+        if must_create or self.session_key is None or not settings.SESSION_WRITE_BEHIND_SECONDS:
+            super().save(must_create)
+        else:
+            data = self._session
+            try:
+                self._cache.set(self.cache_key, data, self.get_expiry_age())
+            except Exception:
+                logger.exception("Error saving to cache (%s)", self._cache)
+            _writer.queue(self.session_key, data, self.encode(data), self.get_expiry_date())
+        self._snapshot = self.serializer().dumps(self._session)
+        _writer.ensure_started()
+
+    async def asave(self, must_create=False):
+        await sync_to_async(self.save)(must_create)
+
+    def exists(self, session_key):
+        return session_key in _writer.pending or super().exists(session_key)
+
+    def delete(self, session_key=None):
+        _writer.pending.pop(session_key or self.session_key, None)
+        super().delete(session_key)
+
+    @classmethod
+    def clear_expired(cls):
+        """Delete expired rows SESSION_PRUNE_BATCH at a time; returns the count."""
+        model = cls.get_model_class()
+        deleted = 0
+        while True:
+            keys = list(
+                model.objects.filter(expire_date__lt=timezone.now())
+                .values_list("session_key", flat=True)[:settings.SESSION_PRUNE_BATCH]
+            )
+            if not keys:
+                return deleted
+            deleted += model.objects.filter(session_key__in=keys).delete()[0]
+
+
+# -------------------------------------------------------------------
+# Background writer / pruner (one per process)
+# -------------------------------------------------------------------
+
+class SessionWriter:
+    def __init__(self):
+        self.pending = {}  # session_key -> (data, encoded, expire_date); latest write wins
+        self.lock = threading.Lock()
+        self.thread = None
+        self.last_pruned = time.monotonic()
+
+    def queue(self, session_key, data, encoded, expire_date):
+        with self.lock:
+            self.pending[session_key] = (data, encoded, expire_date)
+
+    def ensure_started(self):
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self.run, name="session-writer", daemon=True)
+                    self.thread.start()
+                    atexit.register(self.flush)
+
+    def run(self):
+        while True:
+            time.sleep(settings.SESSION_WRITE_BEHIND_SECONDS or settings.SESSION_PRUNE_INTERVAL)
+            try:
+                self.flush()
+                if time.monotonic() - self.last_pruned >= settings.SESSION_PRUNE_INTERVAL:
+                    self.last_pruned = time.monotonic()
+                    pruned = SessionStore.clear_expired()
+                    if pruned:
+                        logger.info("Pruned %d expired sessions", pruned)
+            except Exception:
+                logger.exception("Session write-behind failed")
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """
+        Write all pending sessions in one upsert that skips rows already
+        holding a later expire_date (written by another worker).
+        """
+        with self.lock:
+            batch, self.pending = self.pending, {}
+        if not batch:
+            return
+        qn = connection.ops.quote_name
+        table = qn(SessionStore.get_model_class()._meta.db_table)
+        key, data, expire = qn("session_key"), qn("session_data"), qn("expire_date")
+        sql = (
+            f"INSERT INTO {table} ({key}, {data}, {expire}) "
+            f"VALUES {', '.join(['(%s, %s, %s)'] * len(batch))} "
+            f"ON CONFLICT ({key}) DO UPDATE "
+            f"SET {data} = EXCLUDED.{data}, {expire} = EXCLUDED.{expire} "
+            f"WHERE EXCLUDED.{expire} >= {table}.{expire}"
+        )
+        params = [
+            v for session_key, (_, encoded, expire_date) in batch.items()
+            for v in (session_key, encoded, connection.ops.adapt_datetimefield_value(expire_date))
+        ]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+        except Exception:
+            with self.lock:  # retry next round unless a newer write replaced them
+                self.pending = {**batch, **self.pending}
+            raise
+
+
+_writer = SessionWriter()
@@ -0,0 +1,83 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import caches, promotions
+from .cart import Cart
+from .models import Category, DeletionLog, Product, ProductImage, Promotion, Review, SiteConfig
+
+
+# -------------------------------------------------------------------
+# Review aggregates on Product
+# -------------------------------------------------------------------
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_product_id, old_rating = getattr(instance, "_loaded_rating", (None, None))
+    if created or old_product_id is None:
+        Product.apply_rating_delta(instance.product_id, added=instance.rating)
+    elif old_product_id != instance.product_id:
+        Product.apply_rating_delta(old_product_id, removed=old_rating)
+        Product.apply_rating_delta(instance.product_id, added=instance.rating)
+    elif old_rating != instance.rating:
+        Product.apply_rating_delta(instance.product_id, added=instance.rating, removed=old_rating)
+    instance._loaded_rating = (instance.product_id, instance.rating)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    old_product_id, old_rating = getattr(
+        instance, "_loaded_rating", (instance.product_id, instance.rating)
+    )
+    Product.apply_rating_delta(old_product_id, removed=old_rating)
+
+
+# -------------------------------------------------------------------
+# Sync feed: tombstones and parent timestamps
+# -------------------------------------------------------------------
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Category)
+def record_deletion(sender, instance, **kwargs):
+    DeletionLog.objects.create(model=sender._meta.model_name, object_id=instance.pk)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def touch_product(sender, instance, raw=False, **kwargs):
+    # Gallery changes are part of the product's record in the sync feed.
+    if raw:
+        return
+    Product.objects.filter(pk=instance.product_id).update(updated_at=timezone.now())
+
+
+# -------------------------------------------------------------------
+# Cart: the anonymous session cart follows the visitor into their account
+# -------------------------------------------------------------------
+
+@receiver(user_logged_in)
+def merge_cart(sender, request, user, **kwargs):
+    if request is not None and hasattr(request, "session"):
+        Cart.merge_session_cart(request, user)
+
+
+# -------------------------------------------------------------------
+# Promotions: recompile the rule index after any change
+# -------------------------------------------------------------------
+
+post_save.connect(promotions.invalidate, sender=Promotion)
+post_delete.connect(promotions.invalidate, sender=Promotion)
+m2m_changed.connect(promotions.invalidate, sender=Promotion.products.through)
+m2m_changed.connect(promotions.invalidate, sender=Promotion.categories.through)
+
+
+# -------------------------------------------------------------------
+# Site context: navbar categories and SiteConfig are cached
+# -------------------------------------------------------------------
+
+for model in (Category, SiteConfig):
+    post_save.connect(caches.invalidate_site_context, sender=model)
+    post_delete.connect(caches.invalidate_site_context, sender=model)
@@ -0,0 +1,258 @@
+"""
+Slow query log.
+
+A wrapper installed on every new database connection times each statement.
+Statements slower than SLOW_QUERY_MS are attributed to the view or
+management command that issued them and to the innermost application stack
+frame, then handed to a background thread. That thread logs a JSON line
+to the "shop.slow_queries" logger (and to the rotating SLOW_QUERY_LOG_FILE
+when one is set), runs EXPLAIN on a SLOW_QUERY_EXPLAIN_RATE
+sample, and aggregates the statement into SlowQuery by fingerprint (call
+site + normalized SQL) for the admin report. The request path only pays
+for a timer per statement; nothing is written there.
+
+Query parameters can hold personal data (emails, addresses, tokens), so
+they are only used to run EXPLAIN: the log line and SlowQuery keep the
+normalized SQL, and string literals in plans are masked.
+"""
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.db import IntegrityError, connections
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+logger = logging.getLogger("shop.slow_queries")
+
+current_request = contextvars.ContextVar("slow_query_request", default=None)
+_internal = threading.local()  # set in the worker thread: its own queries are not recorded
+_pending = queue.Queue(maxsize=1000)
+_worker = None
+_worker_lock = threading.Lock()
+
+# Instrumentation frames are never the call site.
+SKIP_FILES = {os.path.abspath(__file__), os.path.join(os.path.dirname(os.path.abspath(__file__)), "middleware.py")}
+LITERALS = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(...)"),  # IN lists of any length
+    (re.compile(r"\s+"), " "),
+]
+
+
+QUOTED = LITERALS[0][0]
+
+
+def normalize(sql):
+    for pattern, replacement in LITERALS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def fingerprint(call_site, normalized_sql):
+    return hashlib.sha1(f"{call_site}\n{normalized_sql}".encode()).hexdigest()
+
+
+# -------------------------------------------------------------------
+# Attribution (runs only for slow statements)
+# -------------------------------------------------------------------
+
+def call_site():
+    """
+    The innermost frame in project code, as "shop/views.py:search_products".
+    Statements issued outside project code (e.g. session saves) fall back
+    to the innermost frame above the ORM. Async views query from an
+    executor thread whose stack holds no project code; those statements
+    are attributed to the view function that resolved the request.
+    """
+    base = str(settings.BASE_DIR) + os.sep
+    fallback = None
+    executor = False
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename not in SKIP_FILES:
+            if filename.startswith(base) and "site-packages" not in filename:
+                return f"{os.path.relpath(filename, base)}:{frame.f_code.co_name}", frame.f_lineno
+            if fallback is None and f"{os.sep}django{os.sep}db{os.sep}" not in filename:
+                short = filename.split(f"site-packages{os.sep}")[-1]
+                fallback = f"{short}:{frame.f_code.co_name}", frame.f_lineno
+            if filename.endswith(f"asgiref{os.sep}sync.py"):
+                # Crossed from sync_to_async into whatever runs the loop.
+                executor = True
+                break
+        frame = frame.f_back
+
+    request = current_request.get()
+    match = request.resolver_match if request is not None else None
+    if executor and match is not None:
+        code = getattr(match.func, "__code__", None)
+        if code is not None and os.path.abspath(code.co_filename).startswith(base):
+            return f"{os.path.relpath(code.co_filename, base)}:{code.co_name}", code.co_firstlineno
+    return fallback or ("<unknown>", 0)
+
+
+def current_source():
+    request = current_request.get()
+    if request is not None:
+        match = request.resolver_match
+        return f"{request.method} {match.view_name if match else request.path}"
+    if len(sys.argv) > 1 and os.path.basename(sys.argv[0]) == "manage.py":
+        return f"manage.py {sys.argv[1]}"
+    return os.path.basename(sys.argv[0]) if sys.argv else ""
+
+
+# -------------------------------------------------------------------
+# Recorder
+# -------------------------------------------------------------------
+
+def record_slow(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        threshold = settings.SLOW_QUERY_MS
+        if 0 < threshold <= elapsed_ms and not getattr(_internal, "active", False):
+            site, line = call_site()
+            _enqueue({
+                "alias": context["connection"].alias,
+                "sql": sql,
+                "params": None if many else params,
+                "ms": round(elapsed_ms, 2),
+                "call_site": site,
+                "line": line,
+                "source": current_source(),
+                "at": timezone.now(),
+            })
+
+
+def install(sender, connection, **kwargs):
+    """connection_created receiver: keep the recorder on the connection for its lifetime."""
+    if record_slow not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_slow)
+
+
+def _enqueue(entry):
+    global _worker
+    try:
+        _pending.put_nowait(entry)
+    except queue.Full:
+        return  # a slow-query storm; the log is best effort
+    if _worker is None or not _worker.is_alive():
+        with _worker_lock:
+            if _worker is None or not _worker.is_alive():
+                _worker = threading.Thread(target=_run, name="slow-query-log", daemon=True)
+                _worker.start()
+
+
+def _run():
+    _internal.active = True
+    while True:
+        entry = _pending.get()
+        try:
+            process(entry)
+        except Exception:
+            logger.exception("Could not record slow query")
+        finally:
+            _pending.task_done()
+            connections.close_all()
+
+
+def flush_pending():
+    """Process queued entries in the calling thread (tests, process exit)."""
+    previous = getattr(_internal, "active", False)
+    _internal.active = True
+    try:
+        while True:
+            try:
+                entry = _pending.get_nowait()
+            except queue.Empty:
+                return
+            process(entry)
+            _pending.task_done()
+    finally:
+        _internal.active = previous
+
+
+# -------------------------------------------------------------------
+# Processing (background thread)
+# -------------------------------------------------------------------
+
+def _file_logger():
+    if not logger.handlers and settings.SLOW_QUERY_LOG_FILE:
+        os.makedirs(os.path.dirname(settings.SLOW_QUERY_LOG_FILE), exist_ok=True)
+        handler = RotatingFileHandler(
+            settings.SLOW_QUERY_LOG_FILE,
+            maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+            backupCount=settings.SLOW_QUERY_LOG_BACKUPS,
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+    return logger
+
+
+def explain(alias, sql, params):
+    if not sql.lstrip()[:6].upper() == "SELECT" or params is None:
+        return ""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+        plan = "\n".join(" ".join(str(col) for col in row) for row in cursor.fetchall())
+    return QUOTED.sub("?", plan)  # PostgreSQL shows the parameter values in conditions
+
+
+def process(entry):
+    normalized = normalize(entry["sql"])
+    key = fingerprint(entry["call_site"], normalized)
+    plan = ""
+    if random.random() < settings.SLOW_QUERY_EXPLAIN_RATE:
+        try:
+            plan = explain(entry["alias"], entry["sql"], entry["params"])
+        except Exception as exc:  # the tables may have changed since
+            plan = f"EXPLAIN failed: {exc}"
+
+    fields = {k: v for k, v in entry.items() if k != "params"}
+    _file_logger().info(json.dumps({
+        **fields, "sql": normalized, "at": entry["at"].isoformat(), "fingerprint": key, "plan": plan,
+    }))
+    _aggregate(entry, key, normalized, plan)
+
+
+def _aggregate(entry, key, normalized, plan):
+    from .models import SlowQuery
+
+    changes = {
+        "count": F("count") + 1,
+        "total_ms": F("total_ms") + entry["ms"],
+        "max_ms": Greatest("max_ms", entry["ms"]),
+        "source": entry["source"][:255],
+        "last_seen": entry["at"],
+    }
+    if plan:
+        changes["plan"] = plan
+    rows = SlowQuery.objects.filter(fingerprint=key)
+    if rows.update(**changes):
+        return
+    try:
+        SlowQuery.objects.create(
+            fingerprint=key, sql=normalized, call_site=entry["call_site"][:255],
+            source=entry["source"][:255], count=1, total_ms=entry["ms"], max_ms=entry["ms"],
+            plan=plan, first_seen=entry["at"], last_seen=entry["at"],
+        )
+    except IntegrityError:  # another process created it first
+        rows.update(**changes)
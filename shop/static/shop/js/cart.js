@@ -0,0 +1,47 @@
+// In-place cart updates: forms and buttons with data-cart-api post to the
+// JSON cart API and refresh the navbar badge and dropdown from the reply.
+// Without JS the forms still post to add_to_cart and redirect back.
+(function () {
+  function csrfToken(form) {
+    const input = form && form.querySelector("[name=csrfmiddlewaretoken]");
+    if (input) return input.value;
+    const match = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+    return match ? decodeURIComponent(match[1]) : "";
+  }
+
+  function update(data) {
+    const badge = document.getElementById("cart-count");
+    if (badge) {
+      badge.textContent = data.count;
+      badge.classList.toggle("d-none", !data.count);
+    }
+    const items = document.getElementById("cart-items");
+    if (items && data.dropdown_html !== undefined) items.innerHTML = data.dropdown_html;
+    document.dispatchEvent(new CustomEvent("cart:updated", { detail: data }));
+  }
+
+  async function send(url, body, form) {
+    const response = await fetch(url + "?fragment=1", {
+      method: "POST",
+      body: body,
+      headers: { "X-CSRFToken": csrfToken(form), "Accept": "application/json" },
+      credentials: "same-origin",
+    });
+    if (!response.ok) throw new Error("Cart update failed: HTTP " + response.status);
+    update(await response.json());
+  }
+
+  document.addEventListener("submit", function (event) {
+    const form = event.target.closest("form[data-cart-api]");
+    if (!form) return;
+    event.preventDefault();
+    send(form.dataset.cartApi, new FormData(form), form).catch(function () { form.submit(); });
+  });
+
+  document.addEventListener("click", function (event) {
+    const button = event.target.closest("button[data-cart-api]");
+    if (!button || button.closest("form")) return;
+    event.preventDefault();
+    send(button.dataset.cartApi, new FormData(), null).catch(console.error);
+  });
+})();
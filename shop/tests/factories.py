@@ -0,0 +1,76 @@
+"""
+Bulk seeding helpers for the test suite. Everything is created with
+bulk_create so large datasets stay cheap to build.
+"""
+from django.contrib.auth import get_user_model
+
+from shop.models import (
+    Address, Category, Order, OrderItem, Product, ProductImage, Review,
+)
+
+
+def make_users(n, prefix="user", **extra):
+    User = get_user_model()
+    return User.objects.bulk_create([
+        User(
+            username=f"{prefix}{i}", email=f"{prefix}{i}@example.com",
+            first_name="Test", last_name=str(i), **extra,
+        )
+        for i in range(n)
+    ])
+
+
+def make_categories(n, prefix="Category"):
+    return Category.objects.bulk_create([
+        Category(name=f"{prefix} {i}", slug=f"{prefix.lower()}-{i}") for i in range(n)
+    ])
+
+
+def make_products(n, categories, prefix="product", images=0, **extra):
+    products = Product.objects.bulk_create([
+        Product(**{
+            "name": f"{prefix.title()} {i}",
+            "slug": f"{prefix}-{i}",
+            "price": 1000 + (i * 37) % 50000,
+            "watts": (i * 13) % 2000,
+            "stock": i % 7,
+            "featured": i % 25 == 0,
+            "category": categories[i % len(categories)],
+            **extra,
+        })
+        for i in range(n)
+    ], batch_size=1000)
+    if images:
+        ProductImage.objects.bulk_create([
+            ProductImage(product=p, image=f"products/gallery/{p.slug}-{j}")
+            for p in products for j in range(images)
+        ], batch_size=1000)
+    return products
+
+
+def make_reviews(products, users, per_product=1, recompute=True):
+    # bulk_create skips the rating signals, so aggregates are rebuilt after.
+    reviews = Review.objects.bulk_create([
+        Review(product=p, user=users[(i + j) % len(users)], rating=1 + (i + j) % 5, text="Solid.")
+        for i, p in enumerate(products) for j in range(per_product)
+    ], batch_size=1000)
+    if recompute:
+        for product in products:
+            product.recompute_rating_stats()
+    return reviews
+
+
+def make_orders(users, products, per_user=1, items=3):
+    addresses = Address.objects.bulk_create([
+        Address(user=u, full_name=u.get_full_name(), phone="0700000000", line1="Moi Avenue", city="Nairobi")
+        for u in users
+    ])
+    orders = Order.objects.bulk_create([
+        Order(user=u, address=a, total=0)
+        for u, a in zip(users, addresses) for _ in range(per_user)
+    ], batch_size=1000)
+    OrderItem.objects.bulk_create([
+        OrderItem(order=o, product=products[(i + j) % len(products)], qty=1 + j, price_each=1000)
+        for i, o in enumerate(orders) for j in range(items)
+    ], batch_size=1000)
+    return orders
@@ -0,0 +1,104 @@
+"""
+Sparse fieldsets: ?fields= trims the response and the SELECT, ?expand=
+adds nested relations only when asked for.
+"""
+import cloudinary
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .factories import make_categories, make_orders, make_products, make_users
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, ALLOWED_HOSTS=["testserver"])
+class FieldSelectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cloudinary.config(cloud_name=cloudinary.config().cloud_name or "test")
+        cls.products = make_products(3, make_categories(1))
+        cls.user, = make_users(1)
+        cls.order, = make_orders([cls.user], cls.products, items=2)
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+
+    def orders(self, **params):
+        response = self.api.get("/api/orders/", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()["results"]
+
+    def test_fields_limits_keys(self):
+        row, = self.orders(fields="id,total")
+        self.assertEqual(set(row), {"id", "total"})
+
+    def test_unknown_fields_are_ignored(self):
+        row, = self.orders(fields="id,nonsense")
+        self.assertEqual(set(row), {"id"})
+        row, = self.orders(fields="nonsense")
+        self.assertEqual(row, {})
+
+    def test_expand_nests_the_product(self):
+        row, = self.orders(expand="items.product")
+        item = row["items"][0]
+        self.assertEqual(item["product"]["id"], item["product_id"])
+        self.assertIn("category", item["product"])
+
+        row, = self.orders()
+        self.assertNotIn("product", row["items"][0])
+
+    def test_only_narrows_the_select(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.get("/api/products/", {"fields": "id,name"})
+        self.assertEqual(set(response.json()["results"][0]), {"id", "name"})
+        select, = [q["sql"] for q in ctx.captured_queries if 'FROM "shop_product"' in q["sql"]]
+        self.assertIn('"shop_product"."name"', select)
+        self.assertNotIn('"shop_product"."description"', select)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.api.get("/api/products/")
+        select, = [q["sql"] for q in ctx.captured_queries if 'FROM "shop_product"' in q["sql"]]
+        self.assertNotIn('"shop_product"."description"', select)  # not in the list card
+        self.assertIn('"shop_product"."main_image"', select)  # read by `thumbnail`
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, ALLOWED_HOSTS=["testserver"])
+class OrderItemShapeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cloudinary.config(cloud_name=cloudinary.config().cloud_name or "test")
+        cls.products = make_products(4, make_categories(2), images=2)
+        cls.user, = make_users(1)
+        cls.orders = make_orders([cls.user], cls.products, per_user=3, items=3)
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+
+    def items(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.get("/api/orders/", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [item for row in response.json()["results"] for item in row["items"]], len(ctx)
+
+    def test_compact_items(self):
+        items, queries = self.items()
+        self.assertEqual(len(items), 9)
+        item = items[0]
+        self.assertEqual(set(item), {"id", "product_id", "name", "thumbnail", "qty", "price_each"})
+        product = next(p for p in self.products if p.pk == item["product_id"])
+        self.assertEqual(item["name"], product.name)
+        # JWT user + page (address joined) + items with their product columns
+        self.assertEqual(queries, 3)
+
+    def test_expanded_items(self):
+        items, queries = self.items(expand="items.product")
+        self.assertEqual(len(items), 9)
+        for item in items:
+            self.assertEqual(item["product"]["id"], item["product_id"])
+            self.assertEqual(len(item["product"]["images"]), 2)
+            self.assertIn("name", item["product"]["category"])
+        # + product images, however many orders and items there are
+        self.assertEqual(queries, 4)
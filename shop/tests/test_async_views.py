@@ -0,0 +1,148 @@
+"""
+ASGI serving path: the image upload views are async, the catalog views
+stay sync (WSGI is the default deployment) but still serve under the
+ASGI handler, and the project middleware runs natively on the event loop.
+"""
+from inspect import iscoroutinefunction
+from types import SimpleNamespace
+from unittest import mock
+
+import cloudinary
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from shop import api_views, uploads, views
+from shop.models import ProductImage, SiteConfig
+from shop.uploads import as_resource
+
+from .factories import make_categories, make_products, make_users
+
+# Smallest valid GIF, enough for ImageField validation.
+GIF = (
+    b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00"
+    b",\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;"
+)
+ASGI_MIDDLEWARE = [m for m in settings.MIDDLEWARE if m != "whitenoise.middleware.WhiteNoiseMiddleware"]
+
+
+async def fake_upload(file, folder, resource_type="image"):
+    return as_resource({"public_id": f"{folder}{file.name}", "version": 1, "format": "gif"})
+
+
+class HTTPError(Exception):
+    pass
+
+
+def fake_httpx(post):
+    """Stand-in for the httpx module whose AsyncClient.post runs `post`."""
+    class AsyncClient:
+        def __init__(self, timeout):
+            pass
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+        async def post(self, url, data, files):
+            return post()
+
+    return SimpleNamespace(AsyncClient=AsyncClient, HTTPError=HTTPError)
+
+
+def unreachable():
+    raise HTTPError("connection refused")
+
+
+def not_json():
+    return SimpleNamespace(status_code=502, json=lambda: json_error())
+
+
+def json_error():
+    raise ValueError("Expecting value: line 1 column 1 (char 0)")
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, ALLOWED_HOSTS=["testserver"], MIDDLEWARE=ASGI_MIDDLEWARE)
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        SiteConfig.objects.create(whatsapp_number="+254700000000")
+        cls.category, = make_categories(1)
+        cls.products = make_products(3, [cls.category], images=1)
+        cls.staff, cls.customer = make_users(2)
+        cls.staff.is_staff = True
+        cls.staff.save(update_fields=["is_staff"])
+        cloudinary.config(cloud_name=cloudinary.config().cloud_name or "test")
+
+    async def test_catalog_views(self):
+        for view in (views.home, views.product_list, views.product_detail,
+                     views.category_products, views.search_products):
+            self.assertFalse(iscoroutinefunction(view), view.__name__)
+        client = AsyncClient()
+        product = self.products[0]
+        for url, text in [
+            (reverse("home"), product.name),
+            (reverse("products"), product.name),
+            (reverse("product_detail", kwargs={"slug": product.slug}), product.name),
+            (reverse("category_products", kwargs={"slug": self.category.slug}), product.name),
+            (reverse("search_products") + "?q=Product", product.name),
+        ]:
+            response = await client.get(url)
+            self.assertContains(response, text, msg_prefix=url)
+
+    @override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=0)
+    async def test_middleware_runs_on_the_event_loop(self):
+        client = AsyncClient()
+        await client.aforce_login(self.staff)
+        response = await client.get(reverse("products"))
+        self.assertEqual(response.status_code, 200)
+        # Staff requests are profiled; the user was loaded without sync DB access.
+        self.assertIn("sql;dur=", response["Server-Timing"])
+
+    @mock.patch.object(api_views, "upload_resource", fake_upload)  # Cloudinary is a network service
+    async def test_product_image_upload(self):
+        product = self.products[1]
+        url = reverse("product_image_upload", kwargs={"product_pk": product.pk})
+
+        def post(user=None, **data):
+            headers = {}
+            if user is not None:
+                headers["Authorization"] = f"Bearer {RefreshToken.for_user(user).access_token}"
+            return AsyncClient().post(url, data, headers=headers)
+
+        self.assertEqual((await post()).status_code, 401)
+        self.assertEqual((await post(self.customer)).status_code, 403)
+        response = await post(self.staff)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("image", response.json())
+
+        response = await post(self.staff, image=SimpleUploadedFile("speaker.gif", GIF, "image/gif"))
+        self.assertEqual(response.status_code, 201, response.content)
+        image = await ProductImage.objects.aget(pk=response.json()["id"])
+        self.assertEqual((image.product_id, image.image.public_id), (product.pk, "products/gallery/speaker.gif"))
+
+    @mock.patch("cloudinary.utils.sign_request", return_value={})  # no API credentials in tests
+    async def test_upload_failures_return_502(self, sign_request):
+        url = reverse("product_image_upload", kwargs={"product_pk": self.products[1].pk})
+        headers = {"Authorization": f"Bearer {RefreshToken.for_user(self.staff).access_token}"}
+        images = await ProductImage.objects.acount()
+        for post in (unreachable, not_json):
+            with self.subTest(post=post.__name__), mock.patch.object(uploads, "_httpx", fake_httpx(post)):
+                image = SimpleUploadedFile("speaker.gif", GIF, "image/gif")
+                response = await AsyncClient().post(url, {"image": image}, headers=headers)
+                self.assertEqual(response.status_code, 502, response.content)
+                self.assertIn("image", response.json())
+        self.assertEqual(await ProductImage.objects.acount(), images)
+
+    async def test_upload_test_page_reports_failures(self):
+        failing = mock.AsyncMock(side_effect=uploads.UploadError("Invalid image file"))
+        with mock.patch.object(views, "upload_resource", failing):
+            image = SimpleUploadedFile("speaker.gif", GIF, "image/gif")
+            response = await AsyncClient().post(reverse("upload_test"), {"image": image})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Upload failed: Invalid image file")
+        self.assertIsNone(response.context["url"])
@@ -0,0 +1,83 @@
+"""
+Logged-in carts live in CartLine rows: changes are single upserts, the
+session cart merges in at login and the cart loads in one query.
+"""
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from shop.cart import Cart
+from shop.models import CartLine, SiteConfig
+
+from .factories import make_categories, make_products, make_users
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, ALLOWED_HOSTS=["testserver"])
+class UserCartTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        SiteConfig.objects.create(whatsapp_number="+254700000000")
+        cls.products = make_products(3, make_categories(1))
+        cls.user, = make_users(1)
+
+    def add(self, client, product, **data):
+        return client.post(reverse("add_to_cart", kwargs={"product_id": product.pk}), data)
+
+    def lines(self):
+        return dict(CartLine.objects.filter(user=self.user).values_list("product_id", "qty"))
+
+    def test_line_changes_are_single_statements(self):
+        client = Client()
+        client.force_login(self.user)
+        first, second = self.products[:2]
+        CartLine.objects.create(user=self.user, product=first, qty=1)
+
+        # Another tab adds to the same line: quantities add up in the database.
+        with self.assertNumQueries(1):
+            CartLine.objects.upsert(self.user.pk, {first.pk: 2, second.pk: 1})
+        self.assertEqual(self.lines(), {first.pk: 3, second.pk: 1})
+
+        self.add(client, first, quantity=5, override="1")
+        self.add(client, second, quantity=-1)
+        self.assertEqual(self.lines(), {first.pk: 5})
+        self.assertNotIn("cart", client.session)
+
+    def test_session_cart_merges_at_login(self):
+        first, second, third = self.products
+        CartLine.objects.create(user=self.user, product=first, qty=1)
+        client = Client()
+        self.add(client, first, quantity=2)
+        self.add(client, second)
+
+        client.force_login(self.user)
+        self.assertEqual(self.lines(), {first.pk: 3, second.pk: 1})
+        self.assertNotIn("cart", client.session)
+
+        # Still there after logging out and back in.
+        client.post(reverse("logout"))
+        client.force_login(self.user)
+        self.add(client, third)
+        self.assertEqual(self.lines(), {first.pk: 3, second.pk: 1, third.pk: 1})
+
+    def test_deleted_product_is_dropped_at_login(self):
+        first = self.products[0]
+        gone, = make_products(1, make_categories(1, prefix="Gone"), prefix="gone")
+        client = Client()
+        self.add(client, first)
+        self.add(client, gone, quantity=2)
+        gone.delete()
+
+        client.force_login(self.user)
+        self.assertEqual(self.lines(), {first.pk: 1})
+        self.assertNotIn("cart", client.session)
+
+    def test_cart_loads_in_one_query(self):
+        CartLine.objects.upsert(self.user.pk, {p.pk: 2 for p in self.products})
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse("cart_detail"))
+        cart = Cart(response.wsgi_request)
+        with self.assertNumQueries(1):
+            total = cart.get_total_price()
+            self.assertEqual(len(cart), 6)
+            self.assertEqual([item["product"] for item in cart], self.products)
+        self.assertEqual(total, sum(p.price * 2 for p in self.products))
@@ -0,0 +1,65 @@
+"""
+JSON cart API: each call returns the changed line, totals and (on request)
+the navbar dropdown from one load of the cart.
+"""
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from shop.models import SiteConfig
+
+from .factories import make_categories, make_products, make_users
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, ALLOWED_HOSTS=["testserver"])
+class CartApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        SiteConfig.objects.create(whatsapp_number="+254700000000")
+        cls.products = make_products(2, make_categories(1))  # 1000 and 1037 KES
+        cls.user, = make_users(1)
+
+    def post(self, client, name, product, **data):
+        return client.post(reverse(name, kwargs={"product_id": product.pk}), data).json()
+
+    def check_flow(self, client):
+        first, second = self.products
+        data = self.post(client, "cart_api_add", first, quantity=2)
+        self.assertEqual(data["line"], {
+            "product_id": first.pk, "name": first.name, "quantity": 2,
+            "price": 1000, "total_price": 2000, "discount": 0,
+        })
+        self.assertEqual((data["count"], data["subtotal"], data["total"]), (2, 2000, 2000))
+
+        self.post(client, "cart_api_add", second)
+        data = self.post(client, "cart_api_set", first, quantity=1)
+        self.assertEqual((data["line"]["quantity"], data["count"], data["total"]), (1, 2, 2037))
+
+        data = self.post(client, "cart_api_remove", second)
+        self.assertEqual(data["line"]["quantity"], 0)
+        self.assertEqual(data["count"], 1)
+
+        summary = client.get(reverse("cart_api_summary")).json()
+        self.assertEqual([line["product_id"] for line in summary["lines"]], [first.pk])
+
+    def test_session_cart(self):
+        self.check_flow(Client())
+
+    def test_user_cart(self):
+        client = Client()
+        client.force_login(self.user)
+        self.check_flow(client)
+
+    def test_fragment_and_errors(self):
+        client = Client()
+        url = reverse("cart_api_add", kwargs={"product_id": self.products[0].pk})
+        data = client.post(f"{url}?fragment=1").json()
+        self.assertIn(self.products[0].name, data["dropdown_html"])
+        self.assertNotIn("<html", data["dropdown_html"])
+
+        response = client.get(reverse("cart_fragment"))
+        self.assertContains(response, "x1")
+        self.assertContains(response, "KES 1000")
+
+        response = client.post(reverse("cart_api_set", kwargs={"product_id": self.products[0].pk}), {"quantity": "-1"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(client.get(url).status_code, 405)
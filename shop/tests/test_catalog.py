@@ -0,0 +1,158 @@
+"""
+Catalog writes: rows are validated up front, so bad input becomes a
+per-row error instead of an exception; the import command diffs a file in
+chunks and writes it in bulk.
+"""
+import csv
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from shop.catalog import RowError, allocate_slugs, bulk_upsert_products, clean_row
+from shop.models import Category, Product
+
+from .factories import make_categories, make_products
+
+
+class CleanRowTests(SimpleTestCase):
+    def test_valid_row(self):
+        key, values = clean_row({"slug": " Big-Speaker ", "price": "1,200", "badge_type": "SALE", "featured": "yes"})
+        self.assertEqual(key, ("slug", "big-speaker"))
+        self.assertEqual(values, {"price": 1200, "badge_type": "sale", "featured": True})
+
+    def test_invalid_rows(self):
+        for row, message in (
+            ({"id": 1, "badge_type": 5}, "badge_type must be one of"),
+            ({"slug": "no spaces/slashes"}, "slug may only contain"),
+            ({"slug": "x" * 201}, "slug is longer than 200"),
+            ({"id": "abc"}, "id must be an integer"),
+            ({"id": 1, "price": -1}, "price must not be negative"),
+            ({"price": 10}, "each row needs an id, a slug or a name"),
+        ):
+            with self.subTest(row=row), self.assertRaisesMessage(RowError, message):
+                clean_row(row)
+
+
+class BulkUpsertTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category, = make_categories(1)
+        cls.products = make_products(3, [cls.category], stock=5)
+
+    def test_created_updated_unchanged_and_errors(self):
+        first, second, _ = self.products
+        results = bulk_upsert_products([
+            {"id": first.pk, "price": 999},
+            {"slug": second.slug, "price": second.price},
+            {"name": "New Amp", "price": 500, "category": self.category.slug},
+            {"id": 99999, "price": 1},
+            {"id": first.pk, "badge_type": 5},
+            {"name": "No Category", "price": 1},
+        ])
+        self.assertEqual(
+            [r["status"] for r in results],
+            ["updated", "unchanged", "created", "error", "error", "error"],
+        )
+        self.assertEqual(results[0]["changes"], {"price": [first.price, 999]})
+        self.assertEqual(results[3]["errors"], ["product not found"])
+        self.assertEqual(results[5]["errors"], ["category is required for new products"])
+        self.assertEqual(Product.objects.get(pk=first.pk).price, 999)
+        self.assertEqual(Product.objects.get(pk=results[2]["id"]).slug, "new-amp")
+
+    def test_slugs_are_allocated_around_collisions(self):
+        make_products(1, [self.category], prefix="product-0")  # takes "product-0-0"
+        Product.objects.create(name="Taken", slug="product-0-2", price=1, category=self.category)
+        self.assertEqual(
+            allocate_slugs(["Product 0", "Product 0", "Brand New", "!!!"]),
+            ["product-0-3", "product-0-4", "brand-new", "product"],
+        )
+        results = bulk_upsert_products([
+            {"name": "Product 1", "price": 1, "category": str(self.category.pk)},
+            {"name": "Product 1", "price": 2, "category": str(self.category.pk)},
+        ])
+        self.assertEqual([r["slug"] for r in results], ["product-1-2", "product-1-3"])
+
+    def test_dry_run_writes_nothing(self):
+        results = bulk_upsert_products(
+            [{"id": self.products[0].pk, "price": 1}, {"name": "Ghost", "price": 1, "category": self.category.slug}],
+            dry_run=True,
+        )
+        self.assertEqual([(r["status"], r["id"]) for r in results], [("updated", self.products[0].pk), ("created", None)])
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).price, self.products[0].price)
+        self.assertFalse(Product.objects.filter(name="Ghost").exists())
+
+
+class ImportCatalogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category, = make_categories(1)
+        cls.products = make_products(3, [cls.category], stock=5)
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def write_csv(self, rows):
+        path = os.path.join(self.dir.name, "catalog.csv")
+        with open(path, "w", newline="") as f:
+            csv.writer(f).writerows([["slug", "name", "price", "stock", "category"], *rows])
+        return path
+
+    def run_import(self, rows, *args):
+        out = StringIO()
+        call_command("import_catalog", self.write_csv(rows), *args, stdout=out)
+        return out.getvalue()
+
+    def test_import_and_reimport(self):
+        rows = [
+            [self.products[0].slug, "", "1500", "", ""],
+            ["", "Studio Monitor", "20000", "4", "Monitors"],
+        ]
+        out = self.run_import(rows, "--create-categories", "--chunk-size", "1")
+        self.assertIn("1 created, 1 updated, 0 unchanged, 0 errors", out)
+        monitor = Product.objects.get(slug="studio-monitor")
+        self.assertEqual((monitor.price, monitor.category.slug), (20000, "monitors"))
+
+        # Name-only rows are keyed on their slug, so a second import changes nothing.
+        self.assertIn("0 created, 0 updated, 2 unchanged", self.run_import(rows))
+
+    def test_dry_run_rolls_back(self):
+        out = self.run_import(
+            [[self.products[0].slug, "", "1", "", ""], ["", "Ghost", "1", "", "New Category"]],
+            "--dry-run", "--create-categories",
+        )
+        self.assertIn("🔎 Would import 2 rows: 1 created, 1 updated", out)
+        self.assertIn("+ ghost", out)
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).price, self.products[0].price)
+        self.assertFalse(Product.objects.filter(slug="ghost").exists())
+        self.assertFalse(Category.objects.filter(slug="new-category").exists())
+
+    def test_errors_are_reported_per_line(self):
+        report = os.path.join(self.dir.name, "report.csv")
+        out = self.run_import(
+            [[self.products[0].slug, "", "cheap", "", ""], ["bad slug!", "", "1", "", ""], ["", "Fine", "1", "", ""]],
+            "--report", report,
+        )
+        self.assertIn("3 errors", out)
+        with open(report, newline="") as f:
+            errors = {row["line"]: row["errors"] for row in csv.DictReader(f)}
+        self.assertEqual(errors["2"], "price must be a whole number")
+        self.assertIn("slug may only contain", errors["3"])
+        self.assertEqual(errors["4"], "category is required for new products")
+
+    def test_deactivate_missing(self):
+        kept = self.products[0]
+        out = self.run_import([[kept.slug, "", "", "", ""]], "--deactivate-missing")
+        self.assertIn("2 deactivated", out)
+        self.assertEqual(
+            dict(Product.objects.values_list("slug", "stock")),
+            {kept.slug: 5, self.products[1].slug: 0, self.products[2].slug: 0},
+        )
+
+    def test_deactivate_missing_is_skipped_after_errors(self):
+        out = self.run_import([[self.products[0].slug, "", "-1", "", ""]], "--deactivate-missing")
+        self.assertIn("Skipping --deactivate-missing", out)
+        self.assertFalse(Product.objects.filter(stock=0).exists())
@@ -0,0 +1,61 @@
+"""
+Fake shop generator: a tiny run creates every table's rows in the asked
+amounts, and the timestamp override never outlives its block.
+"""
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import FieldDoesNotExist
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from shop.fake_data import explicit_timestamps
+from shop.models import Address, Category, DeletionLog, Order, OrderItem, Product, ProductImage, Review
+
+
+class FakeShopTests(TestCase):
+    def generate(self, seed=7):
+        out = StringIO()
+        call_command(
+            "generate_fake_shop", seed=seed, categories=2, products=5, users=4,
+            reviews=6, orders=5, batch_size=2, stdout=out,
+        )
+        return out.getvalue()
+
+    def test_small_shop(self):
+        out = self.generate()
+        self.assertIn("Fake shop (seed 7) ready: 5 products, 4 users, 5 orders", out)
+        self.assertEqual(Category.objects.count(), 2)
+        self.assertEqual(Product.objects.filter(slug__contains="-s7-").count(), 5)
+        self.assertEqual(get_user_model().objects.filter(username__startswith="fake7_").count(), 4)
+        self.assertEqual(Address.objects.count(), 4)
+        self.assertEqual(Review.objects.count(), 6)
+        self.assertEqual(Order.objects.count(), 5)
+        self.assertGreaterEqual(OrderItem.objects.count(), 5)
+        self.assertEqual(sum(Product.objects.values_list("rating_count", flat=True)), 6)
+        # Historical timestamps were kept, not replaced by "now".
+        self.assertGreater(len(set(Order.objects.values_list("created_at", flat=True))), 1)
+
+        with self.assertRaisesMessage(CommandError, "Data for seed 7 already exists"):
+            self.generate()
+
+    def test_timestamp_override_is_restored(self):
+        def flags():
+            return [
+                (f.auto_now, f.auto_now_add)
+                for model in (Product, ProductImage)
+                for f in (model._meta.get_field("created_at"), model._meta.get_field("updated_at"))
+            ]
+
+        before = flags()
+        with self.assertRaises(RuntimeError):
+            with explicit_timestamps(Product, ProductImage):
+                self.assertEqual(set(flags()), {(False, False)})
+                raise RuntimeError
+        self.assertEqual(flags(), before)
+
+        # DeletionLog has no created_at: Product's flags are put back too.
+        with self.assertRaises(FieldDoesNotExist):
+            with explicit_timestamps(Product, DeletionLog):
+                pass
+        self.assertEqual(flags(), before)
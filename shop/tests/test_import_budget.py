@@ -0,0 +1,36 @@
+"""
+Startup import budget: django.setup() leaves the heavy, rarely needed
+modules to their first use.
+"""
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+
+from shop.management.commands.import_budget import parse_importtime
+
+SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   shop.keyset
+import time:       300 |        420 | shop
+import time:      2000 |       2000 | openpyxl
+"""
+
+
+class ImportBudgetTests(SimpleTestCase):
+    def test_parse_importtime(self):
+        self.assertEqual(parse_importtime(SAMPLE), [
+            ("shop.keyset", 120, 120, 1), ("shop", 300, 420, 0), ("openpyxl", 2000, 2000, 0),
+        ])
+
+    def test_setup_defers_heavy_imports(self):
+        out = StringIO()
+        lazy = [*settings.STARTUP_LAZY_MODULES, "rest_framework", "shop.urls"]
+        with override_settings(IMPORT_TIME_BUDGET_MS=10_000, STARTUP_LAZY_MODULES=lazy):
+            call_command("import_budget", runs=1, stdout=out)
+        self.assertIn("✅", out.getvalue())
+
+    def test_over_budget_fails(self):
+        with self.assertRaisesMessage(CommandError, "over the 1 ms budget"):
+            call_command("import_budget", runs=1, budget_ms=1, stdout=StringIO())
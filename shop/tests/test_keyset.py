@@ -0,0 +1,69 @@
+"""
+Keyset cursors: tokens round-trip, and tampered ones are rejected instead
+of reaching the database.
+"""
+import base64
+import json
+from datetime import datetime, timezone
+
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from shop.keyset import decode_cursor, encode_cursor
+from shop.models import SiteConfig
+
+from .factories import make_categories, make_products
+
+
+def token(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+IMPOSSIBLE_DATE = token(["2024-13-45T00:00:00", 1])
+
+# Decode fine but do not fit a (created_at, id) ordering.
+WRONG_TYPES = [
+    token(["abc", 1]),
+    token([{"a": 1}, 1]),
+    token([1, "x"]),
+    token([[1], [2]]),
+    token(["2024-01-01T00:00:00", "x"]),
+]
+
+
+class CursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        created = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+        self.assertEqual(decode_cursor(encode_cursor([created, 7])), ([created, 7], False))
+        self.assertEqual(decode_cursor(encode_cursor([created, 7], reverse=True)), ([created, 7], True))
+
+    def test_malformed_tokens(self):
+        for bad in ("%%%", token({"v": "x"}), token("x"), IMPOSSIBLE_DATE):
+            with self.subTest(bad=bad):
+                self.assertEqual(decode_cursor(bad), (None, False))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, ALLOWED_HOSTS=["testserver"])
+class CursorViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        SiteConfig.objects.create(whatsapp_number="+254700000000")
+        cls.product, = make_products(1, make_categories(1))
+
+    def test_api_rejects_impossible_date(self):
+        response = Client().get("/api/products/", {"cursor": IMPOSSIBLE_DATE})
+        self.assertEqual(response.status_code, 404)
+
+    def test_api_rejects_wrong_value_types(self):
+        for bad in WRONG_TYPES:
+            with self.subTest(bad=bad):
+                response = Client().get("/api/products/", {"cursor": bad})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json(), {"detail": "Invalid cursor"})
+
+    def test_reviews_cursor_falls_back_to_first_page(self):
+        url = reverse("product_detail", kwargs={"slug": self.product.slug})
+        for bad in [IMPOSSIBLE_DATE, *WRONG_TYPES]:
+            with self.subTest(bad=bad):
+                response = Client().get(url, {"reviews_cursor": bad})
+                self.assertEqual(response.status_code, 200)
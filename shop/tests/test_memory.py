@@ -0,0 +1,77 @@
+"""
+Memory instrumentation: traced runs name their allocation sites and the
+report ranks the worst offenders.
+"""
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from shop import memory
+from shop.models import SiteConfig
+
+from .factories import make_categories, make_products
+
+
+class MemoryInstrumentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        SiteConfig.objects.create(whatsapp_number="+254700000000")
+        make_products(20, make_categories(1))
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.log_file = os.path.join(self.dir.name, "memory.log")
+        for handler in list(memory.records.handlers):
+            memory.records.removeHandler(handler)
+            handler.close()
+        overrides = override_settings(
+            SECURE_SSL_REDIRECT=False, ALLOWED_HOSTS=["testserver"],
+            MEMORY_PROFILING_ENABLED=True, MEMORY_SAMPLE_RATE=1, MEMORY_WARN_MB=0,
+            MEMORY_LOG_FILE=self.log_file,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def read(self):
+        with open(self.log_file) as f:
+            return [json.loads(line) for line in f]
+
+    def test_traced_block_names_project_allocation_site(self):
+        with self.assertLogs("shop.memory", "WARNING"):
+            with memory.measure("manage.py example", "command", trace=True):
+                blob = [bytearray(1024) for _ in range(4096)]  # ~4 MiB from this line
+                del blob
+        record, = self.read()
+        self.assertGreaterEqual(record["peak_kb"], 4096)
+        self.assertTrue(record["top"][0]["site"].startswith("shop/tests/test_memory.py:"))
+
+    def test_requests_are_recorded_and_reported(self):
+        with self.assertLogs("shop.memory", "WARNING") as logs:
+            Client().get(reverse("products"))
+        self.assertIn("request GET products", logs.output[0])
+        record, = self.read()
+        self.assertEqual(record["label"], "GET products")
+        self.assertIn("peak_kb", record)
+
+        out = StringIO()
+        call_command("memory_report", file=self.log_file, stdout=out)
+        self.assertIn("GET products", out.getvalue())
+
+    def test_records_go_to_the_logger_without_a_file(self):
+        with override_settings(MEMORY_LOG_FILE=""), self.assertLogs("shop.memory", "INFO") as logs:
+            with memory.measure("manage.py example", "command", trace=True):
+                pass
+        line, = [r.getMessage() for r in logs.records if r.name == "shop.memory.records"]
+        record = json.loads(line)
+        self.assertEqual((record["kind"], record["label"]), ("command", "manage.py example"))
+        self.assertFalse(memory.records.handlers)
+        self.assertFalse(os.path.exists(self.log_file))
+
+        with self.assertRaisesMessage(CommandError, "MEMORY_LOG_FILE"):
+            call_command("memory_report", file="")
@@ -0,0 +1,85 @@
+"""
+/metrics merges every worker's snapshot and is closed to anonymous users.
+"""
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from shop import metrics
+from shop.models import OutboxEmail
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        overrides = override_settings(
+            SECURE_SSL_REDIRECT=False, ALLOWED_HOSTS=["testserver"],
+            METRICS_DIR=self.dir.name, METRICS_TOKEN="scrape-me",
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def scrape(self):
+        response = Client().get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer scrape-me")
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_access(self):
+        self.assertEqual(Client().get(reverse("metrics")).status_code, 403)
+        bad = Client().get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer nope")
+        self.assertEqual(bad.status_code, 403)
+        staff = get_user_model().objects.create_superuser("staff", "staff@example.com", "pw")
+        client = Client()
+        client.force_login(staff)
+        self.assertEqual(client.get(reverse("metrics")).status_code, 200)
+
+    def test_requests_are_counted_and_merged_across_workers(self):
+        Client().get(reverse("contact"))
+        # Another worker's snapshot in the shared directory.
+        other = {
+            "values": [["shop_orders_placed_total", [], 3]],
+            "histograms": [[
+                "shop_http_request_duration_seconds", [["method", "GET"], ["view", "contact"]],
+                [1] + [0] * len(metrics.LATENCY_BUCKETS) + [0.004],
+            ]],
+        }
+        with open(os.path.join(self.dir.name, "1-1.json"), "w") as f:
+            json.dump(other, f)
+        OutboxEmail.objects.create(to_email="a@example.com", subject="S", body_text="B")
+
+        text = self.scrape()
+        self.assertIn('shop_http_requests_total{method="GET",status="200",view="contact"} ', text)
+        self.assertIn('shop_http_request_duration_seconds_bucket{method="GET",view="contact",le="+Inf"} ', text)
+        count = next(
+            line for line in text.splitlines()
+            if line.startswith('shop_http_request_duration_seconds_count{method="GET",view="contact"}')
+        )
+        self.assertGreaterEqual(int(count.split()[-1]), 2)
+        self.assertIn("shop_orders_placed_total 3", text)
+        self.assertIn('shop_outbox_queue_depth{status="pending"} 1', text)
+        self.assertIn("# TYPE shop_db_queries_per_request histogram", text)
+
+    def test_exited_workers_are_folded_into_retired(self):
+        def snapshot(orders):
+            return {"values": [["shop_orders_placed_total", [], orders]], "histograms": []}
+
+        for filename, orders in (("101-1.json", 3), ("101-2.json", 1), ("202-1.json", 5)):
+            with open(os.path.join(self.dir.name, filename), "w") as f:
+                json.dump(snapshot(orders), f)
+        self.assertEqual(metrics.retire(101), 2)
+        self.assertEqual(metrics.retire(303), 0)
+        self.assertIn("shop_orders_placed_total 9", self.scrape())
+
+        # A replacement worker with the same pid starts a new file; totals keep growing.
+        with open(os.path.join(self.dir.name, "101-3.json"), "w") as f:
+            json.dump(snapshot(2), f)
+        metrics.retire(101)
+        metrics.retire(202)
+        self.assertIn("shop_orders_placed_total 11", self.scrape())
+        files = sorted(f for f in os.listdir(self.dir.name) if f.endswith(".json"))
+        self.assertEqual(files, [metrics._snapshot_name(), metrics.RETIRED])
@@ -0,0 +1,154 @@
+"""
+Newsletter campaigns: recipients are sent in checkpointed chunks over
+reused connections, one run at a time holds a campaign, and a run that
+stopped is resumed from its checkpoint by the next one.
+"""
+import smtplib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from shop.models import CampaignDelivery, NewsletterCampaign, NewsletterSubscription
+from shop.newsletter import CampaignSender, ConnectionPool, LeaseLost, RateLimiter
+
+
+class FlakyBackend(EmailBackend):
+    """locmem backend that rejects some recipients; the first connection drops."""
+
+    opened = 0
+
+    def __init__(self, reject=(), **kwargs):
+        super().__init__(**kwargs)
+        self.reject = set(reject)
+        self.drop = FlakyBackend.opened == 0
+
+    def open(self):
+        FlakyBackend.opened += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        if self.drop:
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        for message in messages:
+            if set(message.to) & self.reject:
+                raise smtplib.SMTPRecipientsRefused({message.to[0]: (550, b"No such user")})
+        return super().send_messages(messages)
+
+
+class RateLimiterTests(SimpleTestCase):
+    def test_spaces_messages_across_threads(self):
+        limiter = RateLimiter(10)
+        with mock.patch("shop.newsletter.time.sleep") as sleep:
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                list(executor.map(lambda _: limiter.wait(), range(5)))
+        # The first slot is free; the other four wait 0.1 s more each.
+        delays = sorted(call.args[0] for call in sleep.call_args_list)
+        self.assertEqual(len(delays), 4)
+        for expected, delay in zip((0.1, 0.2, 0.3, 0.4), delays):
+            self.assertAlmostEqual(delay, expected, delta=0.05)
+
+    def test_zero_rate_never_waits(self):
+        with mock.patch("shop.newsletter.time.sleep") as sleep:
+            for _ in range(3):
+                RateLimiter(0).wait()
+        sleep.assert_not_called()
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def test_one_connection_per_thread_until_reset(self):
+        pool = ConnectionPool(FlakyBackend)
+        conn = pool.get()
+        self.assertIs(pool.get(), conn)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            self.assertIsNot(executor.submit(pool.get).result(), conn)
+        pool.reset()
+        self.assertIsNot(pool.get(), conn)
+        pool.close_all()
+        self.assertEqual(pool._all, [])
+
+
+class CampaignSenderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        NewsletterSubscription.objects.bulk_create([
+            NewsletterSubscription(email=f"reader{i}@example.com") for i in range(4)
+        ])
+
+    def setUp(self):
+        self.campaign = NewsletterCampaign.objects.create(subject="News", body_text="Hi", status="queued")
+
+    def sender(self, **kwargs):
+        campaign = NewsletterCampaign.objects.get(pk=self.campaign.pk)
+        return CampaignSender(campaign, batch_size=2, rate=0, connections=1, **kwargs)
+
+    def test_sends_in_checkpointed_chunks(self):
+        out = StringIO()
+        self.assertEqual(self.sender(stdout=out).run(), (4, 0))
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), [f"reader{i}@example.com" for i in range(4)])
+        self.assertEqual(out.getvalue().count("up to subscription"), 2)
+        campaign = NewsletterCampaign.objects.get(pk=self.campaign.pk)
+        self.assertEqual((campaign.sent_count, campaign.failed_count), (4, 0))
+        self.assertEqual(campaign.last_subscription_id, NewsletterSubscription.objects.latest("id").id)
+        self.assertIsNotNone(campaign.finished_at)
+
+    def test_resumes_from_checkpoint(self):
+        first_two = list(NewsletterSubscription.objects.order_by("id")[:2])
+        NewsletterCampaign.objects.filter(pk=self.campaign.pk).update(
+            status="sending", last_subscription_id=first_two[-1].id, sent_count=2,
+        )
+        self.assertEqual(self.sender().run(), (2, 0))
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ["reader2@example.com", "reader3@example.com"])
+        self.assertEqual(NewsletterCampaign.objects.get(pk=self.campaign.pk).sent_count, 4)
+
+    def test_failed_deliveries_are_recorded(self):
+        FlakyBackend.opened = 0
+        sender = self.sender(connection_factory=lambda: FlakyBackend(reject={"reader1@example.com"}))
+        self.assertEqual(sender.run(), (3, 1))
+        # The dropped connection was reopened and its recipient retried.
+        self.assertEqual(FlakyBackend.opened, 2)
+        self.assertEqual(len(mail.outbox), 3)
+        failed = CampaignDelivery.objects.get(campaign=self.campaign, status="failed")
+        self.assertEqual(failed.email, "reader1@example.com")
+        self.assertIn("No such user", failed.error)
+        self.assertEqual(CampaignDelivery.objects.filter(campaign=self.campaign, status="sent").count(), 3)
+
+    def test_only_one_run_claims_a_campaign(self):
+        first, second = self.sender(), self.sender()
+        self.assertTrue(first.claim())
+        self.assertFalse(second.claim())
+        self.assertIsNone(second.run())
+        self.assertEqual(len(mail.outbox), 0)
+
+        out = StringIO()
+        call_command("send_newsletter", stdout=out)
+        self.assertIn("being sent by another run", out.getvalue())
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_expired_lease_is_taken_over(self):
+        stalled, successor = self.sender(), self.sender()
+        self.assertTrue(stalled.claim())
+        NewsletterCampaign.objects.filter(pk=self.campaign.pk).update(
+            lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertTrue(successor.claim())
+
+        # The stalled run finds its lease gone at its next checkpoint.
+        with ThreadPoolExecutor(max_workers=1) as executor, self.assertRaises(LeaseLost):
+            stalled._send_chunk(executor, next(stalled._chunks()))
+
+        self.assertEqual(successor.run(), (2, 0))  # the two the stalled run sent are not resent
+        campaign = NewsletterCampaign.objects.get(pk=self.campaign.pk)
+        self.assertEqual((campaign.status, campaign.lease_owner, campaign.lease_expires_at), ("sent", "", None))
+        self.assertEqual(len(mail.outbox), 4)
+
+    def test_sent_campaign_is_not_claimed_again(self):
+        self.assertEqual(self.sender().run(), (4, 0))
+        self.assertIsNone(self.sender().run())
+        self.assertEqual(len(mail.outbox), 4)
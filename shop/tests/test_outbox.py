@@ -0,0 +1,149 @@
+"""
+Transactional email outbox: emails are written in the same transaction as
+the change that triggers them, and workers deliver each one once, retrying
+with backoff until they give up.
+"""
+import smtplib
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from shop import forms, outbox, serializers, views
+from shop.models import Address, CartLine, Order, OutboxEmail, SiteConfig
+from shop.outbox import CLAIM_LEASE, OutboxWorker, backoff_delay
+
+from .factories import make_categories, make_products, make_users
+
+
+class DownBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise smtplib.SMTPDataError(451, b"Try again later")
+
+
+def then_fail(func):
+    """Run the real enqueue, then fail the surrounding transaction."""
+    def wrapper(*args, **kwargs):
+        func(*args, **kwargs)
+        raise RuntimeError("boom")
+    return wrapper
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, ALLOWED_HOSTS=["testserver"])
+class EnqueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        SiteConfig.objects.create(whatsapp_number="+254700000000")
+        cls.product, = make_products(1, make_categories(1))
+        cls.user, = make_users(1)
+        cls.address = Address.objects.create(user=cls.user, full_name="A", phone="1", line1="L", city="C")
+
+    def place_order(self):
+        client = Client()
+        client.force_login(self.user)
+        CartLine.objects.upsert(self.user.pk, {self.product.pk: 1})
+        return client.post(reverse("place_order"), {"address_id": self.address.pk})
+
+    def api_order(self):
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+        return api.post(
+            reverse("order-list"),
+            {"address_id": self.address.pk, "items": [{"product_id": self.product.pk, "qty": 1}]},
+            format="json",
+        )
+
+    def reset_password(self):
+        return Client().post(reverse("password_reset"), {"email": self.user.email})
+
+    def test_emails_are_queued_not_sent(self):
+        self.place_order()
+        self.assertEqual(self.api_order().status_code, 201)
+        self.reset_password()
+        self.assertEqual(
+            sorted(OutboxEmail.objects.values_list("kind", "to_email")),
+            [("order_confirmation", self.user.email)] * 2 + [("password_reset", self.user.email)],
+        )
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_nothing_is_queued_when_the_transaction_rolls_back(self):
+        for module, name, request in (
+            (views, "enqueue_order_confirmation", self.place_order),
+            (serializers, "enqueue_order_confirmation", self.api_order),
+            (forms, "enqueue_template", self.reset_password),
+        ):
+            with self.subTest(request=request.__name__):
+                with mock.patch.object(module, name, then_fail(getattr(module, name))):
+                    with self.assertRaisesMessage(RuntimeError, "boom"):
+                        request()
+                self.assertFalse(OutboxEmail.objects.exists())
+        self.assertFalse(Order.objects.exists())
+
+
+class OutboxWorkerTests(TestCase):
+    def setUp(self):
+        for i in range(3):
+            outbox.enqueue(f"customer{i}@example.com", "Your order", "Thanks!", kind="order_confirmation")
+
+    def test_claim_sets_lease_and_counts_attempt(self):
+        before = timezone.now()
+        batch = OutboxWorker(batch_size=2).claim_batch()
+        self.assertEqual([e.attempts for e in batch], [1, 1])
+        for email in batch:
+            self.assertGreaterEqual(email.next_attempt_at, before + timedelta(seconds=CLAIM_LEASE))
+
+    def test_two_workers_never_deliver_the_same_email(self):
+        first, second = OutboxWorker(batch_size=2), OutboxWorker(batch_size=2)
+        claimed = first.claim_batch() + second.claim_batch()
+        self.assertEqual(len({e.pk for e in claimed}), 3)
+        self.assertEqual(second.claim_batch(), [])
+
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(first.drain() + second.drain(), 3)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), [f"customer{i}@example.com" for i in range(3)])
+        self.assertEqual(set(OutboxEmail.objects.values_list("status", flat=True)), {"sent"})
+        self.assertEqual(mail.outbox[0].body, "Thanks!")
+        # Delivered bodies are not kept (reset links would otherwise linger).
+        self.assertEqual(set(OutboxEmail.objects.values_list("body_text", "body_html")), {("", "")})
+
+    def test_failures_back_off_then_dead_letter(self):
+        worker = OutboxWorker(max_attempts=2, connection=DownBackend())
+        before = timezone.now()
+        self.assertEqual(worker.drain(), 3)
+        email = OutboxEmail.objects.first()
+        self.assertEqual((email.status, email.attempts), ("pending", 1))
+        self.assertIn("SMTPDataError", email.last_error)
+        self.assertGreaterEqual(email.next_attempt_at, before + backoff_delay(1))
+        self.assertEqual(worker.drain(), 0)  # nothing due during the backoff
+
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        worker = OutboxWorker(max_attempts=2, connection=DownBackend())
+        with self.assertLogs("shop.outbox", "ERROR"):
+            self.assertEqual(worker.drain(), 3)
+        self.assertEqual(set(OutboxEmail.objects.values_list("status", "attempts")), {("dead", 2)})
+        self.assertEqual(set(OutboxEmail.objects.values_list("body_text", flat=True)), {"Thanks!"})  # for a requeue
+        self.assertEqual(worker.metrics["dead"], 3)
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        self.assertEqual(
+            [backoff_delay(n).total_seconds() for n in (1, 2, 3, 20)],
+            [30, 60, 120, 3600],
+        )
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, ALLOWED_HOSTS=["testserver"])
+class OutboxAdminTests(TestCase):
+    def test_change_page_hides_bodies(self):
+        email = outbox.enqueue("customer@example.com", "Reset", "https://example.com/reset/abc-token/")
+        staff, = make_users(1, is_staff=True, is_superuser=True)
+        client = Client()
+        client.force_login(staff)
+        response = client.get(reverse("admin:shop_outboxemail_change", args=[email.pk]))
+        self.assertContains(response, "customer@example.com")
+        self.assertNotContains(response, "abc-token")
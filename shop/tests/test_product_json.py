@@ -0,0 +1,78 @@
+"""
+Product list JSON: default-representation pages are spliced together from
+cached per-product blobs, and ORJSONRenderer writes the same bytes as
+DRF's JSONRenderer.
+"""
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest import mock
+
+import cloudinary
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from shop.caches import product_json_key
+from shop.models import Product
+from shop.renderers import ORJSONRenderer
+from shop.serializers import ProductListSerializer
+
+from .factories import make_categories, make_products
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, ALLOWED_HOSTS=["testserver"])
+class ProductJSONCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cloudinary.config(cloud_name=cloudinary.config().cloud_name or "test")
+        cls.products = make_products(3, make_categories(1))
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def get(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = APIClient().get("/api/products/")
+        self.assertEqual(response.status_code, 200)
+        return response, [q["sql"] for q in ctx.captured_queries]
+
+    def test_second_request_is_served_from_blobs(self):
+        first, _ = self.get()
+        with mock.patch.object(
+            ProductListSerializer, "to_representation", side_effect=AssertionError("serialized again"),
+        ):
+            second, queries = self.get()
+        self.assertEqual(second.content, first.content)
+        # Only the page itself; no catalog lookups to rebuild the cards.
+        self.assertEqual(len(queries), 1)
+        self.assertIn('FROM "shop_product"', queries[0])
+
+    def test_key_follows_updated_at(self):
+        product = Product.objects.get(pk=self.products[0].pk)
+        before = product_json_key(ProductListSerializer, product)
+        self.get()
+        self.assertIsNotNone(cache.get(before))
+
+        product.name = "Renamed"
+        product.save()
+        self.assertNotEqual(product_json_key(ProductListSerializer, product), before)
+        response, _ = self.get()
+        names = [row["name"] for row in response.json()["results"]]
+        self.assertIn("Renamed", names)
+
+
+class RendererTests(SimpleTestCase):
+    def test_matches_json_renderer(self):
+        payloads = [
+            {"price": Decimal("1234.50"), "rating": Decimal("4.25"), "count": 3},
+            {"at": datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)},
+            {"at": datetime(2024, 5, 1, 12, 30)},
+            [{"name": "Paneli ya jua ☀", "ids": (1, 2), "missing": None, "on": True}],
+        ]
+        for data in payloads:
+            with self.subTest(data=data):
+                self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
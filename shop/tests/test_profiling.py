@@ -0,0 +1,51 @@
+"""
+The profiling middleware only adds Server-Timing to staff or sampled requests.
+"""
+import re
+
+import cloudinary
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from shop.models import SiteConfig
+
+from .factories import make_categories, make_products
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    ALLOWED_HOSTS=["testserver"],
+    PROFILING_ENABLED=True,
+    PROFILING_SAMPLE_RATE=0,
+)
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cloudinary.config(cloud_name=cloudinary.config().cloud_name or "test")
+        SiteConfig.objects.create(whatsapp_number="+254700000000")
+        make_products(3, make_categories(1), images=1)
+        cls.staff = get_user_model().objects.create_superuser("staff", "staff@example.com", "pw")
+
+    def test_staff_requests_get_a_breakdown(self):
+        client = Client()
+        client.force_login(self.staff)
+        with self.assertLogs("shop.profiling", "INFO") as logs:
+            response = client.get(reverse("products"))
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'sql;dur=[\d.]+;desc="[1-9]\d* queries"')
+        for name in ("cache", "tpl", "cdn", "total"):
+            self.assertIn(f"{name};dur=", timing)
+        self.assertGreater(float(re.search(r"tpl;dur=([\d.]+)", timing)[1]), 0)
+        self.assertIn('"path": "/products/"', logs.output[0])
+
+    def test_anonymous_requests_are_not_profiled_unless_sampled(self):
+        self.assertNotIn("Server-Timing", Client().get(reverse("products")))
+        with override_settings(PROFILING_SAMPLE_RATE=1):
+            self.assertIn("Server-Timing", Client().get(reverse("products")))
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_disabled(self):
+        client = Client()
+        client.force_login(self.staff)
+        self.assertNotIn("Server-Timing", client.get(reverse("products")))
@@ -0,0 +1,98 @@
+"""
+Promotions: rules are compiled into a cached index, carts are priced in
+one pass and orders from the site and the API record the same discount.
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from shop import promotions
+from shop.models import Address, CartLine, Order, Promotion, SiteConfig
+
+from .factories import make_categories, make_products, make_users
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, ALLOWED_HOSTS=["testserver"])
+class PromotionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        SiteConfig.objects.create(whatsapp_number="+254700000000")
+        cls.speakers, cls.cables = make_categories(2)
+        # Prices 1000, 1037, 1074, 1111; even ones are speakers.
+        cls.products = make_products(4, [cls.speakers, cls.cables])
+        cls.user, = make_users(1)
+        cls.address = Address.objects.create(user=cls.user, full_name="A", phone="1", line1="L", city="C")
+
+        Promotion.objects.create(name="Speaker week", kind="percent", percent=10).categories.add(cls.speakers)
+        Promotion.objects.create(name="Cable deal", kind="bogo", buy_qty=2, get_qty=1).products.add(cls.products[1])
+        Promotion.objects.create(name="Big cart", kind="threshold", min_subtotal=5000, amount_off=500)
+        Promotion.objects.create(
+            name="Next week", kind="percent", percent=50, starts_at=timezone.now() + timedelta(days=7),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_cart_is_priced_in_one_pass_from_the_cached_index(self):
+        speaker, cable = self.products[0], self.products[1]
+        lines = [(speaker, 2), (cable, 3)]  # 2000 - 200, 3111 - 1037
+        with self.assertNumQueries(3):  # rules, product scopes, category scopes
+            pricing = promotions.price_lines(lines)
+        with self.assertNumQueries(0):
+            self.assertEqual(promotions.price_lines(lines), pricing)
+
+        self.assertEqual(pricing.subtotal, 5111)
+        self.assertEqual(pricing.line_discounts, {speaker.pk: 200, cable.pk: 1037})
+        # 3874 left is under the 5000 threshold.
+        self.assertEqual(pricing.discount, 1237)
+        self.assertEqual(pricing.applied, ["Speaker week", "Cable deal"])
+
+        # 9 cables: 3 free, and the 6222 left clears the threshold.
+        self.assertEqual(promotions.price_lines([(cable, 9)]).discount, 3 * 1037 + 500)
+
+    def test_changing_a_rule_invalidates_the_index(self):
+        speaker = self.products[0]
+        self.assertEqual(promotions.price_lines([(speaker, 1)]).discount, 100)
+        Promotion.objects.filter(name="Speaker week").get().categories.clear()
+        # Without a scope the rule applies to every product.
+        self.assertEqual(promotions.price_lines([(self.products[3], 1)]).discount, 111)
+        Promotion.objects.update(active=False)  # bulk updates send no signals
+        promotions.invalidate()
+        self.assertEqual(promotions.price_lines([(speaker, 1)]).discount, 0)
+
+    @override_settings(CACHE_MAX_STALE_SECONDS=60)
+    def test_index_expires_for_changes_made_by_other_workers(self):
+        # The next scheduled start is a week away, but another worker's
+        # save never reaches this process's cache.
+        with mock.patch.object(promotions.cache, "set", wraps=promotions.cache.set) as cache_set:
+            promotions.get_index()
+        self.assertEqual(cache_set.call_args.args[2], 60)
+
+    def test_site_and_api_orders_record_the_same_discount(self):
+        speaker = self.products[0]
+        client = Client()
+        client.force_login(self.user)
+        CartLine.objects.upsert(self.user.pk, {speaker.pk: 2})
+        self.assertContains(client.get(reverse("cart_detail")), "KES 200")
+        self.assertEqual(client.get(reverse("checkout")).context["total"], 1800)
+        client.post(reverse("place_order"), {"address_id": self.address.pk})
+
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+        response = api.post(
+            reverse("order-list"),
+            {"address_id": self.address.pk, "items": [{"product_id": speaker.pk, "qty": 2}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()["discount"], 200)
+
+        orders = Order.objects.all()
+        self.assertEqual([(o.total, o.discount) for o in orders], [(1800, 200), (1800, 200)])
@@ -0,0 +1,265 @@
+"""
+Query-count budgets for every route in shop/urls.py, shop/api_urls.py
+(with the API router), shop/auth_urls.py and the admin changelists.
+
+Each route is requested against a catalog of N=5 rows per collection and
+again after growing it to N=50. The number of queries must not change (no
+N+1) and must stay within the route's budget.
+"""
+from collections import namedtuple
+
+import cloudinary
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from shop import api_urls, auth_urls
+from shop import urls as shop_urls
+from shop.models import (
+    CampaignDelivery, CartLine, ContactMessage, DeletionLog, NewsletterCampaign,
+    NewsletterSubscription, OrderItem, OutboxEmail, SiteConfig, Testimonial,
+)
+
+from .factories import make_categories, make_orders, make_products, make_reviews, make_users
+
+SMALL, LARGE = 5, 50
+
+# name, method, user ("anon" | "customer" | "staff"), url kwargs / body builders,
+# expected status and query budget.
+Route = namedtuple(
+    "Route", "name method user kwargs data status budget",
+    defaults=("GET", "anon", None, None, 200, None),
+)
+
+ROUTES = [
+    # ---------- Public pages ----------
+    Route("home", budget=7),
+    Route("contact", budget=4),
+    Route("products", budget=6),
+    Route("product_detail", kwargs=lambda w: {"slug": w.product.slug}, budget=7),
+    Route("category_products", kwargs=lambda w: {"slug": w.category.slug}, budget=7),
+    Route("search_products", data=lambda w: {"q": "Product"}, budget=6),
+    Route("testimonials", budget=5),
+    Route("newsletter_page", budget=4),
+    Route("upload_test", budget=4),
+
+    # ---------- Cart & checkout (the cart holds N products) ----------
+    Route("cart_detail", budget=5),
+    Route("add_to_cart", "POST", kwargs=lambda w: {"product_id": w.product.pk}, status=302, budget=5),
+    Route("remove_from_cart", "POST", kwargs=lambda w: {"product_id": w.product.pk}, status=302, budget=5),
+    # JSON cart API: session, product, one cart load, promotion rules, session save
+    Route("cart_api_summary", budget=3),
+    Route("cart_api_add", "POST", kwargs=lambda w: {"product_id": w.product.pk}, budget=7),
+    Route("cart_api_set", "POST", kwargs=lambda w: {"product_id": w.product.pk}, data=lambda w: {"quantity": 3}, budget=7),
+    Route("cart_api_remove", "POST", kwargs=lambda w: {"product_id": w.product.pk}, budget=7),
+    Route("cart_fragment", budget=2),
+    Route("checkout", user="customer", budget=9),  # + promotion rules (cached outside tests)
+    Route(
+        "place_order", "POST", user="customer", data=lambda w: {"address_id": w.address.pk},
+        status=302, budget=13,
+    ),
+    Route("order_success", user="customer", kwargs=lambda w: {"order_id": w.order.pk}, budget=6),
+    Route("my_orders", user="customer", budget=6),
+    Route("order_detail", user="customer", kwargs=lambda w: {"pk": w.order.pk}, budget=7),
+
+    # ---------- Auth ----------
+    Route("signup", budget=4),
+    Route("login", budget=4),
+    Route("logout", "POST", user="customer", status=302, budget=4),
+    Route("password_reset", budget=4),
+    Route("password_reset_confirm", kwargs=lambda w: {"uidb64": "MQ", "token": "x-y"}, budget=5),
+    Route(
+        "token_obtain_pair", "POST", data=lambda w: {"username": "customer", "password": "pw"},
+        budget=1,
+    ),
+    Route("token_refresh", "POST", data=lambda w: {"refresh": w.refresh_token}, budget=1),
+    Route("me", user="customer", budget=1),
+    Route("metrics", user="staff", budget=4),
+    Route("subscribe_newsletter", "POST", data=lambda w: {"email": "new@example.com"}, status=302, budget=4),
+
+    # ---------- API ----------
+    Route("api-root", budget=0),
+    Route("category-list", budget=2),
+    Route("category-detail", kwargs=lambda w: {"slug": w.category.slug}, budget=1),
+    Route("product-list", budget=1),
+    Route("product-featured", budget=1),
+    Route("product-detail", kwargs=lambda w: {"slug": w.product.slug}, budget=2),
+    Route("product-bulk", "POST", user="staff", data=lambda w: w.bulk_rows, budget=5),
+    Route("review-list", budget=1),
+    Route("review-detail", kwargs=lambda w: {"pk": w.review.pk}, budget=1),
+    Route("order-list", user="customer", budget=3),
+    Route("order-detail", user="customer", kwargs=lambda w: {"pk": w.order.pk}, budget=3),
+    Route("address-list", user="customer", budget=3),
+    Route("address-detail", user="customer", kwargs=lambda w: {"pk": w.address.pk}, budget=2),
+    Route("testimonial-list", budget=1),
+    Route("testimonial-detail", kwargs=lambda w: {"pk": w.testimonial.pk}, budget=1),
+    Route("newsletter-list", "POST", data=lambda w: {"email": "api@example.com"}, status=201, budget=2),
+    Route("contact-list", "POST", data=lambda w: {
+        "name": "A", "email": "a@example.com", "subject": "Hi", "message": "Hello",
+    }, status=201, budget=1),
+    Route("sync-product-list", budget=2),
+    Route("sync-category-list", budget=2),
+    Route(
+        "product_image_delete", "DELETE", user="staff",
+        kwargs=lambda w: {"product_pk": w.product.pk, "pk": w.product_image.pk},
+        status=204, budget=4,
+    ),
+]
+
+# Routes that cannot run offline: the upload goes straight to Cloudinary.
+EXEMPT = {"product_image_upload"}
+
+ADMIN_BUDGET = 12  # per changelist: session, user, counts, page, filters, date hierarchy
+
+
+class World:
+    """A shop whose collections all grow together."""
+
+    def __init__(self):
+        User = get_user_model()
+        self.customer = User.objects.create_user(
+            "customer", "customer@example.com", "pw", first_name="Cus", last_name="Tomer",
+        )
+        self.staff = User.objects.create_superuser(
+            "staff", "staff@example.com", "pw", first_name="Staff", last_name="Member",
+        )
+        self.category = make_categories(1, prefix="Main")[0]
+        SiteConfig.objects.create(whatsapp_number="+254700000000")
+        self.size = 0
+        self.products = []
+
+    def grow(self, n):
+        count = n - self.size
+        prefix = f"g{n}"
+        make_categories(count, prefix=f"Cat{prefix}")
+        reviewers = make_users(count, prefix=f"reviewer{prefix}")
+        products = make_products(count, [self.category], prefix=f"product{prefix}", images=2, featured=True)
+        self.products += products
+        make_reviews(products, reviewers, per_product=2)
+        orders = make_orders([self.customer] * count, products, per_user=1, items=3)
+        # The order shown by the detail routes holds N items.
+        self.order = getattr(self, "order", orders[0])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=self.order, product=p, qty=1, price_each=p.price) for p in products[1:]
+        ])
+        make_orders(reviewers, products, per_user=1, items=2)
+        Testimonial.objects.bulk_create([Testimonial(name=f"T{i}", message="Great") for i in range(count)])
+        NewsletterSubscription.objects.bulk_create([
+            NewsletterSubscription(email=f"sub{prefix}-{i}@example.com") for i in range(count)
+        ])
+        ContactMessage.objects.bulk_create([
+            ContactMessage(name="C", email=f"c{i}@example.com", subject="S", message="M") for i in range(count)
+        ])
+        campaign = NewsletterCampaign.objects.create(subject=f"News {prefix}", body_text="Hi")
+        CampaignDelivery.objects.bulk_create([
+            CampaignDelivery(campaign=campaign, email=f"d{prefix}-{i}@example.com") for i in range(count)
+        ])
+        NewsletterCampaign.objects.bulk_create([
+            NewsletterCampaign(subject=f"Old {prefix}-{i}", body_text="Hi") for i in range(count - 1)
+        ])
+        OutboxEmail.objects.bulk_create([
+            OutboxEmail(to_email=f"o{i}@example.com", subject="S", body_text="B") for i in range(count)
+        ])
+        DeletionLog.objects.bulk_create([DeletionLog(model="product", object_id=10 ** 6 + i) for i in range(count)])
+
+        self.size = n
+        self.product = self.products[0]
+        self.product_image = self.product.images.first()
+        self.review = self.product.reviews.first()
+        self.address = self.order.address
+        self.testimonial = Testimonial.objects.first()
+        self.bulk_rows = [{"id": p.pk, "stock": 9} for p in self.products]
+        self.refresh_token = str(RefreshToken.for_user(self.customer))
+        return self
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    ALLOWED_HOSTS=["testserver"],
+    SYNC_SETTLE_SECONDS=0,
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Image URLs are built locally; no request is made to Cloudinary.
+        cloudinary.config(cloud_name=cloudinary.config().cloud_name or "test")
+
+    def client_for(self, world, who):
+        client = APIClient()
+        if who != "anon":
+            # Session login for the site, a real JWT for the API.
+            user = getattr(world, who)
+            client.force_login(user)
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+            CartLine.objects.upsert(user.pk, {p.pk: 1 for p in world.products}, increment=False)
+        else:
+            session = client.session
+            session["cart"] = [[p.pk, 1] for p in world.products]
+            session.save()
+        return client
+
+    def measure(self, world, route):
+        client = self.client_for(world, route.user)
+        path = reverse(route.name, kwargs=route.kwargs(world) if route.kwargs else None)
+        data = route.data(world) if route.data else None
+        request = getattr(client, route.method.lower())
+        extra = {"format": "json"} if isinstance(data, list) else {}
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                response = request(path, data, **extra)
+            transaction.set_rollback(True)
+        self.assertEqual(response.status_code, route.status, f"{route.name} returned {response.status_code}")
+        return len(queries), [q["sql"] for q in queries]
+
+    def admin_changelists(self):
+        return [
+            reverse(f"admin:{model._meta.app_label}_{model._meta.model_name}_changelist")
+            for model in admin.site._registry
+            if model._meta.app_label == "shop"
+        ]
+
+    def measure_admin(self, world, path):
+        client = self.client_for(world, "staff")
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path)
+        self.assertEqual(response.status_code, 200, path)
+        return len(queries), [q["sql"] for q in queries]
+
+    def test_every_route_is_covered(self):
+        patterns = shop_urls.urlpatterns + api_urls.urlpatterns + auth_urls.urlpatterns
+        names = {p.name for p in patterns if isinstance(p, URLPattern) and p.name}
+        names |= {p.name for p in api_urls.router.urls if p.name and not p.name.endswith("-format")}
+        covered = {r.name for r in ROUTES} | EXEMPT
+        self.assertEqual(names - covered, set(), "Add these routes to ROUTES")
+
+    def test_query_counts_do_not_grow_with_rows(self):
+        world = World().grow(SMALL)
+        small = {r.name: self.measure(world, r) for r in ROUTES}
+        small_admin = {p: self.measure_admin(world, p) for p in self.admin_changelists()}
+
+        world.grow(LARGE)
+        for route in ROUTES:
+            with self.subTest(route=route.name):
+                count, sql = self.measure(world, route)
+                self.assertEqual(
+                    count, small[route.name][0],
+                    f"{route.name}: {small[route.name][0]} queries at N={SMALL}, {count} at N={LARGE}\n"
+                    + "\n".join(sql),
+                )
+                self.assertLessEqual(count, route.budget, f"{route.name} over budget:\n" + "\n".join(sql))
+
+        for path, (small_count, _) in small_admin.items():
+            with self.subTest(changelist=path):
+                count, sql = self.measure_admin(world, path)
+                self.assertEqual(
+                    count, small_count,
+                    f"{path}: {small_count} queries at N={SMALL}, {count} at N={LARGE}\n" + "\n".join(sql),
+                )
+                self.assertLessEqual(count, ADMIN_BUDGET, f"{path} over budget:\n" + "\n".join(sql))
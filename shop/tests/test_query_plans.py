@@ -0,0 +1,132 @@
+"""
+Query-plan regression tests: EXPLAIN every canonical hot query against a
+large seeded dataset and fail when it needs a full table scan or a sort
+step instead of walking an index (see the indexes on Product, Order,
+Address and Review).
+"""
+import re
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from shop.models import Address, Category, DeletionLog, Order, OrderItem, Product, Review
+from shop.views import REVIEW_ORDERING
+
+from .factories import make_categories, make_orders, make_products, make_reviews, make_users
+
+PAGE = 13  # page size + 1, as fetched by cursor pagination
+CURSOR_ORDERING = ["-created_at", "-id"]
+
+# SQLite: "SCAN shop_product" without an index, "USE TEMP B-TREE FOR ORDER BY".
+# PostgreSQL: "Seq Scan on shop_product", a "Sort" node.
+PLAN_PROBLEMS = {
+    "sqlite": [
+        re.compile(r"\bSCAN (?:TABLE )?(\w+)(?!.*\bUSING\b.*INDEX)"),
+        re.compile(r"USE TEMP B-TREE FOR (?:ORDER BY|DISTINCT|GROUP BY)"),
+    ],
+    "postgresql": [
+        re.compile(r"Seq Scan on (\w+)"),
+        re.compile(r"(?:^|->)\s*Sort\b"),
+    ],
+}
+
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories = make_categories(20)
+        cls.products = make_products(20000, cls.categories)
+        cls.users = make_users(2000)
+        make_reviews(cls.products[:2000], cls.users, per_product=3, recompute=False)
+        make_orders(cls.users, cls.products, per_user=5, items=2)
+        DeletionLog.objects.bulk_create([
+            DeletionLog(model="product", object_id=10 ** 6 + i) for i in range(2000)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        cls.category = cls.categories[3]
+        cls.product = cls.products[42]
+        cls.user = cls.users[7]
+        cls.since = timezone.now() - timedelta(minutes=5)
+
+    def assertIndexed(self, queryset):
+        if connection.vendor not in PLAN_PROBLEMS:
+            self.skipTest(f"No plan rules for {connection.vendor}")
+        plan = queryset.explain()
+        problems = [
+            line.strip() for line in plan.splitlines()
+            if any(rule.search(line) for rule in PLAN_PROBLEMS[connection.vendor])
+        ]
+        self.assertFalse(problems, f"Unindexed plan for:\n{queryset.query}\n\n{plan}")
+
+    # ---------- Catalog ----------
+    def test_home_featured(self):
+        self.assertIndexed(Product.objects.filter(featured=True)[:6])
+
+    def test_product_list_recent(self):
+        self.assertIndexed(Product.objects.order_by(*CURSOR_ORDERING)[:PAGE])
+
+    def test_category_products(self):
+        self.assertIndexed(Product.objects.filter(category=self.category).order_by("-created_at")[:PAGE])
+
+    def test_api_category_filter(self):
+        self.assertIndexed(
+            Product.objects.filter(category__slug=self.category.slug).order_by(*CURSOR_ORDERING)[:PAGE]
+        )
+
+    def test_api_in_stock(self):
+        self.assertIndexed(Product.objects.filter(stock__gt=0).order_by(*CURSOR_ORDERING)[:PAGE])
+
+    def test_api_price_range(self):
+        self.assertIndexed(
+            Product.objects.filter(price__gte=5000, price__lte=6000).order_by("price", "id")[:PAGE]
+        )
+
+    def test_api_watts_range(self):
+        self.assertIndexed(Product.objects.filter(watts__gte=1500).order_by("watts", "id")[:PAGE])
+
+    def test_product_by_slug(self):
+        self.assertIndexed(Product.objects.filter(slug=self.product.slug))
+
+    def test_category_list(self):
+        self.assertIndexed(Category.objects.order_by("name"))
+
+    # ---------- Reviews ----------
+    def test_product_reviews(self):
+        self.assertIndexed(
+            Review.objects.filter(product=self.product).select_related("user").order_by(*REVIEW_ORDERING)[:11]
+        )
+
+    # ---------- Orders & addresses ----------
+    def test_my_orders(self):
+        self.assertIndexed(Order.objects.filter(user=self.user).order_by("-created_at"))
+
+    def test_order_api_page(self):
+        self.assertIndexed(
+            Order.objects.filter(user=self.user).select_related("address").order_by(*CURSOR_ORDERING)[:PAGE]
+        )
+
+    def test_staff_order_page(self):
+        self.assertIndexed(Order.objects.select_related("address").order_by(*CURSOR_ORDERING)[:PAGE])
+
+    def test_order_items_prefetch(self):
+        order_ids = list(Order.objects.filter(user=self.user).values_list("id", flat=True))
+        self.assertIndexed(OrderItem.objects.filter(order_id__in=order_ids))
+
+    def test_addresses(self):
+        self.assertIndexed(Address.objects.filter(user=self.user).order_by("-created_at"))
+
+    # ---------- Sync feed ----------
+    def test_sync_products(self):
+        self.assertIndexed(
+            Product.objects.filter(updated_at__gt=self.since).order_by("updated_at", "id")[:501]
+        )
+
+    def test_sync_tombstones(self):
+        self.assertIndexed(
+            DeletionLog.objects.filter(model="product", deleted_at__gt=self.since)
+            .order_by("deleted_at", "id")[:501]
+        )
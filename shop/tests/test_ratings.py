@@ -0,0 +1,102 @@
+"""
+Review aggregates on Product: the signals keep the histogram and average
+in step with every review change, and agree with a full recompute.
+"""
+from decimal import Decimal
+
+from django.test import Client, TestCase, override_settings
+
+from shop.models import Product, Review
+
+from .factories import make_categories, make_products, make_users
+
+
+def stats(product):
+    product.refresh_from_db()
+    return (
+        product.rating_count, product.rating_avg,
+        [getattr(product, f"rating_{star}") for star in range(1, 6)],
+    )
+
+
+class RatingAggregateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.first, cls.second = make_products(2, make_categories(1))
+        cls.users = make_users(3)
+
+    def review(self, rating, product=None, user=0):
+        return Review.objects.create(product=product or self.first, user=self.users[user], rating=rating)
+
+    def test_create(self):
+        self.review(5)
+        self.review(2, user=1)
+        self.assertEqual(stats(self.first), (2, Decimal("3.50"), [0, 1, 0, 0, 1]))
+
+    def test_change_rating(self):
+        review = self.review(5)
+        review.rating = 3
+        review.save()
+        self.assertEqual(stats(self.first), (1, Decimal("3.00"), [0, 0, 1, 0, 0]))
+
+        review.text = "Still fine."
+        review.save()  # unchanged rating: no delta
+        self.assertEqual(stats(self.first), (1, Decimal("3.00"), [0, 0, 1, 0, 0]))
+
+    def test_move_to_another_product(self):
+        self.review(4)
+        review = self.review(2, user=1)
+        review = Review.objects.get(pk=review.pk)
+        review.product, review.rating = self.second, 1
+        review.save()
+        self.assertEqual(stats(self.first), (1, Decimal("4.00"), [0, 0, 0, 1, 0]))
+        self.assertEqual(stats(self.second), (1, Decimal("1.00"), [1, 0, 0, 0, 0]))
+
+    def test_delete(self):
+        keep, gone = self.review(4), self.review(1, user=1)
+        gone.delete()
+        self.assertEqual(stats(self.first), (1, Decimal("4.00"), [0, 0, 0, 1, 0]))
+        keep.delete()
+        self.assertEqual(stats(self.first), (0, Decimal("0.00"), [0, 0, 0, 0, 0]))
+
+    def test_delta_matches_recompute(self):
+        for user, rating in enumerate((5, 4, 4)):
+            self.review(rating, user=user)
+        Review.objects.filter(rating=5).get().delete()
+        self.review(1, product=self.first, user=0)
+        incremental = stats(self.first)
+
+        Product.objects.filter(pk=self.first.pk).update(rating_count=0, rating_avg=0, rating_4=0)
+        self.first.recompute_rating_stats()
+        self.assertEqual(stats(self.first), incremental)
+        self.assertEqual(incremental, (3, Decimal("3.00"), [1, 0, 0, 2, 0]))
+
+    def test_empty_delta_is_a_no_op(self):
+        self.review(5)
+        Product.apply_rating_delta(self.first.pk, added=3, removed=3)
+        Product.apply_rating_delta(self.first.pk)
+        self.assertEqual(stats(self.first), (1, Decimal("5.00"), [0, 0, 0, 0, 1]))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, ALLOWED_HOSTS=["testserver"])
+class ReviewFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.first, cls.second = make_products(2, make_categories(1))
+        user, = make_users(1)
+        cls.reviews = [
+            Review.objects.create(product=product, user=user, rating=4)
+            for product in (cls.first, cls.second, cls.first)
+        ]
+
+    def test_filter_by_pk_or_slug(self):
+        expected = sorted(r.pk for r in self.reviews if r.product_id == self.first.pk)
+        for value in (self.first.pk, self.first.slug):
+            with self.subTest(product=value):
+                response = Client().get("/api/reviews/", {"product": value})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(sorted(r["id"] for r in response.json()["results"]), expected)
+
+    def test_unknown_product_is_empty(self):
+        response = Client().get("/api/reviews/", {"product": "no-such-product"})
+        self.assertEqual(response.json()["results"], [])
@@ -0,0 +1,90 @@
+"""
+Session writes: browsing creates no session, the cart is stored compactly
+and only saved when it changes, expired rows are pruned in batches.
+"""
+from datetime import timedelta
+
+from django.contrib.sessions.models import Session
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from shop.models import SiteConfig
+from shop.sessions import SessionStore, SessionWriter
+
+from .factories import make_categories, make_products
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, ALLOWED_HOSTS=["testserver"])
+class SessionWriteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        SiteConfig.objects.create(whatsapp_number="+254700000000")
+        cls.products = make_products(2, make_categories(1))
+
+    def add(self, client, product, **data):
+        return client.post(reverse("add_to_cart", kwargs={"product_id": product.pk}), data)
+
+    def test_browsing_creates_no_session(self):
+        client = Client()
+        client.get(reverse("products"))
+        client.get(reverse("cart_detail"))
+        self.assertFalse(Session.objects.exists())
+        self.assertNotIn("sessionid", client.cookies)
+
+    def test_cart_is_stored_compactly(self):
+        client = Client()
+        self.add(client, self.products[0], quantity=2)
+        self.add(client, self.products[1])
+        self.assertEqual(client.session["cart"], [[self.products[0].pk, 2], [self.products[1].pk, 1]])
+        response = client.get(reverse("cart_detail"))
+        self.assertEqual(response.context["cart"].get_total_price(), self.products[0].price * 2 + self.products[1].price)
+
+    def test_unchanged_session_is_not_saved(self):
+        client = Client()
+        self.add(client, self.products[0], quantity=2, override="1")
+        Session.objects.update(expire_date=timezone.now() + timedelta(days=1))
+        # Setting the same quantity again changes nothing, so nothing is written.
+        self.add(client, self.products[0], quantity=2, override="1")
+        self.assertLess(Session.objects.get().expire_date, timezone.now() + timedelta(days=2))
+
+        store = SessionStore(client.session.session_key)
+        store["cart"] = store["cart"]  # marks modified, same data
+        with self.assertNumQueries(0):
+            store.save()
+
+    @override_settings(SESSION_PRUNE_BATCH=2)
+    def test_clear_expired_deletes_in_batches(self):
+        past = timezone.now() - timedelta(days=1)
+        Session.objects.bulk_create(
+            Session(session_key=f"expired{i}", session_data="", expire_date=past) for i in range(5)
+        )
+        Session.objects.create(session_key="live", session_data="", expire_date=timezone.now() + timedelta(days=1))
+        with self.assertNumQueries(7):  # three batches of select + delete, then an empty select
+            self.assertEqual(SessionStore.clear_expired(), 5)
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), ["live"])
+
+
+class WriteBehindTests(TestCase):
+    def test_older_version_never_overwrites_newer(self):
+        store = SessionStore()
+        store["cart"] = []
+        store.create()
+        key, now = store.session_key, timezone.now()
+
+        # Two workers queued versions of the same session; the newer one flushes first.
+        newer, older = SessionWriter(), SessionWriter()
+        newer.queue(key, {}, store.encode({"cart": [[2, 1]]}), now + timedelta(days=14, seconds=5))
+        older.queue(key, {}, store.encode({"cart": [[1, 1]]}), now + timedelta(days=14))
+        with self.assertNumQueries(1):
+            newer.flush()
+        older.flush()
+        self.assertEqual(SessionStore().decode(Session.objects.get().session_data), {"cart": [[2, 1]]})
+
+        # A later version still wins, and new keys are inserted.
+        older.queue(key, {}, store.encode({"cart": []}), now + timedelta(days=14, seconds=9))
+        older.queue("fresh", {}, store.encode({}), now + timedelta(days=14))
+        older.flush()
+        self.assertEqual(SessionStore().decode(Session.objects.get(session_key=key).session_data), {"cart": []})
+        self.assertTrue(Session.objects.filter(session_key="fresh").exists())
+        self.assertEqual(older.pending, {})
@@ -0,0 +1,86 @@
+"""
+Slow statements are attributed to their view and call site, EXPLAINed and
+aggregated by fingerprint.
+"""
+import json
+import logging
+import os
+import tempfile
+from unittest import mock
+
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from shop import slow_queries
+from shop.models import SiteConfig, SlowQuery
+
+from .factories import make_categories, make_products
+
+
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        SiteConfig.objects.create(whatsapp_number="+254700000000")
+        make_products(3, make_categories(1))
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.log_file = os.path.join(self.dir.name, "slow.log")
+        # Log handlers are attached once; start each test with a fresh file.
+        for handler in list(slow_queries.logger.handlers):
+            slow_queries.logger.removeHandler(handler)
+            handler.close()
+
+    def test_normalize(self):
+        self.assertEqual(
+            slow_queries.normalize("SELECT * FROM t WHERE a = 'x''y' AND b IN (%s, %s,  %s) LIMIT 21"),
+            "SELECT * FROM t WHERE a = ? AND b IN (...) LIMIT ?",
+        )
+
+    def test_slow_view_queries_are_recorded(self):
+        entries = []
+        web = override_settings(SECURE_SSL_REDIRECT=False, ALLOWED_HOSTS=["testserver"])
+        with web, override_settings(SLOW_QUERY_MS=0.000001), mock.patch.object(slow_queries, "_enqueue", entries.append):
+            Client().get(reverse("search_products"), {"q": "Product"})
+            Client().get(reverse("search_products"), {"q": "Product 2"})
+
+        search = [e for e in entries if e["call_site"] == "shop/views.py:search_products"]
+        self.assertTrue(search)
+        self.assertEqual(search[0]["source"], "GET search_products")
+
+        # What the background thread does, with recording off so it does not feed itself.
+        with override_settings(SLOW_QUERY_MS=0, SLOW_QUERY_EXPLAIN_RATE=1, SLOW_QUERY_LOG_FILE=self.log_file):
+            for entry in entries:
+                slow_queries.process(entry)
+
+        rows = SlowQuery.objects.filter(call_site="shop/views.py:search_products")
+        # Both searches share fingerprints despite different parameters.
+        self.assertEqual({r.count for r in rows}, {2})
+        row = rows.get(sql__contains='"shop_product"."name" LIKE')
+        self.assertGreater(row.total_ms, 0)
+        self.assertTrue(row.plan)
+        with open(self.log_file) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(len(lines), len(entries))
+        for line in lines:  # search terms never reach the log
+            self.assertNotIn("params", line)
+            self.assertNotIn("Product 2", json.dumps(line))
+        self.assertIn(row.fingerprint, {line["fingerprint"] for line in lines})
+
+    def test_without_a_log_file_entries_go_to_the_logger(self):
+        entry = {
+            "sql": 'SELECT 1 FROM "shop_product" WHERE "id" = %s', "params": (1,), "ms": 300.0,
+            "alias": "default", "call_site": "shop/views.py:home", "line": 1, "source": "GET home",
+            "at": timezone.now(),
+        }
+        with override_settings(SLOW_QUERY_MS=0, SLOW_QUERY_EXPLAIN_RATE=0, SLOW_QUERY_LOG_FILE=""):
+            with self.assertLogs("shop.slow_queries", "INFO") as logs:
+                slow_queries.process(entry)
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line["call_site"], "shop/views.py:home")
+        self.assertEqual(line["sql"], 'SELECT ? FROM "shop_product" WHERE "id" = ?')
+        self.assertNotIn("params", line)
+        self.assertFalse(any(isinstance(h, logging.FileHandler) for h in slow_queries.logger.handlers))
+        self.assertEqual(SlowQuery.objects.get().count, 1)
@@ -0,0 +1,112 @@
+"""
+Sync feed: a mirror that follows `next` sees every change and deletion
+once, in order, even when many rows share a timestamp.
+"""
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from shop.keyset import encode_cursor
+from shop.models import Category, DeletionLog, Product
+from shop.sync import prune_deletion_log
+
+from .factories import make_categories, make_products
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, ALLOWED_HOSTS=["testserver"], SYNC_SETTLE_SECONDS=0)
+class SyncFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category, = make_categories(1)
+        cls.products = make_products(5, [cls.category])
+        # One bulk update: every row shares the same updated_at.
+        Product.objects.update(updated_at=timezone.now() - timedelta(minutes=1))
+
+    def poll(self, since=None, limit=2, url="sync-product-list"):
+        params = {"limit": limit}
+        if since:
+            params["since"] = since
+        response = Client().get(reverse(url), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def follow(self, since=None, limit=2):
+        """Poll until caught up; returns (ids in order, deleted ids, next cursor, pages)."""
+        ids, deleted, pages = [], [], 0
+        while True:
+            page = self.poll(since, limit)
+            ids += [row["id"] for row in page["results"]]
+            deleted += page["deleted"]
+            since, pages = page["next"], pages + 1
+            if not page["has_more"]:
+                return ids, deleted, since, pages
+
+    def test_response_shape(self):
+        page = self.poll(limit=1)
+        self.assertEqual(set(page), {"results", "deleted", "next", "has_more"})
+        self.assertTrue(page["has_more"])
+        self.assertEqual(page["deleted"], [])
+        row, = page["results"]
+        self.assertEqual(row["id"], self.products[0].pk)
+        self.assertEqual(row["category_id"], self.category.pk)
+        self.assertIn("updated_at", row)
+
+    def test_pages_through_equal_timestamps(self):
+        ids, deleted, _, pages = self.follow(limit=2)
+        self.assertEqual(ids, [p.pk for p in self.products])
+        self.assertEqual((deleted, pages), ([], 3))
+
+    def test_changes_and_tombstones_after_the_snapshot(self):
+        _, _, since, _ = self.follow()
+        self.assertEqual(self.poll(since)["results"], [])
+
+        changed, gone = self.products[3], self.products[1]
+        changed.price += 1
+        changed.save()
+        gone_id = gone.pk
+        gone.delete()
+        ids, deleted, since, _ = self.follow(since)
+        self.assertEqual((ids, deleted), ([changed.pk], [gone_id]))
+
+        # Nothing is repeated on the next poll.
+        page = self.poll(since)
+        self.assertEqual((page["results"], page["deleted"], page["has_more"]), ([], [], False))
+
+    def test_first_sync_skips_earlier_deletions(self):
+        self.products[4].delete()
+        ids, deleted, _, _ = self.follow()
+        self.assertEqual((ids, deleted), ([p.pk for p in self.products[:4]], []))
+
+    def test_category_feed(self):
+        Category.objects.create(name="Cables", slug="cables").delete()
+        page = self.poll(url="sync-category-list")
+        self.assertEqual([row["id"] for row in page["results"]], [self.category.pk])
+
+    def test_expired_and_invalid_cursors(self):
+        old = timezone.now() - timedelta(days=31)
+        response = Client().get(reverse("sync-product-list"), {"since": encode_cursor([old, 0, old, 0])})
+        self.assertEqual(response.status_code, 410)
+        response = Client().get(reverse("sync-product-list"), {"since": encode_cursor([1, 2])})
+        self.assertEqual(response.status_code, 404)
+
+
+class PruneDeletionLogTests(TestCase):
+    def test_drops_only_rows_past_retention(self):
+        now = timezone.now()
+        DeletionLog.objects.bulk_create([
+            DeletionLog(model="product", object_id=1, deleted_at=now - timedelta(days=31)),
+            DeletionLog(model="product", object_id=2, deleted_at=now - timedelta(days=29)),
+            DeletionLog(model="category", object_id=3, deleted_at=now),
+        ])
+        with override_settings(SYNC_TOMBSTONE_DAYS=30):
+            self.assertEqual(prune_deletion_log(), 1)
+        self.assertEqual(sorted(DeletionLog.objects.values_list("object_id", flat=True)), [2, 3])
+
+        out = StringIO()
+        call_command("prune_deletion_log", days=7, stdout=out)
+        self.assertIn("Pruned 1 tombstone(s) older than 7 days", out.getvalue())
+        self.assertEqual(list(DeletionLog.objects.values_list("object_id", flat=True)), [3])
@@ -0,0 +1,59 @@
+"""
+Worker warm-up: after shop.warmup has run, a request finds its URLs,
+templates and site context ready instead of building them.
+"""
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.signals import request_started
+from django.db import close_old_connections
+from django.template import engines
+from django.test import TestCase, override_settings
+
+from shop import caches, warmup
+from shop.models import Category, SiteConfig
+
+from .factories import make_categories, make_products
+
+
+@override_settings(ALLOWED_HOSTS=["shop.example.com"])
+class WarmupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        SiteConfig.objects.create(whatsapp_number="+254700000000")
+        make_products(3, make_categories(2))
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_urls_and_templates(self):
+        self.assertGreater(warmup.populate_urls(), 0)
+        self.assertGreater(warmup.compile_templates(), 10)
+        loader = engines["django"].engine.template_loaders[0]
+        self.assertIn("components/navbar.html", {key.split(":")[0] for key in loader.get_template_cache})
+
+    def test_site_context_is_cached_until_it_changes(self):
+        self.assertTrue(warmup.prime_caches())
+        with self.assertNumQueries(0):
+            self.assertEqual(len(caches.site_categories()), 2)
+            self.assertEqual(caches.site_config().whatsapp_number, "+254700000000")
+
+        SiteConfig.objects.update(whatsapp_number="+254711111111")  # bulk updates send no signal
+        self.assertEqual(caches.site_config().whatsapp_number, "+254700000000")
+        Category.objects.create(name="New", slug="new")
+        self.assertEqual(len(caches.site_categories()), 3)
+        self.assertEqual(caches.site_config().whatsapp_number, "+254711111111")
+
+    @override_settings(CACHE_MAX_STALE_SECONDS=60)
+    def test_site_context_expires_for_changes_made_by_other_workers(self):
+        with mock.patch.object(caches.cache, "set", wraps=caches.cache.set) as cache_set:
+            caches.site_categories()
+            caches.site_config()
+        self.assertEqual([call.args[2] for call in cache_set.call_args_list], [60, 60])
+
+    def test_warm_requests_render_real_pages(self):
+        # As the test client does: keep the test transaction's connection open.
+        request_started.disconnect(close_old_connections)
+        self.addCleanup(request_started.connect, close_old_connections)
+        self.assertEqual(warmup.warm_requests(), {"/": 200, "/products/": 200})
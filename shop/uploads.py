@@ -0,0 +1,81 @@
+"""
+Non-blocking Cloudinary uploads for async views.
+
+The Cloudinary SDK uploads with blocking HTTP calls, so under ASGI a
+slow upload would hold a thread for its whole duration. upload_resource()
+sends the same signed request to the upload API with httpx's async
+client instead, so the event loop keeps serving other requests while it
+waits. Without httpx installed it falls back to the SDK in a worker
+thread (not thread-sensitive, so it never queues behind the ORM thread).
+httpx is imported on the first upload, not with the views.
+"""
+import importlib
+import time
+
+import cloudinary.uploader
+import cloudinary.utils
+from asgiref.sync import sync_to_async
+from cloudinary import CloudinaryResource
+from cloudinary.exceptions import Error as CloudinaryError
+
+UPLOAD_TIMEOUT = 60
+_httpx = None
+
+
+class UploadError(Exception):
+    """The upload failed: rejected by Cloudinary, unreachable or a bad reply."""
+
+
+def as_resource(result):
+    """The CloudinaryResource a CloudinaryField stores, as the SDK builds it."""
+    return CloudinaryResource(
+        result["public_id"],
+        version=str(result["version"]),
+        format=result.get("format"),
+        type=result.get("type", "upload"),
+        resource_type=result.get("resource_type", "image"),
+        metadata=result,
+    )
+
+
+def httpx_module():
+    """httpx, or False when it is not installed (optional for WSGI-only deployments)."""
+    global _httpx
+    if _httpx is None:
+        try:
+            _httpx = importlib.import_module("httpx")
+        except ImportError:
+            _httpx = False
+    return _httpx
+
+
+async def upload_resource(file, folder, resource_type="image"):
+    """
+    Upload a Django UploadedFile; returns its CloudinaryResource. Every
+    failure, including network errors and malformed replies, is raised as
+    UploadError.
+    """
+    if hasattr(file, "seekable") and file.seekable():
+        file.seek(0)
+    httpx = httpx_module()
+    if not httpx:
+        upload = sync_to_async(cloudinary.uploader.upload_resource, thread_sensitive=False)
+        try:
+            return await upload(file, folder=folder, resource_type=resource_type)
+        except CloudinaryError as exc:
+            raise UploadError(str(exc)) from exc
+
+    params = cloudinary.utils.sign_request({"folder": folder, "timestamp": int(time.time())}, {})
+    url = cloudinary.utils.cloudinary_api_url("upload", resource_type=resource_type)
+    files = {"file": (file.name, file.read(), getattr(file, "content_type", None) or "application/octet-stream")}
+    try:
+        async with httpx.AsyncClient(timeout=UPLOAD_TIMEOUT) as client:
+            response = await client.post(url, data=params, files=files)
+        result = response.json()
+    except (httpx.HTTPError, ValueError) as exc:
+        raise UploadError(f"{type(exc).__name__}: {exc}") from exc
+    if not isinstance(result, dict):
+        raise UploadError(f"Unexpected reply (HTTP {response.status_code})")
+    if response.status_code != 200 or "error" in result:
+        raise UploadError(result.get("error", {}).get("message", f"HTTP {response.status_code}"))
+    return as_resource(result)
@@ -1,25 +1,10 @@
 from django.urls import path, include
-from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from . import views
 from .views import (
     SignUpView, CustomLoginView, CustomLogoutView,
     CustomPasswordResetView, CustomPasswordResetConfirmView, upload_test
 )
 
-# ------------------------------
-# DRF API Router
-# ------------------------------
-router = DefaultRouter()
-router.register("categories", views.CategoryView, basename="category")
-router.register("products", views.ProductView, basename="product")
-router.register("reviews", views.ReviewView, basename="review")
-router.register("orders", views.OrderView, basename="order")
-router.register("addresses", views.AddressView, basename="address")
-router.register("testimonials", views.TestimonialViewSet, basename="testimonial")
-router.register("newsletter", views.NewsletterViewSet, basename="newsletter")
-router.register("contacts", views.ContactMessageViewSet, basename="contact")
-
 # ------------------------------
 # URL Patterns
 # ------------------------------
@@ -32,6 +17,11 @@ urlpatterns = [
     path("cart/add/<int:product_id>/", views.add_to_cart, name="add_to_cart"),
     path("cart/remove/<int:product_id>/", views.remove_from_cart, name="remove_from_cart"),
     path("cart/", views.cart_detail, name="cart_detail"),
+    path("cart/api/", views.cart_api_summary, name="cart_api_summary"),
+    path("cart/api/add/<int:product_id>/", views.cart_api_add, name="cart_api_add"),
+    path("cart/api/set/<int:product_id>/", views.cart_api_set, name="cart_api_set"),
+    path("cart/api/remove/<int:product_id>/", views.cart_api_remove, name="cart_api_remove"),
+    path("cart/fragment/", views.cart_fragment, name="cart_fragment"),
     path("search/", views.search_products, name="search_products"), 
     
     path("products/", views.product_list, name="products"),
@@ -54,29 +44,19 @@ urlpatterns = [
     path("password-reset/", CustomPasswordResetView.as_view(), name="password_reset"),
     path("reset/<uidb64>/<token>/", CustomPasswordResetConfirmView.as_view(), name="password_reset_confirm"),
 
-    # ---------- JWT ----------
-    path("auth/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
-    path("auth/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
-    path("me/", views.MeView.as_view(), name="me"),
+    # ---------- JWT (shop/auth_urls.py) ----------
+    path("", include("shop.auth_urls")),
+
+    # ---------- Metrics ----------
+    path("metrics", views.metrics_view, name="metrics"),
 
-    # ---------- API Router ----------
-    path("api/", include(router.urls)),
+    # ---------- API (shop/api_urls.py) ----------
+    path("api/", include("shop.api_urls")),
     
     # Newsletter
     path("subscribe/", views.subscribe_newsletter, name="subscribe_newsletter"),
     path("newsletter/", views.newsletter_page, name="newsletter_page"),
 
-    # ---------- Product Image Upload ----------
-    path(
-        "api/products/<int:product_pk>/upload-image/",
-        views.ProductImageUploadView.as_view({"post": "create"}),
-        name="product_image_upload",
-    ),
-    path(
-        "api/products/<int:product_pk>/delete-image/<int:pk>/",
-        views.ProductImageUploadView.as_view({"delete": "destroy"}),
-        name="product_image_delete",
-    ),
     path("testimonials/", views.testimonials, name="testimonials"),
 
     path("upload-test/", upload_test, name="upload_test"),
@@ -1,7 +1,9 @@
 from django.views.decorators.http import require_POST
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse_lazy
-from django.db.models import Q
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Q, Prefetch, prefetch_related_objects
 from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
@@ -31,30 +33,37 @@ from .forms import (
 
 # Models
 from .models import (
-    CustomUser, Category, Product, ProductImage, Review,
+    CustomUser, Category, Product, Review,
     Order, OrderItem, Address, NewsletterSubscription,
-    ContactMessage, Testimonial, SiteConfig
+    Testimonial
 )
 
 # Cart
 from .cart import Cart
 
-# DRF
-from rest_framework import viewsets, permissions, filters, status, mixins
-from rest_framework.decorators import action
-from rest_framework.response import Response
-from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework.filters import OrderingFilter
-
-# Serializers
-from .serializers import (
-    CategorySerializer, ProductSerializer, ProductImageSerializer,
-    ReviewSerializer, OrderSerializer, AddressSerializer,
-    NewsletterSubscriptionSerializer, ContactMessageSerializer,
-    TestimonialSerializer
-)
+# Outbox
+from .outbox import enqueue_order_confirmation
+
+# Pagination
+from .keyset import keyset_page
+
+# Async uploads
+from .uploads import UploadError, upload_resource
+
+# Metrics
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.template.loader import render_to_string
+from django.views.decorators.http import require_GET
+from . import metrics
+
+# Fast JSON
+from .fastjson import dumps
+
+# The REST API lives in shop.api_views, so HTML requests and management
+# commands never import DRF or simplejwt.
+
+REVIEW_ORDERING = ["-created_at", "-id"]
 
 # -------------------------------------------------------------------
 # AUTH VIEWS
@@ -95,6 +104,11 @@ class CustomPasswordResetView(PasswordResetView):
     email_template_name = "accounts/password_reset_email.html"
     success_url = reverse_lazy("login")
 
+    def form_valid(self, form):
+        # The form writes the reset email to the outbox; keep it in one transaction.
+        with transaction.atomic():
+            return super().form_valid(form)
+
 
 class CustomPasswordResetConfirmView(PasswordResetConfirmView):
     form_class = CustomSetPasswordForm
@@ -107,33 +121,50 @@ class CustomPasswordResetConfirmView(PasswordResetConfirmView):
 # -------------------------------------------------------------------
 
 def home(request):
-    featured_products = Product.objects.filter(featured=True)[:6]
-    categories = Category.objects.all()
+    featured_products = Product.objects.filter(featured=True).select_related("category")[:6]
     testimonials = Testimonial.objects.order_by("-created_at")[:4]  # show only 4 latest
-    site_config = SiteConfig.objects.first()
 
+    # categories and site_config come from the (cached) context processors.
     return render(request, "shop/home.html", {
         "featured_products": featured_products,
-        "categories": categories,
         "testimonials": testimonials,
-        "site_config": site_config,
     })
 
 
 def product_list(request):
-    products = Product.objects.all().order_by("-created_at")
+    products = (
+        Product.objects.select_related("category")
+        .prefetch_related("images")
+        .order_by("-created_at")
+    )
     return render(request, "shop/product_list.html", {"products": products})
 
 
 def product_detail(request, slug):
-    product = get_object_or_404(Product, slug=slug)
-    reviews = Review.objects.filter(product=product).select_related("user")
-    return render(request, "shop/product.html", {"product": product, "reviews": reviews})
+    product = get_object_or_404(
+        Product.objects.select_related("category").prefetch_related("images"), slug=slug
+    )
+    reviews, next_reviews_cursor = keyset_page(
+        Review.objects.filter(product=product).select_related("user"),
+        REVIEW_ORDERING,
+        request.GET.get("reviews_cursor"),
+        settings.REVIEWS_PAGE_SIZE,
+    )
+    return render(request, "shop/product.html", {
+        "product": product,
+        "reviews": reviews,
+        "next_reviews_cursor": next_reviews_cursor,
+    })
 
 
 def category_products(request, slug):
     category = get_object_or_404(Category, slug=slug)
-    products = Product.objects.filter(category=category).order_by("-created_at")
+    products = (
+        Product.objects.filter(category=category)
+        .select_related("category")
+        .prefetch_related("images")
+        .order_by("-created_at")
+    )
     return render(request, "shop/category_products.html", {
         "category": category,
         "products": products,
@@ -159,7 +190,6 @@ def add_to_cart(request, product_id):
     override = str(request.POST.get("override", "")).lower() in ["true", "1", "yes"]
 
     cart.add(product=product, quantity=quantity, override_quantity=override)
-    request.session.modified = True  # ensure cart persists
 
     # ✅ Redirect back to same page (fallback to cart detail)
     return redirect(request.META.get("HTTP_REFERER", reverse("cart_detail")))
@@ -172,7 +202,6 @@ def remove_from_cart(request, product_id):
     product = get_object_or_404(Product, id=product_id)
 
     cart.remove(product)
-    request.session.modified = True
 
     return redirect("cart_detail")
 
@@ -185,6 +214,103 @@ def cart_detail(request):
         "total_savings": cart.get_total_savings(),
     })
 
+
+# -------------------------------------------------------------------
+# CART API (JSON for in-place updates; the views above are the no-JS fallback)
+# -------------------------------------------------------------------
+
+def _cart_response(request, cart, product_id=None):
+    """
+    Count and totals, the changed line and (with ?fragment=1) the navbar
+    dropdown HTML, all from one load of the cart.
+    """
+    pricing = cart.pricing()
+    payload = {
+        "count": len(cart),
+        "subtotal": pricing.subtotal,
+        "discount": pricing.discount,
+        "total": pricing.total,
+        "promotions": pricing.applied,
+    }
+    lines = [
+        {
+            "product_id": item["product"].id,
+            "name": item["product"].name,
+            "quantity": item["quantity"],
+            "price": item["price"],
+            "total_price": item["total_price"],
+            "discount": pricing.line_discounts.get(item["product"].id, 0),
+        }
+        for item in cart
+    ]
+    if product_id is None:
+        payload["lines"] = lines
+    else:
+        payload["line"] = next(
+            (line for line in lines if line["product_id"] == product_id),
+            {"product_id": product_id, "quantity": 0, "total_price": 0, "discount": 0},
+        )
+    if request.GET.get("fragment"):
+        # Rendered without the request, so no context processors run.
+        payload["dropdown_html"] = render_to_string("components/cart_dropdown.html", {"cart": cart})
+    return _json(payload)
+
+
+def _json(payload, status=200):
+    return HttpResponse(dumps(payload), content_type="application/json", status=status)
+
+
+def _quantity(request, default=None):
+    try:
+        return int(request.POST.get("quantity", default))
+    except (TypeError, ValueError):
+        return None
+
+
+@require_GET
+def cart_api_summary(request):
+    """All lines and totals."""
+    return _cart_response(request, Cart(request))
+
+
+@require_POST
+def cart_api_add(request, product_id):
+    """Add `quantity` (default 1) of a product."""
+    product = get_object_or_404(Product, id=product_id)
+    quantity = _quantity(request, 1)
+    if quantity is None:
+        return _json({"error": "quantity must be an integer"}, 400)
+    cart = Cart(request)
+    cart.add(product=product, quantity=quantity)
+    return _cart_response(request, cart, product.id)
+
+
+@require_POST
+def cart_api_set(request, product_id):
+    """Set a line's quantity (0 removes it)."""
+    product = get_object_or_404(Product, id=product_id)
+    quantity = _quantity(request)
+    if quantity is None or quantity < 0:
+        return _json({"error": "quantity must be a non-negative integer"}, 400)
+    cart = Cart(request)
+    cart.add(product=product, quantity=quantity, override_quantity=True)
+    return _cart_response(request, cart, product.id)
+
+
+@require_POST
+def cart_api_remove(request, product_id):
+    """Remove a product's line."""
+    product = get_object_or_404(Product, id=product_id)
+    cart = Cart(request)
+    cart.remove(product)
+    return _cart_response(request, cart, product.id)
+
+
+@require_GET
+def cart_fragment(request):
+    """Just the navbar dropdown, for pages that only need to refresh it."""
+    return HttpResponse(render_to_string("components/cart_dropdown.html", {"cart": Cart(request)}))
+
 #---------------------------------------------------------------
 # CHECKOUT & ORDERS
 # -------------------------------------------------------------------
@@ -196,8 +322,10 @@ def checkout_view(request):
         return redirect("cart_detail")
 
     # Prepare cart items with absolute image URLs
+    items = list(cart)
+    prefetch_related_objects([item["product"] for item in items], "images")
     cart_items = []
-    for item in cart:
+    for item in items:
         product = item["product"]
         image_url = None
         first_image = getattr(product.images.first(), "image", None)
@@ -213,10 +341,14 @@ def checkout_view(request):
         })
 
     addresses = Address.objects.filter(user=request.user)
+    pricing = cart.pricing()
     return render(request, "shop/checkout.html", {
         "cart_items": cart_items,
         "addresses": addresses,
-        "total": cart.get_total_price(),
+        "subtotal": pricing.subtotal,
+        "discount": pricing.discount,
+        "promotions": pricing.applied,
+        "total": pricing.total,
     })
 
 
@@ -230,9 +362,32 @@ def place_order(request):
 
     if request.method == "POST":
         if len(cart) == 0:
+            metrics.inc("shop_order_failures_total", reason="empty_cart")
             messages.warning(request, "Your cart is empty.")
             return redirect("cart_detail")
 
+        try:
+            order = _create_order(request, cart)
+        except Http404:
+            metrics.inc("shop_order_failures_total", reason="bad_address")
+            raise
+        except Exception:
+            metrics.inc("shop_order_failures_total", reason="error")
+            raise
+        metrics.inc("shop_orders_placed_total")
+
+        # Clear cart
+        cart.clear()
+
+        messages.success(request, f"Order #{order.id} placed successfully!")
+        return redirect("order_success", order_id=order.id)
+
+    return redirect("checkout_view")
+
+
+def _create_order(request, cart):
+    """Address, order, items and confirmation email in one transaction."""
+    with transaction.atomic():
         # ---------- Handle address ----------
         address_id = request.POST.get("address_id")
         if address_id:
@@ -251,30 +406,30 @@ def place_order(request):
             )
 
         # ---------- Create Order ----------
+        pricing = cart.pricing()
         order = Order.objects.create(
             user=request.user,
             address=address,
             whatsapp_number=request.POST.get("whatsapp_number", ""),
-            total=cart.get_total_price(),
+            total=pricing.total,
+            discount=pricing.discount,
             status="new",
         )
 
         # ---------- Add Order Items ----------
-        for item in cart:
-            OrderItem.objects.create(
+        OrderItem.objects.bulk_create([
+            OrderItem(
                 order=order,
                 product=item["product"],
                 qty=item["quantity"],
                 price_each=item["product"].price,
             )
+            for item in cart
+        ])
 
-        # Clear cart
-        cart.clear()
-
-        messages.success(request, f"Order #{order.id} placed successfully!")
-        return redirect("order_success", order_id=order.id)
-
-    return redirect("checkout_view")
+        # ---------- Queue confirmation email (sent by process_outbox) ----------
+        enqueue_order_confirmation(order)
+    return order
 
 
 @login_required
@@ -300,7 +455,12 @@ def order_detail(request, pk):
     """
     Show details of a single order.
     """
-    order = get_object_or_404(Order, pk=pk, user=request.user)
+    order = get_object_or_404(
+        Order.objects.select_related("address").prefetch_related(
+            Prefetch("items", queryset=OrderItem.objects.select_related("product"))
+        ),
+        pk=pk, user=request.user,
+    )
     return render(request, "shop/order_detail.html", {"order": order})
 
 # -------------------------------------------------------------------
@@ -310,7 +470,7 @@ def order_detail(request, pk):
 def search_products(request):
     query = request.GET.get("q", "")
     category_slug = request.GET.get("category", "")
-    products = Product.objects.all()
+    products = Product.objects.select_related("category").prefetch_related("images")
 
     if query:
         products = products.filter(
@@ -322,138 +482,24 @@ def search_products(request):
     if category_slug:
         products = products.filter(category__slug=category_slug)
 
-    categories = Category.objects.all()
-
     return render(request, "shop/search.html", {
         "products": products,
         "query": query,
-        "categories": categories,
         "selected_category": category_slug,
     })
 
 
 # -------------------------------------------------------------------
-# API VIEWS (DRF)
+# METRICS (Prometheus scrape target)
 # -------------------------------------------------------------------
 
-class MeView(APIView):
-    permission_classes = [IsAuthenticated]
-    def get(self, request):
-        user = request.user
-        return Response({
-            "id": user.id,
-            "username": user.username,
-            "is_staff": user.is_staff,
-            "email": user.email,
-        })
-
-
-class IsAdminOrReadOnly(permissions.BasePermission):
-    def has_permission(self, request, view):
-        if request.method in permissions.SAFE_METHODS:
-            return True
-        return bool(request.user and request.user.is_staff)
-
-
-class CategoryView(viewsets.ModelViewSet):
-    queryset = Category.objects.all().order_by("name")
-    serializer_class = CategorySerializer
-    permission_classes = [IsAdminOrReadOnly]
-    lookup_field = "slug"
-
-
-class ProductView(viewsets.ModelViewSet):
-    queryset = Product.objects.select_related("category").prefetch_related("images").all().order_by("-created_at")
-    serializer_class = ProductSerializer
-    permission_classes = [IsAdminOrReadOnly]
-    filter_backends = [filters.SearchFilter, OrderingFilter]
-    search_fields = ["name", "description", "category__name"]
-    ordering_fields = ["price", "watts", "created_at"]
-    ordering = ["-created_at"]
-    lookup_field = "slug"
-
-    def get_queryset(self):
-        qs = super().get_queryset()
-        params = self.request.query_params
-        if cat := params.get("category"):
-            qs = qs.filter(category__slug=cat)
-        if watts_min := params.get("watts_min"):
-            qs = qs.filter(watts__gte=watts_min)
-        if price_min := params.get("price_min"):
-            qs = qs.filter(price__gte=price_min)
-        if price_max := params.get("price_max"):
-            qs = qs.filter(price__lte=price_max)
-        return qs
-
-    @action(detail=False, methods=["get"])
-    def featured(self, request):
-        qs = self.get_queryset().filter(featured=True)
-        page = self.paginate_queryset(qs)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = self.get_serializer(qs, many=True)
-        return Response(serializer.data)
-
-
-class ReviewView(viewsets.ModelViewSet):
-    queryset = Review.objects.select_related("product", "user").all().order_by("-created_at")
-    serializer_class = ReviewSerializer
-    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-
-
-class AddressView(viewsets.ModelViewSet):
-    serializer_class = AddressSerializer
-    permission_classes = [IsAuthenticated]
-
-    def get_queryset(self):
-        return Address.objects.filter(user=self.request.user).order_by("-created_at")
-
-
-class OrderView(viewsets.ModelViewSet):
-    serializer_class = OrderSerializer
-    permission_classes = [IsAuthenticated]
-
-    def get_queryset(self):
-        if self.request.user.is_staff:
-            return Order.objects.all().order_by("-created_at")
-        return Order.objects.filter(user=self.request.user).order_by("-created_at")
-
-
-class ProductImageUploadView(viewsets.ViewSet):
-    permission_classes = [permissions.IsAdminUser]
-    parser_classes = [MultiPartParser, FormParser]
-
-    def create(self, request, product_pk=None):
-        product = get_object_or_404(Product, pk=product_pk)
-        serializer = ProductImageSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save(product=product)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-    def destroy(self, request, product_pk=None, pk=None):
-        image = get_object_or_404(ProductImage, pk=pk, product_id=product_pk)
-        image.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
-
-
-class TestimonialViewSet(viewsets.ModelViewSet):
-    queryset = Testimonial.objects.all().order_by("-created_at")
-    serializer_class = TestimonialSerializer
-    permission_classes = [AllowAny]
-
-
-class NewsletterViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
-    queryset = NewsletterSubscription.objects.all()
-    serializer_class = NewsletterSubscriptionSerializer
-    permission_classes = [AllowAny]
-
-
-class ContactMessageViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
-    queryset = ContactMessage.objects.all()
-    serializer_class = ContactMessageSerializer
-    permission_classes = [AllowAny]
+def metrics_view(request):
+    """Staff session, or `Authorization: Bearer <METRICS_TOKEN>` for the scraper."""
+    auth = request.headers.get("Authorization", "")
+    token_ok = bool(settings.METRICS_TOKEN) and constant_time_compare(auth, f"Bearer {settings.METRICS_TOKEN}")
+    if not (token_ok or request.user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 # -------------------------------------------------------------------
@@ -512,21 +558,22 @@ def newsletter_page(request):
 #############################################
 # Simple form with an image field
 
-
-class UploadTestForm(forms.Form):
+class ImageUploadForm(forms.Form):
     image = forms.ImageField()
 
-def upload_test(request):
+
+async def upload_test(request):
+    """Async so a slow upload does not hold a worker under ASGI (see shop.uploads)."""
     url = None
     if request.method == "POST":
-        form = UploadTestForm(request.POST, request.FILES)
+        form = ImageUploadForm(request.POST, request.FILES)
         if form.is_valid():
-            # Save directly using default storage (Cloudinary)
-            image = form.cleaned_data["image"]
-            from django.core.files.storage import default_storage
-            path = default_storage.save(image.name, image)
-            url = default_storage.url(path)
+            try:
+                resource = await upload_resource(form.cleaned_data["image"], folder="upload-test/")
+                url = resource.build_url(secure=True)
+            except UploadError as exc:
+                form.add_error("image", f"Upload failed: {exc}")
     else:
-        form = UploadTestForm()
+        form = ImageUploadForm()
 
-    return render(request, "shop/upload_test.html", {"form": form, "url": url})
\ No newline at end of file
+    return await sync_to_async(render)(request, "shop/upload_test.html", {"form": form, "url": url})
@@ -0,0 +1,126 @@
+"""
+Process warm-up for gunicorn (see gunicorn.conf.py).
+
+With preload_app the master imports the project once and warm_up() pays
+the cold-start costs there: URL resolvers, compiled templates, the
+cached site context and promotion index, and in-process requests for
+WARMUP_PATHS (everything else a first request initialises lazily).
+Workers forked afterwards share those pages copy-on-write; gc.freeze()
+moves everything allocated so far out of the collector's reach, so
+collections in a worker do not touch (and copy) the shared pages. Nothing that must not cross a fork is left
+open: DB and cache connections are closed before returning, and each
+worker opens its own with connect().
+"""
+import gc
+import io
+import logging
+import os
+import sys
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.template import TemplateSyntaxError, engines
+from django.urls import get_resolver
+
+from . import caches as shop_caches
+from . import metrics, promotions
+
+logger = logging.getLogger("shop.warmup")
+
+
+def populate_urls():
+    """Build the URL resolver's lookup tables (normally done on the first request)."""
+    resolver = get_resolver()
+    resolver._populate()
+    return len(resolver.reverse_dict)
+
+
+def compile_templates():
+    """Compile every project template into the template loaders' caches."""
+    count = 0
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            if not str(directory).startswith(str(settings.BASE_DIR)):
+                continue  # third-party templates (admin, jazzmin, DRF) load on demand
+            for root, _, files in os.walk(directory):
+                for filename in files:
+                    if not filename.endswith((".html", ".txt")):
+                        continue
+                    name = os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, "/")
+                    try:
+                        engine.get_template(name)
+                    except TemplateSyntaxError:
+                        logger.warning("Template %s does not compile", name)
+                        continue
+                    count += 1
+    return count
+
+
+def prime_caches():
+    """Fill the caches every page reads; skipped when the DB is not ready yet."""
+    try:
+        shop_caches.site_categories()
+        shop_caches.site_config()
+        promotions.get_index()
+    except Exception:
+        logger.warning("Catalog caches not primed (database unavailable?)", exc_info=True)
+        return False
+    return True
+
+
+def warm_requests():
+    """GET each of WARMUP_PATHS through a full middleware stack; returns their statuses."""
+    host = next(
+        (h for h in settings.ALLOWED_HOSTS if h and "*" not in h and not h.startswith(".")), "localhost"
+    )
+    handler = WSGIHandler()
+    statuses = {}
+    for path in settings.WARMUP_PATHS:
+        environ = {
+            "REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": "", "SCRIPT_NAME": "",
+            "SERVER_NAME": host, "SERVER_PORT": "443", "HTTP_HOST": host, "SERVER_PROTOCOL": "HTTP/1.1",
+            "wsgi.url_scheme": "https", "wsgi.input": io.BytesIO(), "wsgi.errors": sys.stderr,
+        }
+        started = []
+        try:
+            response = handler(environ, lambda status, headers, exc_info=None: started.append(status))
+            b"".join(response)
+            response.close()
+        except Exception:
+            logger.warning("Warm-up request for %s failed", path, exc_info=True)
+            continue
+        statuses[path] = int(started[0].split()[0])
+        if statuses[path] >= 400:
+            logger.warning("Warm-up request for %s returned %s", path, started[0])
+    return statuses
+
+
+def warm_up(freeze=True):
+    """Pay the cold-start costs in this process; returns what was done."""
+    start = time.perf_counter()
+    report = {
+        "urls": populate_urls(),
+        "templates": compile_templates(),
+        "caches": prime_caches(),
+        "requests": warm_requests(),
+    }
+    connections.close_all()
+    caches.close_all()
+    # Counters from the warm-up would be re-reported by every forked worker.
+    metrics.reset()
+    if freeze:
+        gc.collect()
+        gc.freeze()
+        report["frozen"] = gc.get_freeze_count()
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    logger.info("Warm-up: %s", report)
+    return report
+
+
+def connect():
+    """Open this process's DB connections (run in each worker after fork)."""
+    for alias in connections:
+        connections[alias].ensure_connection()